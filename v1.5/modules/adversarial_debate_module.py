@@ -3,11 +3,41 @@
 # Adversarial Debate Module - Confrontational Agent Reasoning
 # =============================================================================
 
+import re
 import time
 import uuid
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 
+from synthesis_reduction import TreeReducer
+
+# Score line the judge appends to each evaluation, e.g. "SCORES: A=7 B=5 CONFIDENCE=0.8"
+_SCORE_PATTERN = re.compile(
+    r'SCORES:\s*A\s*=\s*(\d+(?:\.\d+)?)\s*[,;]?\s*B\s*=\s*(\d+(?:\.\d+)?)'
+    r'(?:\s*[,;]?\s*CONFIDENCE\s*=\s*(\d*\.?\d+))?',
+    re.IGNORECASE
+)
+
+def parse_judge_scores(evaluation: str) -> Dict[str, float]:
+    """Parse the judge's score line (the last one wins)
+
+    Returns:
+        {'team_a', 'team_b', 'margin', 'confidence'} or {} if no score line was found
+    """
+    matches = _SCORE_PATTERN.findall(evaluation or "")
+    if not matches:
+        return {}
+
+    team_a, team_b, confidence = matches[-1]
+    scores = {
+        'team_a': float(team_a),
+        'team_b': float(team_b),
+        'margin': float(team_a) - float(team_b)
+    }
+    if confidence:
+        scores['confidence'] = min(float(confidence), 1.0)
+    return scores
+
 # =============================================================================
 # Adversarial Debate Classes
 # =============================================================================
@@ -22,19 +52,25 @@ class DebateRound:
     judge_evaluation: str = ""
     round_context: str = ""
     duration: float = 0.0
+    judge_scores: Dict[str, float] = field(default_factory=dict)
+    cancelled: bool = False
 
 @dataclass
 class DebateSession:
     """Complete adversarial debate session"""
     session_id: str
     query: str
-    cqb_session_id: str
+    cqb_session_id: Optional[str]
     team_a_agents: List[str]
     team_b_agents: List[str]
     judge_agent: str
     rounds: List[DebateRound]
     final_verdict: str = ""
     total_duration: float = 0.0
+    verdict_mode: str = "excerpt"
+    early_stop_reason: str = ""
+    cancelled: bool = False
+    cancel_reason: str = ""
 
 class AdversarialDebateModule:
     """Module that orchestrates adversarial debates using CQB agents"""
@@ -45,10 +81,50 @@ class AdversarialDebateModule:
 
         print("⚔️ Adversarial Debate Module initialized")
 
+    def _resolve_agents(self, query: str, max_agents: int, cqb_session_id: str = None,
+                        agents: List = None, cancel_token=None) -> Tuple[Optional[str], List]:
+        """Use the given agents or session team, otherwise request a team from CQB"""
+        if agents:
+            print(f"♻️ Using {len(agents)} provided agents")
+            return cqb_session_id, list(agents)
+
+        if cqb_session_id:
+            print(f"♻️ Reusing agents from CQB session {cqb_session_id[:8]}...")
+            return cqb_session_id, self.cqb_brain.get_agents(cqb_session_id)
+
+        print(f"🧠 Requesting agents from CQB...")
+        cqb_session_id = self.cqb_brain.analyze_query_and_generate_agents(
+            query, max_agents, cancel_token=cancel_token
+        )
+        return cqb_session_id, self.cqb_brain.get_agents(cqb_session_id)
+
     def run_debate_on_query(self, query: str, max_agents: int = 7,
                            debate_rounds: int = 3, position_a: str = "FOR",
-                           position_b: str = "AGAINST") -> str:
-        """Run adversarial debate on a query"""
+                           position_b: str = "AGAINST", cqb_session_id: str = None,
+                           agents: List = None, verdict_mode: str = "excerpt",
+                           early_stopping: bool = False, early_stop_margin: float = 3.0,
+                           margin_tolerance: float = 1.0, cancel_token=None) -> str:
+        """Run adversarial debate on a query
+
+        Args:
+            query: Query to debate
+            max_agents: Team size when a new team is generated
+            debate_rounds: Number of debate rounds
+            position_a: Position argued by team A
+            position_b: Position argued by team B
+            cqb_session_id: Reuse the team of an existing CQB session
+            agents: Reuse an explicit list of CQB agents
+            verdict_mode: "excerpt" (first 300 chars of each argument) or "tree"
+                (map-reduce summaries sized to the judge's context length)
+            early_stopping: End the debate before debate_rounds when the judge's
+                scores show a clear or settled winner
+            early_stop_margin: Score margin (0-10 scale) that ends the debate
+            margin_tolerance: Max margin change between two rounds that counts as settled
+            cancel_token: Optional CancelToken. Checked between rounds, arguments and
+                the judge step, and passed to generation (including team setup)
+                so running requests stop at the next chunked step; completed rounds and partial arguments
+                are kept, the verdict is skipped and the session is marked cancelled
+        """
 
         print(f"\n⚔️ Starting Adversarial Debate")
         print("=" * 50)
@@ -57,10 +133,8 @@ class AdversarialDebateModule:
 
         session_start = time.time()
 
-        # 1. Get agents from CQB brain
-        print(f"🧠 Requesting agents from CQB...")
-        cqb_session_id = self.cqb_brain.analyze_query_and_generate_agents(query, max_agents)
-        agents = self.cqb_brain.get_agents(cqb_session_id)
+        # 1. Get agents from CQB brain (or reuse an existing team)
+        cqb_session_id, agents = self._resolve_agents(query, max_agents, cqb_session_id, agents, cancel_token)
 
         print(f"✅ Received {len(agents)} agents from CQB")
 
@@ -76,25 +150,47 @@ class AdversarialDebateModule:
             team_a_agents=[agent.agent_id for agent in team_a],
             team_b_agents=[agent.agent_id for agent in team_b],
             judge_agent=judge.agent_id,
-            rounds=[]
+            rounds=[],
+            verdict_mode=verdict_mode
         )
 
         # 4. Run debate rounds
         for round_num in range(debate_rounds):
+            if self._is_cancelled(cancel_token):
+                break
+
             round_result = self._run_debate_round(
                 team_a, team_b, judge, query, round_num + 1,
-                session.rounds, position_a, position_b
+                session.rounds, position_a, position_b, cancel_token
             )
             session.rounds.append(round_result)
+            if round_result.cancelled:
+                break
+
+            if early_stopping and round_num + 1 < debate_rounds:
+                session.early_stop_reason = self._check_early_stop(
+                    session.rounds, early_stop_margin, margin_tolerance
+                )
+                if session.early_stop_reason:
+                    print(f"🏁 Ending debate after round {round_num + 1}: {session.early_stop_reason}")
+                    break
 
         # 5. Generate final verdict
-        session.final_verdict = self._generate_final_verdict(
-            judge, query, session.rounds, position_a, position_b
-        )
+        if self._is_cancelled(cancel_token):
+            session.cancelled = True
+            session.cancel_reason = cancel_token.reason
+            print(f"🛑 Debate cancelled ({cancel_token.reason}) - keeping "
+                  f"{len(session.rounds)} rounds, verdict skipped")
+        else:
+            session.final_verdict = self._generate_final_verdict(
+                judge, query, session.rounds, position_a, position_b, verdict_mode
+            )
         session.total_duration = time.time() - session_start
 
         # 6. Store session
         self.active_debates[debate_session_id] = session
+        if session.cancelled:
+            return debate_session_id
 
         print(f"✅ Debate complete in {session.total_duration:.1f}s")
         print(f"📊 {len(session.rounds)} rounds, Teams: {len(team_a)} vs {len(team_b)}")
@@ -128,8 +224,12 @@ class AdversarialDebateModule:
 
     def _run_debate_round(self, team_a, team_b, judge, query: str, round_num: int,
                          previous_rounds: List[DebateRound], position_a: str,
-                         position_b: str) -> DebateRound:
-        """Run a single round of adversarial debate"""
+                         position_b: str, cancel_token=None) -> DebateRound:
+        """Run a single round of adversarial debate
+
+        Once the cancel token is set, remaining arguments and the judge step are
+        skipped and the round is marked cancelled.
+        """
 
         print(f"⚔️ Round {round_num}: Adversarial Debate")
 
@@ -143,11 +243,13 @@ class AdversarialDebateModule:
         print(f"   📢 Team {position_a} arguments...")
         team_a_responses = {}
         for agent in team_a:
+            if self._is_cancelled(cancel_token):
+                break
             try:
                 prompt = self._create_debate_prompt(
                     query, round_num, context, position_a, "team_a"
                 )
-                response = agent.generate_response(prompt)
+                response = agent.generate_response(prompt, cancel_token=cancel_token)
                 team_a_responses[agent.agent_id] = response
                 print(f"      ✅ {agent.agent_id}: {len(response)} chars")
             except Exception as e:
@@ -158,29 +260,55 @@ class AdversarialDebateModule:
         print(f"   📢 Team {position_b} counter-arguments...")
         team_b_responses = {}
         for agent in team_b:
+            if self._is_cancelled(cancel_token):
+                break
             try:
                 prompt = self._create_debate_prompt(
                     query, round_num, context, position_b, "team_b", team_a_responses
                 )
-                response = agent.generate_response(prompt)
+                response = agent.generate_response(prompt, cancel_token=cancel_token)
                 team_b_responses[agent.agent_id] = response
                 print(f"      ✅ {agent.agent_id}: {len(response)} chars")
             except Exception as e:
                 print(f"      ❌ {agent.agent_id}: {e}")
                 team_b_responses[agent.agent_id] = f"Error: {str(e)}"
 
+        cancelled = self._is_cancelled(cancel_token)
+        if cancelled:
+            print(f"   🛑 Round cancelled: {len(team_a_responses) + len(team_b_responses)} "
+                  f"arguments kept, judge skipped")
+            return DebateRound(
+                round_id=round_id,
+                round_type=f"debate_round_{round_num}",
+                team_a_responses=team_a_responses,
+                team_b_responses=team_b_responses,
+                round_context=context,
+                duration=time.time() - round_start,
+                cancelled=True
+            )
+
         # Judge evaluates the round
         print(f"   ⚖️ Judge evaluation...")
         try:
             judge_prompt = self._create_judge_prompt(
                 query, round_num, team_a_responses, team_b_responses, position_a, position_b
             )
-            judge_evaluation = judge.generate_response(judge_prompt)
+            judge_evaluation = judge.generate_response(judge_prompt, model_id=self._judge_model(judge),
+                                                       cancel_token=cancel_token)
             print(f"      ✅ Judge: {len(judge_evaluation)} chars")
         except Exception as e:
             print(f"      ❌ Judge: {e}")
             judge_evaluation = f"Evaluation error: {str(e)}"
 
+        judge_scores = parse_judge_scores(judge_evaluation)
+        # Cancelled mid-evaluation: the evaluation is kept, but the debate ends here
+        cancelled = self._is_cancelled(cancel_token)
+        if judge_scores:
+            print(f"      📊 Scores: {position_a} {judge_scores['team_a']:g} - "
+                  f"{position_b} {judge_scores['team_b']:g}")
+        else:
+            print(f"      ⚠️ Judge gave no score line")
+
         round_duration = time.time() - round_start
 
         return DebateRound(
@@ -190,7 +318,9 @@ class AdversarialDebateModule:
             team_b_responses=team_b_responses,
             judge_evaluation=judge_evaluation,
             round_context=context,
-            duration=round_duration
+            duration=round_duration,
+            judge_scores=judge_scores,
+            cancelled=cancelled
         )
 
     def _build_debate_context(self, query: str, previous_rounds: List[DebateRound],
@@ -306,10 +436,38 @@ As the judge, evaluate this round of debate by:
 4. Determining which team was more persuasive in this round
 5. Providing constructive feedback for both teams
 
-Be objective and critical in your analysis. Point out both strengths and weaknesses in each team's performance."""
+Be objective and critical in your analysis. Point out both strengths and weaknesses in each team's performance.
+
+End your evaluation with exactly one line in this format, scoring each team from 0 to 10 and giving your confidence from 0 to 1 (A = Team {position_a}, B = Team {position_b}):
+SCORES: A=<score> B=<score> CONFIDENCE=<confidence>"""
+
+    def _is_cancelled(self, cancel_token) -> bool:
+        return cancel_token is not None and cancel_token.cancelled
+
+    def _judge_model(self, judge) -> str:
+        """Model the judge evaluates on (judge route, else the judge agent's own)"""
+        return self.cqb_brain.model_manager.resolve_model('judge', judge.spec.model_assignment)
+
+    def _check_early_stop(self, rounds: List[DebateRound], early_stop_margin: float,
+                          margin_tolerance: float) -> str:
+        """Reason to end the debate now based on the judge's scores, or "" to continue"""
+        current = rounds[-1].judge_scores
+        if not current:
+            return ""
+
+        if abs(current['margin']) >= early_stop_margin:
+            return f"margin {current['margin']:+g} reached threshold {early_stop_margin:g}"
+
+        previous = rounds[-2].judge_scores if len(rounds) > 1 else {}
+        if previous and previous['margin'] * current['margin'] > 0 and \
+                abs(current['margin'] - previous['margin']) <= margin_tolerance:
+            return f"margin stable for two rounds ({previous['margin']:+g}, {current['margin']:+g})"
+
+        return ""
 
     def _generate_final_verdict(self, judge, query: str, rounds: List[DebateRound],
-                               position_a: str, position_b: str) -> str:
+                               position_a: str, position_b: str,
+                               verdict_mode: str = "excerpt") -> str:
         """Generate final verdict after all debate rounds"""
 
         print(f"⚖️ Generating final verdict...")
@@ -317,22 +475,53 @@ Be objective and critical in your analysis. Point out both strengths and weaknes
         # Compile all rounds for final judgment
         full_debate_summary = f"Complete Debate Summary for: {query}\n\n"
 
-        for i, round_result in enumerate(rounds, 1):
-            full_debate_summary += f"=== Round {i} ===\n"
+        if verdict_mode == "tree":
+            # Full arguments and evaluations, summarized only as far as the judge's context requires
+            items = []
+            for i, round_result in enumerate(rounds, 1):
+                items.extend((f"Round {i} {position_a} - {agent_id}", response)
+                             for agent_id, response in round_result.team_a_responses.items())
+                items.extend((f"Round {i} {position_b} - {agent_id}", response)
+                             for agent_id, response in round_result.team_b_responses.items())
+                items.append((f"Round {i} Evaluation", round_result.judge_evaluation))
+
+            reducer = TreeReducer(judge, final_model_id=self._judge_model(judge))
+            reduced = reducer.reduce(
+                query, items, self._build_verdict_prompt(full_debate_summary, position_a, position_b),
+                f"Summarize the debate material above in at most 6 short bullet points. Keep the "
+                f"strongest arguments of each side, label each point {position_a} or {position_b}, "
+                f"and keep the judge's assessments."
+            )
+            print(f"   🌲 {len(items)} texts reduced to {len(reduced)} in {reducer.levels} levels")
+            for label, text in reduced:
+                full_debate_summary += f"{label}:\n{text}\n\n"
+        else:
+            for i, round_result in enumerate(rounds, 1):
+                full_debate_summary += f"=== Round {i} ===\n"
+
+                full_debate_summary += f"Team {position_a} Arguments:\n"
+                for agent_id, response in round_result.team_a_responses.items():
+                    summary = response[:300] + "..." if len(response) > 300 else response
+                    full_debate_summary += f"- {summary}\n"
+
+                full_debate_summary += f"\nTeam {position_b} Arguments:\n"
+                for agent_id, response in round_result.team_b_responses.items():
+                    summary = response[:300] + "..." if len(response) > 300 else response
+                    full_debate_summary += f"- {summary}\n"
+
+                full_debate_summary += f"\nRound {i} Evaluation: {round_result.judge_evaluation}\n\n"
 
-            full_debate_summary += f"Team {position_a} Arguments:\n"
-            for agent_id, response in round_result.team_a_responses.items():
-                summary = response[:300] + "..." if len(response) > 300 else response
-                full_debate_summary += f"- {summary}\n"
+        verdict_prompt = self._build_verdict_prompt(full_debate_summary, position_a, position_b)
 
-            full_debate_summary += f"\nTeam {position_b} Arguments:\n"
-            for agent_id, response in round_result.team_b_responses.items():
-                summary = response[:300] + "..." if len(response) > 300 else response
-                full_debate_summary += f"- {summary}\n"
+        verdict = judge.generate_response(verdict_prompt, model_id=self._judge_model(judge))
 
-            full_debate_summary += f"\nRound {i} Evaluation: {round_result.judge_evaluation}\n\n"
+        print(f"✅ Final verdict complete: {len(verdict)} characters")
+
+        return verdict
 
-        verdict_prompt = f"""{full_debate_summary}
+    def _build_verdict_prompt(self, full_debate_summary: str, position_a: str, position_b: str) -> str:
+        """Final verdict prompt around the compiled debate summary"""
+        return f"""{full_debate_summary}
 
 As the final judge, provide your comprehensive verdict on this adversarial debate:
 
@@ -344,12 +533,6 @@ As the final judge, provide your comprehensive verdict on this adversarial debat
 
 Your verdict should be thorough, balanced, and decisive."""
 
-        verdict = judge.generate_response(verdict_prompt)
-
-        print(f"✅ Final verdict complete: {len(verdict)} characters")
-
-        return verdict
-
     def get_debate_summary(self, debate_session_id: str) -> str:
         """Get formatted debate summary"""
         session = self.active_debates.get(debate_session_id)
@@ -391,9 +574,12 @@ Judge: {session.judge_agent}
             cqb_info = self.cqb_brain.get_session_info(session.cqb_session_id)
             agent_details = {agent['agent_id']: agent for agent in cqb_info['agents']}
             license_manifest = cqb_info.get('license_manifest', {})
+            agents_pruned = cqb_info.get('agents_pruned', 0)
         except:
             agent_details = {}
             license_manifest = {}
+            agents_pruned = 0
+        model_routing = self.cqb_brain.model_manager.get_model_routing()
 
         # ADD the license_manifest and compliance_info sections:
         return {
@@ -405,7 +591,11 @@ Judge: {session.judge_agent}
                 'rounds_completed': len(session.rounds),
                 'team_a_agents': session.team_a_agents,
                 'team_b_agents': session.team_b_agents,
-                'judge_agent': session.judge_agent
+                'judge_agent': session.judge_agent,
+                'early_stop_reason': session.early_stop_reason,
+                'cancelled': session.cancelled,
+                'cancel_reason': session.cancel_reason,
+                'model_routing': model_routing
             },
             'agents': agent_details,
             'debate_rounds': [
@@ -417,7 +607,9 @@ Judge: {session.judge_agent}
                     'context_provided': round_result.round_context[:500] + "..." if len(round_result.round_context) > 500 else round_result.round_context,
                     'team_a_responses': round_result.team_a_responses,
                     'team_b_responses': round_result.team_b_responses,
-                    'judge_evaluation': round_result.judge_evaluation
+                    'judge_evaluation': round_result.judge_evaluation,
+                    'judge_scores': round_result.judge_scores,
+                    'cancelled': round_result.cancelled
                 }
                 for i, round_result in enumerate(session.rounds)
             ],
@@ -426,11 +618,13 @@ Judge: {session.judge_agent}
                 'export_timestamp': time.time(),
                 'total_agents': len(session.team_a_agents) + len(session.team_b_agents) + 1,
                 'total_responses': sum(
-                    len(r.team_a_responses) + len(r.team_b_responses) + 1 
+                    len(r.team_a_responses) + len(r.team_b_responses) + int(bool(r.judge_evaluation))
                     for r in session.rounds
                 ),
                 'debate_format': 'adversarial',
-                'reasoning_type': 'adversarial'
+                'reasoning_type': 'adversarial',
+                'verdict_mode': session.verdict_mode,
+                'agent_rounds_saved': agents_pruned * len(session.rounds)
             },
             
             'license_manifest': license_manifest,
@@ -2,11 +2,138 @@
 # Agent Collaboration Module
 # =============================================================================
 
+import re
 import time
 import uuid
-from typing import Dict, List, Optional, Any
+import zlib
+import math
+import random
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 
+from cqb_framework import balanced_team, generate_agent_responses
+from compute_planner import fit_to_budget, plan_compute
+from specialty_registry import normalize_specialty_tokens, specialty_trigrams
+from synthesis_reduction import TreeReducer
+
+TOPOLOGIES = ('full', 'ring', 'knn', 'random', 'star')
+
+# =============================================================================
+# Communication Topologies
+# =============================================================================
+
+def build_topology(agents, topology: str = 'full', k: int = 2,
+                   seed: int = None) -> Optional[Dict[str, List[str]]]:
+    """Decide whose previous responses each agent reads in collaboration rounds
+
+    Args:
+        agents: Team agents
+        topology: 'full' (everyone), 'ring' (k nearest positions), 'knn' (k most
+            similar specialties), 'random' (random k-regular) or 'star' (spokes
+            read only the synthesizer hub, which reads everyone)
+        k: Neighbors per agent for ring, knn and random topologies
+        seed: Random seed for the 'random' topology
+
+    Returns:
+        Map of agent_id to neighbor agent_ids, or None for the full topology
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology '{topology}' (expected one of {', '.join(TOPOLOGIES)})")
+
+    ids = [agent.agent_id for agent in agents]
+    n = len(ids)
+    if topology == 'full' or n <= 2:
+        return None
+
+    k = max(1, min(k, n - 1))
+    neighbors: Dict[str, List[str]] = {}
+
+    if topology in ('ring', 'random'):
+        # Ring lattice; the random topology is the same lattice over a shuffled order
+        order = list(range(n))
+        if topology == 'random':
+            random.Random(seed).shuffle(order)
+        for pos, i in enumerate(order):
+            linked = []
+            for step in range(1, k // 2 + 2):
+                for j in (order[(pos - step) % n], order[(pos + step) % n]):
+                    if j != i and ids[j] not in linked and len(linked) < k:
+                        linked.append(ids[j])
+            neighbors[ids[i]] = linked
+
+    elif topology == 'knn':
+        tokens = [set(normalize_specialty_tokens(a.specialty)) for a in agents]
+        trigrams = [specialty_trigrams(list(t)) for t in tokens]
+
+        def similarity(i: int, j: int) -> float:
+            token_union = tokens[i] | tokens[j]
+            trigram_union = trigrams[i] | trigrams[j]
+            token_sim = len(tokens[i] & tokens[j]) / len(token_union) if token_union else 0.0
+            trigram_sim = len(trigrams[i] & trigrams[j]) / len(trigram_union) if trigram_union else 0.0
+            return (token_sim + trigram_sim) / 2
+
+        for i in range(n):
+            ranked = sorted((j for j in range(n) if j != i), key=lambda j: -similarity(i, j))
+            neighbors[ids[i]] = [ids[j] for j in ranked[:k]]
+
+    else:  # star
+        conservative = [a for a in agents if a.agent_type == "Conservative"]
+        hub = (conservative[0] if conservative else agents[0]).agent_id
+        for agent_id in ids:
+            neighbors[agent_id] = [i for i in ids if i != hub] if agent_id == hub else [hub]
+
+    return neighbors
+
+def _count_prompt_tokens(agent, prompt: str, context: Dict[str, Any] = None) -> int:
+    """Prefill token count for accounting; falls back to a chars/4 estimate"""
+    try:
+        return agent.count_prompt_tokens(prompt, context)
+    except Exception:
+        return len(prompt + (context or {}).get('team_context', '')) // 4
+
+# =============================================================================
+# Response Redundancy (MinHash)
+# =============================================================================
+
+_MINHASH_PRIME = (1 << 61) - 1
+_WORD_PATTERN = re.compile(r'\w+')
+_minhash_params: Dict[int, List[Tuple[int, int]]] = {}
+
+def minhash_signature(text: str, num_hashes: int = 64, shingle_size: int = 3) -> List[int]:
+    """MinHash signature over word shingles of a response
+
+    Args:
+        text: Response text
+        num_hashes: Signature length (more hashes, lower estimate variance)
+        shingle_size: Words per shingle
+
+    Returns:
+        List of num_hashes minimum hash values
+    """
+    if num_hashes not in _minhash_params:
+        rng = random.Random(num_hashes)
+        _minhash_params[num_hashes] = [
+            (rng.randrange(1, _MINHASH_PRIME), rng.randrange(0, _MINHASH_PRIME))
+            for _ in range(num_hashes)
+        ]
+
+    words = _WORD_PATTERN.findall(text.lower())
+    shingles = {
+        zlib.crc32(' '.join(words[i:i + shingle_size]).encode())
+        for i in range(max(1, len(words) - shingle_size + 1))
+    } if words else set()
+    if not shingles:
+        return [_MINHASH_PRIME] * num_hashes
+
+    return [min((a * h + b) % _MINHASH_PRIME for h in shingles)
+            for a, b in _minhash_params[num_hashes]]
+
+def estimate_jaccard(first: List[int], second: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    if not first or first[0] == _MINHASH_PRIME or second[0] == _MINHASH_PRIME:
+        return 0.0
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
 # =============================================================================
 # Collaboration Module
 # =============================================================================
@@ -19,17 +146,34 @@ class CollaborationRound:
     agent_responses: Dict[str, str]
     round_context: str = ""
     duration: float = 0.0
+    subteam_summaries: Dict[str, str] = field(default_factory=dict)
+    prompt_tokens: Dict[str, int] = field(default_factory=dict)
+    redundancy: Dict[str, float] = field(default_factory=dict)
+    retired_agents: List[str] = field(default_factory=list)
+    skipped_agents: List[str] = field(default_factory=list)
+    cancelled: bool = False
 
 @dataclass
 class CollaborationSession:
     """Complete collaboration session"""
     session_id: str
     query: str
-    cqb_session_id: str
+    cqb_session_id: Optional[str]
     agents_involved: List[str]
     rounds: List[CollaborationRound]
     final_synthesis: str = ""
     total_duration: float = 0.0
+    subteams: Dict[str, List[str]] = field(default_factory=dict)
+    topology: str = "full"
+    topology_neighbors: Optional[Dict[str, List[str]]] = None
+    synthesis_mode: str = "excerpt"
+    retired_agents: Dict[str, int] = field(default_factory=dict)
+    compute_plan: Optional[Dict[str, Any]] = None
+    deadline: Optional[float] = None
+    partial: bool = False
+    budget_notes: List[str] = field(default_factory=list)
+    cancelled: bool = False
+    cancel_reason: str = ""
 
 class AgentCollaborationModule:
     """Module that orchestrates agent collaboration using CQB"""
@@ -37,25 +181,166 @@ class AgentCollaborationModule:
     def __init__(self, cqb_brain):
         self.cqb_brain = cqb_brain
         self.active_collaborations: Dict[str, CollaborationSession] = {}
+        self.subteam_summary_tokens = 160
+        # Shared budget for other sub-teams' summaries in each sub-team's context
+        self.cross_team_summary_tokens = 200
+        self.deadline_synthesis_tokens = 512
+        self.deadline_safety_factor = 1.25
 
         print("🤝 Agent Collaboration Module initialized")
 
+    def _resolve_agents(self, query: str, max_agents: int, cqb_session_id: str = None,
+                        agents: List = None, auto_size: bool = False,
+                        compute_budget: int = None, latency_budget: float = None,
+                        cancel_token=None) -> Tuple[Optional[str], List]:
+        """Use the given agents or session team, otherwise request a team from CQB"""
+        if agents:
+            print(f"♻️ Using {len(agents)} provided agents")
+            return cqb_session_id, list(agents)
+
+        if cqb_session_id:
+            print(f"♻️ Reusing agents from CQB session {cqb_session_id[:8]}...")
+            return cqb_session_id, self.cqb_brain.get_agents(cqb_session_id)
+
+        print(f"🧠 Requesting agents from CQB...")
+        cqb_session_id = self.cqb_brain.analyze_query_and_generate_agents(
+            query, max_agents, latency_budget=latency_budget,
+            auto_size=auto_size, compute_budget=compute_budget, cancel_token=cancel_token
+        )
+        return cqb_session_id, self.cqb_brain.get_agents(cqb_session_id)
+
+    def _resolve_compute_plan(self, query: str, agents: List, cqb_session_id: Optional[str],
+                              collaboration_rounds: int, compute_budget: int = None) -> Dict[str, Any]:
+        """Compute plan of the CQB session, or one planned from the query for a reused team"""
+        plan = None
+        if cqb_session_id:
+            try:
+                plan = self.cqb_brain.get_session_info(cqb_session_id).get('compute_plan')
+            except Exception:
+                plan = None
+
+        if not plan or (compute_budget and plan.get('compute_budget') != compute_budget):
+            model_manager = self.cqb_brain.model_manager
+            config = model_manager.model_configs.get(model_manager.resolve_model('innovative_agents'))
+            plan = plan_compute(
+                query, compute_budget=compute_budget, max_agents=len(agents),
+                max_rounds=collaboration_rounds, max_tokens=config.max_tokens if config else 1024
+            ).to_dict()
+
+        plan = dict(plan)
+        plan['rounds'] = min(plan['rounds'], collaboration_rounds)
+        return plan
+
     def collaborate_on_query(self, query: str, max_agents: int = 6,
-                           collaboration_rounds: int = 3) -> str:
-        """Run collaborative analysis on a query"""
+                           collaboration_rounds: int = 3, cqb_session_id: str = None,
+                           agents: List = None, hierarchical: bool = False,
+                           subteam_size: int = 4, topology: str = "full",
+                           topology_k: int = 2, topology_seed: int = None,
+                           synthesis_mode: str = "excerpt", adaptive_pruning: bool = False,
+                           redundancy_threshold: float = 0.5, redundancy_patience: int = 2,
+                           auto_size: bool = False, compute_budget: int = None,
+                           deadline: float = None, cancel_token=None) -> str:
+        """Run collaborative analysis on a query
+
+        Args:
+            query: Query to collaborate on
+            max_agents: Team size when a new team is generated
+            collaboration_rounds: Number of collaboration rounds
+            cqb_session_id: Reuse the team of an existing CQB session
+            agents: Reuse an explicit list of CQB agents
+            hierarchical: Deliberate in sub-teams that share compact summaries
+                (keeps prompts bounded for 32-64 agent teams)
+            subteam_size: Agents per sub-team in hierarchical mode
+            topology: Whose responses each agent reads between rounds - "full",
+                "ring", "knn" (by specialty), "random" (k-regular) or "star"
+            topology_k: Neighbors per agent for ring, knn and random topologies
+            topology_seed: Seed for the random topology
+            synthesis_mode: "excerpt" (first 200 chars of each response) or "tree"
+                (map-reduce summaries sized to the synthesizer's context length)
+            adaptive_pruning: Retire agents whose responses keep duplicating a
+                teammate's from later rounds (flat collaboration only)
+            redundancy_threshold: Estimated Jaccard similarity (MinHash over word
+                shingles) at which a response counts as redundant
+            redundancy_patience: Consecutive redundant rounds before an agent is retired
+            auto_size: Choose team size, rounds and per-response max_tokens from query
+                and context complexity; max_agents and collaboration_rounds become caps
+            compute_budget: Optional generated-token budget for the auto-sized run
+            deadline: Optional seconds the whole call may take. Team setup gets a
+                latency budget (skipping LLM extraction when tight), agents, rounds
+                and max_tokens are fitted to the measured decode rate, synthesis
+                time is reserved, and rounds or agents that no longer fit are
+                skipped; the session is then marked partial
+            cancel_token: Optional CancelToken. Checked between phases, rounds and
+                agents, and passed to generation (including the team's context
+                extraction and analysis) so running requests stop at the next
+                chunked step; the rounds completed so far are kept, synthesis
+                is skipped and the session is stored marked cancelled and partial
+        """
 
         print(f"\n🤝 Starting Agent Collaboration")
         print("=" * 50)
         print(f"Query: {query[:100]}...")
 
         session_start = time.time()
-
-        # 1. Get agents from CQB brain
-        print(f"🧠 Requesting agents from CQB...")
-        cqb_session_id = self.cqb_brain.analyze_query_and_generate_agents(query, max_agents)
-        agents = self.cqb_brain.get_agents(cqb_session_id)
+        deadline_at = session_start + deadline if deadline else None
+        budget_notes = []
+
+        latency_budget = None
+        if deadline_at and not (agents or cqb_session_id):
+            # Setup may use what is left after a minimal round and the synthesis
+            model_manager = self.cqb_brain.model_manager
+            setup_reserve = 2 * self.deadline_safety_factor * model_manager.estimate_generation_seconds(
+                model_manager.resolve_model('synthesis', 'conservative_model'), self.deadline_synthesis_tokens)
+            latency_budget = max(0.0, deadline - setup_reserve)
+            print(f"⏱️ Deadline {deadline:.1f}s: {latency_budget:.1f}s latency budget for team setup")
+
+        # 1. Get agents from CQB brain (or reuse an existing team)
+        cqb_session_id, agents = self._resolve_agents(
+            query, max_agents, cqb_session_id, agents, auto_size, compute_budget, latency_budget,
+            cancel_token
+        )
 
         print(f"✅ Received {len(agents)} agents from CQB")
+        if self._is_cancelled(cancel_token):
+            budget_notes.append("cancelled after team setup")
+
+        compute_plan = None
+        if auto_size:
+            compute_plan = self._resolve_compute_plan(
+                query, agents, cqb_session_id, collaboration_rounds, compute_budget
+            )
+            agents = balanced_team(agents, compute_plan['agents'])
+            collaboration_rounds = compute_plan['rounds']
+            print(f"📐 Auto-sized: {len(agents)} agents, {collaboration_rounds} rounds, "
+                  f"{compute_plan['max_tokens']} max tokens per response")
+        response_tokens = compute_plan['max_tokens'] if compute_plan else None
+
+        synthesis_tokens = None
+        round_cutoff = None
+        if deadline_at:
+            if synthesis_mode == "tree" and not hierarchical:
+                budget_notes.append("tree synthesis replaced by excerpts to bound synthesis time")
+                synthesis_mode = "excerpt"
+            synthesis_tokens = self.deadline_synthesis_tokens
+            round_cutoff = deadline_at - self._synthesis_reserve_seconds(agents, synthesis_tokens, hierarchical)
+
+            model_manager = self.cqb_brain.model_manager
+            requested = (len(agents), collaboration_rounds,
+                         response_tokens or max(c.max_tokens for c in model_manager.model_configs.values()))
+            fitted = fit_to_budget(
+                *requested, round_cutoff - time.time(),
+                cost=lambda n, r, t: r * self._estimate_round_seconds(balanced_team(agents, n), t, hierarchical),
+                min_tokens=128
+            )
+            if fitted[3]:
+                agents = balanced_team(agents, fitted[0])
+                collaboration_rounds, response_tokens = fitted[1], fitted[2]
+                budget_notes.append(
+                    f"fitted to deadline: {requested[0]}->{fitted[0]} agents, "
+                    f"{requested[1]}->{fitted[1]} rounds, {requested[2]}->{fitted[2]} max tokens"
+                )
+                print(f"⏱️ Fitted to deadline: {len(agents)} agents, {collaboration_rounds} rounds, "
+                      f"{response_tokens} max tokens")
 
         # 2. Create collaboration session
         collab_session_id = str(uuid.uuid4())
@@ -64,31 +349,121 @@ class AgentCollaborationModule:
             query=query,
             cqb_session_id=cqb_session_id,
             agents_involved=[agent.agent_id for agent in agents],
-            rounds=[]
+            rounds=[],
+            synthesis_mode="tree" if hierarchical else synthesis_mode,
+            compute_plan=compute_plan,
+            deadline=deadline,
+            budget_notes=budget_notes
         )
 
+        subteams = self._form_subteams(agents, subteam_size) if hierarchical else {}
+        session.subteams = {name: [a.agent_id for a in members] for name, members in subteams.items()}
+
+        neighbors = None if subteams else build_topology(agents, topology, topology_k, topology_seed)
+        session.topology = topology if neighbors else ("hierarchical" if subteams else "full")
+        session.topology_neighbors = neighbors
+        if neighbors:
+            print(f"🕸️ Using {topology} topology ({topology_k} neighbors per agent)")
+
+        if adaptive_pruning and subteams:
+            print(f"⚠️ Adaptive pruning applies to flat collaboration only - disabled")
+            adaptive_pruning = False
+
         # 3. Run collaboration rounds
+        active_agents = list(agents)
+        redundant_streaks: Dict[str, int] = {}
         for round_num in range(collaboration_rounds):
-            round_result = self._run_collaboration_round(
-                agents, query, round_num + 1, session.rounds
-            )
+            if self._is_cancelled(cancel_token):
+                if not session.budget_notes or not session.budget_notes[-1].startswith("cancelled"):
+                    session.budget_notes.append(f"cancelled before round {round_num + 1} of {collaboration_rounds}")
+                break
+
+            if round_cutoff and not self._round_fits(active_agents, response_tokens, round_cutoff, bool(subteams)):
+                session.budget_notes.append(
+                    f"stopped before round {round_num + 1} of {collaboration_rounds} to meet the deadline"
+                )
+                print(f"⏱️ Skipping remaining rounds to leave time for synthesis")
+                break
+
+            if subteams:
+                round_result = self._run_hierarchical_round(
+                    subteams, query, round_num + 1, session.rounds, response_tokens, cancel_token
+                )
+            else:
+                round_result = self._run_collaboration_round(
+                    active_agents, query, round_num + 1, session.rounds, neighbors,
+                    response_tokens, round_cutoff, cancel_token
+                )
             session.rounds.append(round_result)
+            if round_result.skipped_agents and not round_result.cancelled:
+                session.budget_notes.append(
+                    f"round {round_num + 1}: {len(round_result.skipped_agents)} agents skipped to meet the deadline"
+                )
+
+            if round_result.cancelled:
+                session.budget_notes.append(f"cancelled during round {round_num + 1}")
+                break
+
+            if adaptive_pruning and round_num + 1 < collaboration_rounds:
+                active_agents = self._retire_redundant_agents(
+                    session, round_result, active_agents, redundant_streaks,
+                    redundancy_threshold, redundancy_patience
+                )
 
         # 4. Generate final synthesis
-        session.final_synthesis = self._synthesize_collaboration(agents, query, session.rounds)
+        if self._is_cancelled(cancel_token):
+            session.cancelled = True
+            session.cancel_reason = cancel_token.reason
+            if not any(note.startswith("cancelled") for note in session.budget_notes):
+                session.budget_notes.append("cancelled before synthesis")
+            print(f"🛑 Collaboration cancelled ({cancel_token.reason}) - keeping "
+                  f"{len(session.rounds)} rounds, synthesis skipped")
+        elif subteams:
+            session.final_synthesis = self._synthesize_hierarchical(
+                subteams, query, session.rounds, synthesis_tokens
+            )
+        else:
+            session.final_synthesis = self._synthesize_collaboration(
+                agents, query, session.rounds, synthesis_mode, synthesis_tokens
+            )
         session.total_duration = time.time() - session_start
+        session.partial = bool(session.budget_notes)
+
+        if deadline:
+            status = "met" if session.total_duration <= deadline else "missed"
+            print(f"⏱️ Deadline {deadline:.1f}s {status} ({session.total_duration:.1f}s"
+                  f"{', partial result' if session.partial else ''})")
 
         # 5. Store session
         self.active_collaborations[collab_session_id] = session
 
+        if session.cancelled:
+            return collab_session_id
+
         print(f"✅ Collaboration complete in {session.total_duration:.1f}s")
-        print(f"📊 {len(session.rounds)} rounds, {len(agents)} agents")
+        if session.retired_agents:
+            print(f"🪦 Retired {len(session.retired_agents)} redundant agents, "
+                  f"saving {self._retired_agent_rounds(session)} agent-rounds")
+        print(f"📊 {len(session.rounds)} rounds, {len(agents)} agents, "
+              f"{sum(sum(r.prompt_tokens.values()) for r in session.rounds)} round prompt tokens "
+              f"({session.topology} topology)")
 
         return collab_session_id
 
     def _run_collaboration_round(self, agents, query: str, round_num: int,
-                               previous_rounds: List[CollaborationRound]) -> CollaborationRound:
-        """Run a single round of collaboration"""
+                               previous_rounds: List[CollaborationRound],
+                               neighbors: Dict[str, List[str]] = None,
+                               max_tokens: int = None,
+                               cutoff: float = None,
+                               cancel_token=None) -> CollaborationRound:
+        """Run a single round of collaboration
+
+        With a sparse topology (neighbors map), each agent's team context holds
+        only its own and its neighbors' previous responses. max_tokens caps each
+        response (auto-sized and deadline runs). With a cutoff time, agents whose
+        estimated generation would end after it are skipped. Once the cancel
+        token is set, remaining agents are skipped and the round marked cancelled.
+        """
 
         print(f"🔄 Round {round_num}: Agent Collaboration")
 
@@ -96,15 +471,37 @@ class AgentCollaborationModule:
         round_id = str(uuid.uuid4())
 
         # Build context from previous rounds
-        context = self._build_round_context(query, previous_rounds, round_num)
+        shared_context = self._build_round_context(query, previous_rounds, round_num)
+        contexts = {}
 
         # Get responses from all agents
         responses = {}
+        prompt_tokens = {}
+        skipped = []
+        cancelled = False
         for agent in agents:
+            if self._is_cancelled(cancel_token):
+                cancelled = True
+                skipped.append(agent.agent_id)
+                continue
+
+            if cutoff and time.time() + self._estimate_response_seconds(agent, max_tokens) > cutoff:
+                skipped.append(agent.agent_id)
+                continue
+
+            if neighbors is None or round_num == 1:
+                context = shared_context
+            else:
+                visible = [agent.agent_id] + neighbors.get(agent.agent_id, [])
+                context = self._build_round_context(query, previous_rounds, round_num, visible)
+                contexts[agent.agent_id] = context
             try:
                 prompt = self._create_round_prompt(query, round_num, context)
-                response = agent.generate_response(prompt, {'team_context': context})
+                prompt_tokens[agent.agent_id] = _count_prompt_tokens(agent, prompt, {'team_context': context})
+                response = agent.generate_response(prompt, {'team_context': context}, max_tokens,
+                                                   cancel_token=cancel_token)
                 responses[agent.agent_id] = response
+                cancelled = cancelled or self._is_cancelled(cancel_token)
                 print(f"   ✅ {agent.agent_id}: {len(response)} chars")
 
             except Exception as e:
@@ -113,17 +510,146 @@ class AgentCollaborationModule:
 
         round_duration = time.time() - round_start
 
+        if contexts:
+            round_context = "\n\n".join(f"[{agent_id}]\n{context}" for agent_id, context in contexts.items())
+        else:
+            round_context = shared_context
+
+        print(f"   📏 {sum(prompt_tokens.values())} prompt tokens this round")
+        if cancelled:
+            print(f"   🛑 Round cancelled: {len(responses)} responses kept, {len(skipped)} agents skipped")
+        elif skipped:
+            print(f"   ⏱️ Skipped {len(skipped)} agents to meet the deadline")
+
         return CollaborationRound(
             round_id=round_id,
             round_type=f"collaboration_round_{round_num}",
             agent_responses=responses,
-            round_context=context,
-            duration=round_duration
+            round_context=round_context,
+            duration=round_duration,
+            prompt_tokens=prompt_tokens,
+            skipped_agents=skipped,
+            cancelled=cancelled
         )
 
+    def _estimate_response_seconds(self, agent, max_tokens: int = None, model_id: str = None) -> float:
+        """Worst-case seconds for one response of the agent (padded by the safety factor)"""
+        model_manager = self.cqb_brain.model_manager
+        model_id = model_id or agent.spec.model_assignment
+        if max_tokens is None:
+            config = model_manager.model_configs.get(model_id)
+            max_tokens = config.max_tokens if config else 1024
+        return self.deadline_safety_factor * model_manager.estimate_generation_seconds(model_id, max_tokens)
+
+    def _estimate_round_seconds(self, agents: List, max_tokens: int = None, batched: bool = False) -> float:
+        """Worst-case seconds for a round
+
+        Flat rounds generate one agent after another. Batched (hierarchical)
+        rounds run max_num_seqs sequences at a time per model, then one batched
+        summary step.
+        """
+        if not batched:
+            return sum(self._estimate_response_seconds(agent, max_tokens) for agent in agents)
+
+        model_manager = self.cqb_brain.model_manager
+        by_model: Dict[str, List] = {}
+        for agent in agents:
+            by_model.setdefault(agent.spec.model_assignment, []).append(agent)
+
+        seconds = 0.0
+        for model_id, members in by_model.items():
+            config = model_manager.model_configs.get(model_id)
+            waves = math.ceil(len(members) / max(1, config.max_num_seqs if config else 1))
+            seconds += waves * self._estimate_response_seconds(members[0], max_tokens)
+            seconds += self._estimate_response_seconds(
+                members[0], self.subteam_summary_tokens,
+                model_manager.resolve_model('summarization', model_id)
+            )
+        return seconds
+
+    def _synthesis_reserve_seconds(self, agents: List, synthesis_tokens: int, hierarchical: bool) -> float:
+        """Time kept free for the final synthesis (plus one reduction level when hierarchical)"""
+        conservative = [a for a in agents if a.agent_type == "Conservative"]
+        synthesizer = conservative[0] if conservative else agents[0]
+        reserve = self._estimate_response_seconds(synthesizer, synthesis_tokens,
+                                                  self._synthesis_model(synthesizer))
+        if hierarchical:
+            reserve += self._estimate_response_seconds(
+                synthesizer, self.subteam_summary_tokens,
+                self.cqb_brain.model_manager.resolve_model('summarization', synthesizer.spec.model_assignment)
+            )
+        return reserve
+
+    def _is_cancelled(self, cancel_token) -> bool:
+        return cancel_token is not None and cancel_token.cancelled
+
+    def _round_fits(self, agents: List, max_tokens: int, cutoff: float, batched: bool) -> bool:
+        """Whether a round can still finish before the cutoff (flat rounds need one agent to fit)"""
+        remaining = cutoff - time.time()
+        if batched:
+            return self._estimate_round_seconds(agents, max_tokens, batched=True) <= remaining
+        return any(self._estimate_response_seconds(agent, max_tokens) <= remaining for agent in agents)
+
+    def _retire_redundant_agents(self, session: CollaborationSession,
+                                 round_result: CollaborationRound, active_agents: List,
+                                 streaks: Dict[str, int], threshold: float,
+                                 patience: int) -> List:
+        """Score this round's responses for redundancy and retire persistent duplicates
+
+        An agent's redundancy is its highest estimated Jaccard similarity to any
+        active teammate. After `patience` redundant rounds in a row it is retired,
+        provided a teammate it duplicated stays active (so one of each redundant
+        pair always survives) and at least two agents remain.
+
+        Returns:
+            Agents that take part in the next round
+        """
+        signatures = {
+            agent_id: minhash_signature(response)
+            for agent_id, response in round_result.agent_responses.items()
+            if not response.startswith("Error:")
+        }
+        ids = [a.agent_id for a in active_agents if a.agent_id in signatures]
+        similarity = {
+            (i, j): estimate_jaccard(signatures[i], signatures[j])
+            for i in ids for j in ids if i != j
+        }
+
+        for agent_id in ids:
+            score = max((similarity[(agent_id, j)] for j in ids if j != agent_id), default=0.0)
+            round_result.redundancy[agent_id] = round(score, 3)
+            streaks[agent_id] = streaks.get(agent_id, 0) + 1 if score >= threshold else 0
+
+        # The star hub relays everyone's responses, so it is never retired
+        protected = set()
+        if session.topology == "star" and session.topology_neighbors:
+            neighbors = session.topology_neighbors
+            protected.add(max(neighbors, key=lambda agent_id: len(neighbors[agent_id])))
+
+        remaining = list(ids)
+        for agent_id in reversed(ids):
+            if streaks.get(agent_id, 0) < patience or agent_id in protected or len(remaining) <= 2:
+                continue
+            covered_by = [j for j in remaining if j != agent_id and similarity[(agent_id, j)] >= threshold]
+            if covered_by:
+                remaining.remove(agent_id)
+                round_result.retired_agents.append(agent_id)
+                session.retired_agents[agent_id] = len(session.rounds)
+                print(f"   🪦 Retiring {agent_id} (redundant with {covered_by[0]}, "
+                      f"similarity {similarity[(agent_id, covered_by[0])]:.2f})")
+
+        return [a for a in active_agents if a.agent_id not in round_result.retired_agents]
+
+    def _retired_agent_rounds(self, session: CollaborationSession) -> int:
+        """Agent-rounds skipped because agents were retired"""
+        return sum(len(session.rounds) - last_round for last_round in session.retired_agents.values())
+
     def _build_round_context(self, query: str, previous_rounds: List[CollaborationRound],
-                           round_num: int) -> str:
-        """Build context for current round - MEANINGFUL context for collaboration"""
+                           round_num: int, visible_agents: List[str] = None) -> str:
+        """Build context for current round - MEANINGFUL context for collaboration
+
+        visible_agents limits the discussion to those agents' responses (sparse topologies).
+        """
 
         if round_num == 1:
             return f"Initial analysis of: {query}"
@@ -135,6 +661,8 @@ class AgentCollaborationModule:
         for i, round_result in enumerate(previous_rounds[-2:], 1):  # Last 2 rounds
             context += f"\nRound {len(previous_rounds) - 2 + i} Key Points:\n"
             for agent_id, response in round_result.agent_responses.items():
+                if visible_agents is not None and agent_id not in visible_agents:
+                    continue
                 # Take first 300 characters - enough to be meaningful
                 summary = response[:300] + "..." if len(response) > 300 else response
                 context += f"- {agent_id}: {summary}\n"
@@ -176,7 +704,9 @@ For this final round, provide your conclusive analysis and recommendations. Cons
 - Practical next steps or implementation considerations"""
 
     def _synthesize_collaboration(self, agents, query: str,
-                                rounds: List[CollaborationRound]) -> str:
+                                rounds: List[CollaborationRound],
+                                synthesis_mode: str = "excerpt",
+                                max_tokens: int = None) -> str:
         """Synthesize the collaboration - FIX: Don't include all full responses"""
 
         print(f"🔄 Synthesizing collaboration results...")
@@ -189,15 +719,34 @@ For this final round, provide your conclusive analysis and recommendations. Cons
         synthesis_context = f"Query: {query}\n\n"
         synthesis_context += "Team Collaboration Key Insights:\n"
 
-        # For each round, extract the core points instead of full responses
-        for i, round_result in enumerate(rounds, 1):
-            synthesis_context += f"\nRound {i} Key Insights:\n"
-            for agent_id, response in round_result.agent_responses.items():
-                # Take meaningful excerpts - 200 chars should capture key points
-                key_excerpt = response[:200] + "..." if len(response) > 200 else response
-                synthesis_context += f"• {agent_id}: {key_excerpt}\n"
+        if synthesis_mode == "tree":
+            # Full responses, summarized level by level only as far as the context requires
+            items = [
+                (f"Round {i} - {agent_id}", response)
+                for i, round_result in enumerate(rounds, 1)
+                for agent_id, response in round_result.agent_responses.items()
+            ]
+            synthesis_context += self._reduce_for_synthesis(synthesizer, query, items, synthesis_context)
+        else:
+            # For each round, extract the core points instead of full responses
+            for i, round_result in enumerate(rounds, 1):
+                synthesis_context += f"\nRound {i} Key Insights:\n"
+                for agent_id, response in round_result.agent_responses.items():
+                    # Take meaningful excerpts - 200 chars should capture key points
+                    key_excerpt = response[:200] + "..." if len(response) > 200 else response
+                    synthesis_context += f"• {agent_id}: {key_excerpt}\n"
+
+        synthesis = synthesizer.generate_response(self._build_synthesis_prompt(synthesis_context),
+                                                  max_tokens=max_tokens,
+                                                  model_id=self._synthesis_model(synthesizer))
+
+        print(f"✅ Synthesis complete: {len(synthesis)} characters")
 
-        synthesis_prompt = f"""{synthesis_context}
+        return synthesis
+
+    def _build_synthesis_prompt(self, synthesis_context: str) -> str:
+        """Final synthesis prompt around the collected insights"""
+        return f"""{synthesis_context}
 
 Based on this team collaboration, provide a comprehensive synthesized analysis that:
 
@@ -208,7 +757,177 @@ Based on this team collaboration, provide a comprehensive synthesized analysis t
 
 Create a unified response that captures the collective expertise of the team."""
 
-        synthesis = synthesizer.generate_response(synthesis_prompt)
+    def _synthesis_model(self, synthesizer) -> str:
+        """Model the final synthesis runs on (synthesis route, else the synthesizer's own)"""
+        return self.cqb_brain.model_manager.resolve_model('synthesis', synthesizer.spec.model_assignment)
+
+    def _reduce_for_synthesis(self, synthesizer, query: str, items: List[Tuple[str, str]],
+                              synthesis_context: str) -> str:
+        """Tree-reduce labelled texts until they fit the synthesis prompt"""
+        reducer = TreeReducer(synthesizer, summary_tokens=self.subteam_summary_tokens,
+                              final_model_id=self._synthesis_model(synthesizer))
+        reduced = reducer.reduce(
+            query, items, self._build_synthesis_prompt(synthesis_context),
+            "Summarize the key insights, recommendations and disagreements above in at most "
+            "6 short bullet points, naming the agents or groups they came from."
+        )
+        print(f"   🌲 {len(items)} texts reduced to {len(reduced)} in {reducer.levels} levels")
+        return "".join(f"\n{label}:\n{text}\n" for label, text in reduced)
+
+    # -------------------------------------------------------------------------
+    # Hierarchical Sub-Team Collaboration
+    # -------------------------------------------------------------------------
+
+    def _form_subteams(self, agents, subteam_size: int) -> Dict[str, List]:
+        """Split agents into sub-teams, interleaved so each mixes conservative and innovative agents"""
+        team_count = max(1, math.ceil(len(agents) / max(1, subteam_size)))
+        subteams = {f"SubTeam_{k + 1}": agents[k::team_count] for k in range(team_count)}
+
+        print(f"🧩 Formed {len(subteams)} sub-teams of up to {subteam_size} agents")
+        return subteams
+
+    def _run_hierarchical_round(self, subteams: Dict[str, List], query: str, round_num: int,
+                                previous_rounds: List[CollaborationRound],
+                                max_tokens: int = None, cancel_token=None) -> CollaborationRound:
+        """Run one round with every sub-team deliberating in the same batched step
+
+        If the cancel token is set during the step, the partial responses are
+        kept and the sub-team summaries are skipped.
+        """
+
+        print(f"🔄 Round {round_num}: Hierarchical Collaboration ({len(subteams)} sub-teams)")
+
+        round_start = time.time()
+        round_id = str(uuid.uuid4())
+
+        # Each sub-team sees its own discussion plus the other sub-teams' summaries
+        tasks = []
+        contexts = {}
+        for name, members in subteams.items():
+            context = self._build_subteam_context(query, name, members, previous_rounds, round_num)
+            contexts[name] = context
+            prompt = self._create_round_prompt(query, round_num, context)
+            tasks.extend((agent, prompt, {'team_context': context}) for agent in members)
+
+        prompt_tokens = {agent.agent_id: _count_prompt_tokens(agent, prompt, context)
+                         for agent, prompt, context in tasks}
+
+        model_manager = self.cqb_brain.model_manager
+        responses = {}
+        for (agent, _, _), response in zip(tasks, generate_agent_responses(model_manager, tasks, max_tokens,
+                                                                            cancel_token=cancel_token)):
+            responses[agent.agent_id] = response
+            print(f"   ✅ {agent.agent_id}: {len(response)} chars")
+
+        cancelled = self._is_cancelled(cancel_token)
+        if cancelled:
+            print(f"   🛑 Round cancelled: {len(responses)} partial responses kept, summaries skipped")
+            summaries = {}
+        else:
+            summaries = self._summarize_subteams(subteams, query, responses, round_num)
+
+        return CollaborationRound(
+            round_id=round_id,
+            round_type=f"hierarchical_round_{round_num}",
+            agent_responses=responses,
+            round_context="\n\n".join(f"[{name}]\n{context}" for name, context in contexts.items()),
+            duration=time.time() - round_start,
+            subteam_summaries=summaries,
+            prompt_tokens=prompt_tokens,
+            cancelled=cancelled
+        )
+
+    def _build_subteam_context(self, query: str, subteam_name: str, members: List,
+                               previous_rounds: List[CollaborationRound], round_num: int) -> str:
+        """Build a sub-team's round context
+
+        Grows with the sub-team's own members only. Other sub-teams' summaries
+        share one cross_team_summary_tokens budget: more sub-teams means shorter
+        excerpts, and past ~20 tokens each only the sub-teams that follow this
+        one are shown, so the context does not grow with the number of sub-teams.
+        """
+
+        if round_num == 1:
+            return f"Initial analysis of: {query}"
+
+        previous = previous_rounds[-1]
+        context = f"Query: {query}\n\n"
+        context += f"{subteam_name} discussion (Round {round_num - 1}):\n"
+
+        for agent in members:
+            response = previous.agent_responses.get(agent.agent_id, "")
+            summary = response[:300] + "..." if len(response) > 300 else response
+            context += f"- {agent.agent_id}: {summary}\n"
+
+        names = list(previous.subteam_summaries)
+        if subteam_name in names:
+            position = names.index(subteam_name)
+            names = names[position + 1:] + names[:position]
+        if names:
+            # ~4 characters per token, as in _count_prompt_tokens
+            budget_chars = self.cross_team_summary_tokens * 4
+            shown = names[:max(1, budget_chars // 80)]
+            line_chars = budget_chars // len(shown)
+            context += "\nOther sub-team summaries:\n"
+            for name in shown:
+                label = f"- {name}: "
+                summary = previous.subteam_summaries[name]
+                room = max(0, line_chars - len(label))
+                excerpt = summary[:room] + "..." if len(summary) > room else summary
+                context += f"{label}{excerpt}\n"
+
+        context += f"\nRound {round_num}: Build upon and refine the team's analysis."
+
+        return context
+
+    def _summarize_subteams(self, subteams: Dict[str, List], query: str,
+                            responses: Dict[str, str], round_num: int) -> Dict[str, str]:
+        """Have each sub-team condense its round into a compact summary (batched)"""
+
+        tasks = []
+        for name, members in subteams.items():
+            conservative = [a for a in members if a.agent_type == "Conservative"]
+            summarizer = conservative[0] if conservative else members[0]
+
+            excerpts = ""
+            for agent in members:
+                response = responses.get(agent.agent_id, "")
+                excerpt = response[:400] + "..." if len(response) > 400 else response
+                excerpts += f"- {agent.agent_id}: {excerpt}\n"
+
+            prompt = f"""Query: {query}
+
+Round {round_num} analysis from {name}:
+{excerpts}
+Summarize this sub-team's key findings, points of agreement and open disagreements in at most 5 short bullet points. The summary will be shared with the other sub-teams."""
+            tasks.append((summarizer, prompt, None))
+
+        model_manager = self.cqb_brain.model_manager
+        summaries = generate_agent_responses(model_manager, tasks,
+                                             max_tokens=self.subteam_summary_tokens,
+                                             model_id=model_manager.resolve_model('summarization'))
+        print(f"   📝 {len(summaries)} sub-team summaries shared upward")
+        return dict(zip(subteams.keys(), summaries))
+
+    def _synthesize_hierarchical(self, subteams: Dict[str, List], query: str,
+                                 rounds: List[CollaborationRound], max_tokens: int = None) -> str:
+        """Synthesize by tree reduction over the final sub-team summaries"""
+
+        print(f"🔄 Synthesizing {len(subteams)} sub-team summaries by tree reduction...")
+
+        all_agents = [agent for members in subteams.values() for agent in members]
+        conservative_agents = [a for a in all_agents if a.agent_type == "Conservative"]
+        synthesizer = conservative_agents[0] if conservative_agents else all_agents[0]
+
+        synthesis_context = f"Query: {query}\n\n"
+        synthesis_context += "Sub-Team Key Insights:\n"
+
+        summaries = list(rounds[-1].subteam_summaries.items()) if rounds else []
+        synthesis_context += self._reduce_for_synthesis(synthesizer, query, summaries, synthesis_context)
+
+        synthesis = synthesizer.generate_response(self._build_synthesis_prompt(synthesis_context),
+                                                  max_tokens=max_tokens,
+                                                  model_id=self._synthesis_model(synthesizer))
 
         print(f"✅ Synthesis complete: {len(synthesis)} characters")
 
@@ -227,6 +946,7 @@ Create a unified response that captures the collective expertise of the team."""
             'rounds_completed': len(session.rounds),
             'total_duration': session.total_duration,
             'final_synthesis': session.final_synthesis,
+            'cancelled': session.cancelled,
             'round_details': [
                 {
                     'round_number': i + 1,
@@ -273,9 +993,12 @@ Agents Involved:
             cqb_info = self.cqb_brain.get_session_info(session.cqb_session_id)
             agent_details = {agent['agent_id']: agent for agent in cqb_info['agents']}
             license_manifest = cqb_info.get('license_manifest', {})
+            agents_pruned = cqb_info.get('agents_pruned', 0)
         except:
             agent_details = {}
             license_manifest = {}
+            agents_pruned = 0
+        model_routing = self.cqb_brain.model_manager.get_model_routing()
 
         return {
             'collaboration_session': {
@@ -284,7 +1007,18 @@ Agents Involved:
                 'cqb_session_id': session.cqb_session_id,
                 'total_duration_seconds': session.total_duration,
                 'rounds_completed': len(session.rounds),
-                'agents_involved': session.agents_involved
+                'agents_involved': session.agents_involved,
+                'subteams': session.subteams,
+                'topology': session.topology,
+                'topology_neighbors': session.topology_neighbors,
+                'retired_agents': session.retired_agents,
+                'compute_plan': session.compute_plan,
+                'deadline_seconds': session.deadline,
+                'partial': session.partial,
+                'budget_notes': session.budget_notes,
+                'cancelled': session.cancelled,
+                'cancel_reason': session.cancel_reason,
+                'model_routing': model_routing
             },
             'agents': agent_details,
             'collaboration_rounds': [
@@ -294,7 +1028,13 @@ Agents Involved:
                     'round_type': round_result.round_type,
                     'duration_seconds': round_result.duration,
                     'context_provided': round_result.round_context[:500] + "..." if len(round_result.round_context) > 500 else round_result.round_context,
-                    'agent_responses': round_result.agent_responses
+                    'agent_responses': round_result.agent_responses,
+                    'subteam_summaries': round_result.subteam_summaries,
+                    'prompt_tokens': sum(round_result.prompt_tokens.values()),
+                    'redundancy': round_result.redundancy,
+                    'retired_agents': round_result.retired_agents,
+                    'skipped_agents': round_result.skipped_agents,
+                    'cancelled': round_result.cancelled
                 }
                 for i, round_result in enumerate(session.rounds)
             ],
@@ -307,7 +1047,11 @@ Agents Involved:
                     sum(len(resp) for resp in r.agent_responses.values()) 
                     for r in session.rounds
                 ) / max(1, sum(len(r.agent_responses) for r in session.rounds)),
-                'reasoning_type': 'collaborative'
+                'reasoning_type': 'hierarchical_collaborative' if session.subteams else 'collaborative',
+                'token_accounting': self._token_accounting(session),
+                'synthesis_mode': session.synthesis_mode,
+                'agent_rounds_saved': agents_pruned * len(session.rounds) + self._retired_agent_rounds(session),
+                'deadline_met': session.total_duration <= session.deadline if session.deadline else None
             },
             'license_manifest': license_manifest,
             'compliance_info': {
@@ -317,6 +1061,17 @@ Agents Involved:
             }
         }  
 
+    def _token_accounting(self, session: CollaborationSession) -> Dict[str, Any]:
+        """Round prompt (prefill) tokens for the session's topology"""
+        per_round = [sum(r.prompt_tokens.values()) for r in session.rounds]
+        agent_prompts = sum(len(r.prompt_tokens) for r in session.rounds)
+        return {
+            'topology': session.topology,
+            'round_prompt_tokens': per_round,
+            'total_prompt_tokens': sum(per_round),
+            'average_prompt_tokens_per_agent': sum(per_round) / max(1, agent_prompts)
+        }
+
     def save_collaboration_json(self, collab_session_id: str, filename: str = None) -> str:
         """Save collaboration results to JSON file"""
         import json
@@ -0,0 +1,190 @@
+# =============================================================================
+# Compute Planner - Complexity-Driven Team Size, Rounds and Token Budgets
+# =============================================================================
+
+import math
+import re
+from typing import Any, Callable, Dict, Optional, Tuple
+from dataclasses import dataclass, asdict
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+# Phrasings that usually call for several perspectives or trade-off reasoning
+_COMPLEXITY_CUES = (
+    'compare', 'trade-off', 'tradeoff', 'versus', ' vs ', 'strategy', 'strategic',
+    'prioritize', 'priority', 'risk', 'long-term', 'implications', 'why', 'design'
+)
+
+# Complexity levels reported by the EAO domain analysis
+_LEVEL_SCORES = {'low': 0.2, 'medium': 0.5, 'high': 0.85}
+
+@dataclass
+class ComputePlan:
+    """Team size, rounds and per-response token limit for one query"""
+    agents: int
+    rounds: int
+    max_tokens: int
+    complexity: float
+    compute_budget: Optional[int] = None
+    estimated_tokens: int = 0
+    reason: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+# =============================================================================
+# Complexity Scoring
+# =============================================================================
+
+def score_query_complexity(query: str) -> float:
+    """Complexity of the query text alone in [0, 1]
+
+    Longer queries, multi-part questions and trade-off cues score higher.
+    """
+    words = _WORD_PATTERN.findall(query.lower())
+    length_score = min(1.0, len(words) / 40)
+
+    parts = max(1, query.count('?')) + query.lower().count(' and ')
+    parts_score = min(1.0, (parts - 1) / 3)
+
+    lowered = f" {query.lower()} "
+    cue_score = min(1.0, sum(1 for cue in _COMPLEXITY_CUES if cue in lowered) / 3)
+
+    return 0.45 * length_score + 0.25 * parts_score + 0.3 * cue_score
+
+def score_context_complexity(context_analysis: Dict[str, Any]) -> float:
+    """Complexity of the extracted context in [0, 1]
+
+    Combines the EAO complexity level with how many extraction categories the
+    context spreads over (effective count from the distribution's entropy).
+    """
+    level_score = _LEVEL_SCORES.get(context_analysis.get('complexity_level', 'medium'), 0.5)
+
+    distribution = context_analysis.get('category_distribution') or {}
+    total = sum(distribution.values())
+    if total:
+        entropy = -sum((count / total) * math.log(count / total)
+                       for count in distribution.values() if count)
+        diversity_score = min(1.0, (math.exp(entropy) - 1) / 5)
+    else:
+        diversity_score = 0.5
+
+    return 0.6 * level_score + 0.4 * diversity_score
+
+def score_complexity(query: str, context_analysis: Dict[str, Any] = None) -> float:
+    """Overall complexity in [0, 1] from the query and (optionally) its context analysis"""
+    query_score = score_query_complexity(query)
+    if not context_analysis:
+        return query_score
+    return 0.4 * query_score + 0.6 * score_context_complexity(context_analysis)
+
+# =============================================================================
+# Planning
+# =============================================================================
+
+def estimate_generated_tokens(agents: int, rounds: int, max_tokens: int) -> int:
+    """Worst-case generated tokens: every agent every round, plus the synthesis"""
+    return agents * rounds * max_tokens + max_tokens
+
+def fit_to_budget(agents: int, rounds: int, max_tokens: int, budget: float,
+                  cost: Callable[[int, int, int], float] = estimate_generated_tokens,
+                  min_tokens: int = 256, min_agents: int = 2) -> Tuple[int, int, int, bool]:
+    """Shrink a run until its cost fits the budget
+
+    Rounds are cut first, then the per-response token limit (to min_tokens),
+    then agents (to min_agents).
+
+    Args:
+        agents: Planned team size
+        rounds: Planned rounds
+        max_tokens: Planned per-response token limit
+        budget: Limit in the cost function's unit (tokens, seconds, ...)
+        cost: cost(agents, rounds, max_tokens) of a run
+
+    Returns:
+        (agents, rounds, max_tokens, trimmed)
+    """
+    min_tokens = min(min_tokens, max_tokens)
+    min_agents = min(min_agents, agents)
+    trimmed = False
+    while cost(agents, rounds, max_tokens) > budget:
+        if rounds > 1:
+            rounds -= 1
+        elif max_tokens > min_tokens:
+            max_tokens = max(min_tokens, int(max_tokens * 0.75) // 64 * 64)
+        elif agents > min_agents:
+            agents -= 1
+        else:
+            break
+        trimmed = True
+    return agents, rounds, max_tokens, trimmed
+
+def plan_compute(query: str, context_analysis: Dict[str, Any] = None,
+                 compute_budget: int = None, max_agents: int = 8, max_rounds: int = 3,
+                 max_tokens: int = 1024, min_tokens: int = 256,
+                 min_agents: int = 2) -> ComputePlan:
+    """Size a collaboration from query and context complexity
+
+    Args:
+        query: User query
+        context_analysis: RAO context analysis (complexity_level, category_distribution)
+        compute_budget: Optional limit on generated tokens for the whole run
+        max_agents: Largest team the plan may use
+        max_rounds: Most rounds the plan may use
+        max_tokens: Largest per-response token limit (usually the model's max_tokens)
+        min_tokens: Smallest per-response token limit
+        min_agents: Smallest team the plan may use
+
+    Returns:
+        ComputePlan; when over budget, rounds are cut first, then tokens, then agents
+    """
+    complexity = score_complexity(query, context_analysis)
+    max_agents = max(min_agents, max_agents)
+    min_tokens = min(min_tokens, max_tokens)
+
+    agents = max(min_agents, min(max_agents, round(min_agents + complexity * (max_agents - min_agents))))
+    rounds = max(1, min(max_rounds, 1 + int(complexity >= 0.35) + int(complexity >= 0.7)))
+    tokens = int(min_tokens + complexity * (max_tokens - min_tokens)) // 64 * 64
+    tokens = max(min_tokens, min(max_tokens, tokens))
+
+    reason = f"complexity {complexity:.2f}"
+    if compute_budget:
+        agents, rounds, tokens, trimmed = fit_to_budget(
+            agents, rounds, tokens, compute_budget, min_tokens=min_tokens, min_agents=min_agents
+        )
+        if trimmed:
+            reason += f", trimmed to fit {compute_budget} tokens"
+
+    return ComputePlan(
+        agents=agents,
+        rounds=rounds,
+        max_tokens=tokens,
+        complexity=round(complexity, 3),
+        compute_budget=compute_budget,
+        estimated_tokens=estimate_generated_tokens(agents, rounds, tokens),
+        reason=reason
+    )
+
+# =============================================================================
+# Usage Example
+# =============================================================================
+
+if __name__ == "__main__":
+    print("🧪 Testing Compute Planner")
+    print("=" * 40)
+
+    simple = plan_compute("What is our current cash runway?")
+    print(f"   simple: {simple.agents} agents, {simple.rounds} rounds, {simple.max_tokens} tokens ({simple.reason})")
+
+    context = {
+        'complexity_level': 'high',
+        'category_distribution': {'metric': 6, 'constraint': 4, 'stakeholder': 5, 'objective': 3, 'risk': 4}
+    }
+    query = ("Should we prioritize the enterprise partnership or fix technical debt first, "
+             "and what are the long-term risk implications for hiring and runway?")
+    hard = plan_compute(query, context)
+    print(f"   hard: {hard.agents} agents, {hard.rounds} rounds, {hard.max_tokens} tokens ({hard.reason})")
+
+    budgeted = plan_compute(query, context, compute_budget=8000)
+    print(f"   budgeted: {budgeted.agents} agents, {budgeted.rounds} rounds, "
+          f"{budgeted.max_tokens} tokens, ~{budgeted.estimated_tokens} ({budgeted.reason})")
@@ -0,0 +1,340 @@
+# =============================================================================
+# Context Corpus - Multi-Document Ingestion and Persistent Chunk Index for RAO
+# =============================================================================
+
+import os
+import glob
+import json
+import mmap
+import hashlib
+from typing import Dict, List, Optional, Any, Iterator
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor
+
+from context_retrieval import ContextChunk, chunk_document, content_hash
+
+CORPUS_INDEX_VERSION = 2
+DEFAULT_EXTENSIONS = ('.txt', '.md')
+
+# =============================================================================
+# Corpus Data Classes
+# =============================================================================
+
+@dataclass
+class ChunkSpan:
+    """Location of a chunk in its document; the text is read on demand"""
+    chunk_id: str
+    start: int
+    end: int
+    byte_start: int
+    byte_end: int
+    chunk_hash: str
+
+@dataclass
+class CorpusDocument:
+    """One ingested document and its chunk spans"""
+    path: str
+    mtime: float
+    size: int
+    document_hash: str
+    chunks: List[ChunkSpan] = field(default_factory=list)
+
+@dataclass
+class CorpusSnapshot:
+    """Documents matched by a corpus spec at ingestion time"""
+    spec: str
+    documents: List[CorpusDocument]
+    corpus_hash: str
+    new_or_changed: int = 0
+    corpus: Optional['ContextCorpus'] = field(default=None, repr=False)
+    _chunks: Optional[List[ContextChunk]] = field(default=None, repr=False)
+
+    @property
+    def chunk_count(self) -> int:
+        return sum(len(doc.chunks) for doc in self.documents)
+
+    @property
+    def chunks(self) -> List[ContextChunk]:
+        """Chunks with their text, read from the documents on first access"""
+        if self._chunks is None:
+            self._chunks = [chunk for doc in self.documents for chunk in self.corpus.read_chunks(doc)]
+        return self._chunks
+
+# =============================================================================
+# Context Corpus
+# =============================================================================
+
+class ContextCorpus:
+    """Ingests a directory or glob of context documents into a local index.
+
+    Documents are read in parallel; files above mmap_threshold bytes are
+    memory-mapped and chunked window by window instead of being read whole.
+    Chunk spans (offsets, not text) and their LLM extractions are persisted
+    under index_dir so later sessions only process new or changed files.
+    """
+
+    def __init__(self, index_dir: str = '.cqb_corpus', max_workers: int = 8,
+                 chunk_chars: int = 400, mmap_threshold: int = 1024 * 1024,
+                 extensions: tuple = DEFAULT_EXTENSIONS):
+        self.index_dir = index_dir
+        self.max_workers = max_workers
+        self.chunk_chars = chunk_chars
+        self.mmap_threshold = mmap_threshold
+        self.extensions = extensions
+
+        self.manifest_path = os.path.join(index_dir, 'manifest.json')
+        self.extractions_path = os.path.join(index_dir, 'extractions.json')
+
+        self.documents: Dict[str, CorpusDocument] = {}
+        self.extractions: Dict[str, list] = {}
+        self.extraction_prompt_version: Optional[str] = None
+        self._load_index()
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+
+    def _load_index(self):
+        """Load the persisted manifest and extraction store, if any"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == CORPUS_INDEX_VERSION:
+                for path, doc in manifest.get('documents', {}).items():
+                    chunks = [ChunkSpan(**c) for c in doc.pop('chunks', [])]
+                    self.documents[path] = CorpusDocument(chunks=chunks, **doc)
+                print(f"📋 Loaded corpus index with {len(self.documents)} documents")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️ Ignoring unreadable corpus manifest {self.manifest_path}: {e}")
+
+        try:
+            with open(self.extractions_path, 'r', encoding='utf-8') as f:
+                store = json.load(f)
+            self.extraction_prompt_version = store.get('prompt_version')
+            self.extractions = store.get('chunks', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"⚠️ Ignoring unreadable corpus extractions {self.extractions_path}: {e}")
+
+    def _save_manifest(self):
+        """Persist document fingerprints and chunk spans"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        manifest = {
+            'version': CORPUS_INDEX_VERSION,
+            'documents': {path: asdict(doc) for path, doc in self.documents.items()}
+        }
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+    def extractions_for(self, prompt_version: str) -> Dict[str, list]:
+        """Persisted [prefix version, extractions] entries made with this extraction prompt"""
+        if prompt_version != self.extraction_prompt_version:
+            return {}
+        return dict(self.extractions)
+
+    def store_extractions(self, chunk_extractions: Dict[str, list], prompt_version: str):
+        """Persist (prefix version, extractions) entries for corpus chunks (keyed by chunk hash).
+
+        Extractions made with a different prompt version are discarded.
+        """
+        if not chunk_extractions:
+            return
+        if prompt_version != self.extraction_prompt_version:
+            self.extractions = {}
+            self.extraction_prompt_version = prompt_version
+        self.extractions.update(chunk_extractions)
+
+        # Drop extractions for chunks no longer in any indexed document
+        live_hashes = {c.chunk_hash for doc in self.documents.values() for c in doc.chunks}
+        self.extractions = {h: e for h, e in self.extractions.items() if h in live_hashes}
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self.extractions_path, 'w', encoding='utf-8') as f:
+            json.dump({'prompt_version': prompt_version, 'chunks': self.extractions}, f)
+
+    # -------------------------------------------------------------------------
+    # Ingestion
+    # -------------------------------------------------------------------------
+
+    def resolve_sources(self, spec: str) -> List[str]:
+        """Expand a directory, glob pattern or single file into document paths"""
+        if os.path.isdir(spec):
+            paths = []
+            for root, _, files in os.walk(spec):
+                for name in files:
+                    if name.lower().endswith(self.extensions):
+                        paths.append(os.path.join(root, name))
+        elif os.path.isfile(spec):
+            paths = [spec]
+        else:
+            paths = [p for p in glob.glob(spec, recursive=True) if os.path.isfile(p)]
+        return sorted(paths)
+
+    def ingest(self, spec: str) -> CorpusSnapshot:
+        """Ingest all documents matched by spec, processing only new or changed files.
+
+        Args:
+            spec: Directory, glob pattern (e.g. 'reports/**/*.txt') or file path
+
+        Returns:
+            CorpusSnapshot of the matched documents
+        """
+        paths = self.resolve_sources(spec)
+        if not paths:
+            print(f"⚠️ No context documents matched: {spec}")
+            return CorpusSnapshot(spec=spec, documents=[], corpus_hash='')
+
+        stale = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                print(f"⚠️ Skipping unreadable document {path}: {e}")
+                continue
+            known = self.documents.get(path)
+            if not known or known.mtime != stat.st_mtime or known.size != stat.st_size:
+                stale.append(path)
+
+        if stale:
+            print(f"📚 Ingesting {len(stale)}/{len(paths)} new or changed documents...")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for path, document in zip(stale, executor.map(self._process_document, stale)):
+                    if document is not None:
+                        self.documents[path] = document
+            self._save_manifest()
+        else:
+            print(f"📋 Corpus unchanged: {len(paths)} documents")
+
+        documents = [self.documents[p] for p in paths if p in self.documents]
+        corpus_hash = hashlib.sha1(
+            '|'.join(doc.document_hash for doc in documents).encode('utf-8')
+        ).hexdigest()
+
+        return CorpusSnapshot(spec=spec, documents=documents, corpus_hash=corpus_hash,
+                              new_or_changed=len(stale), corpus=self)
+
+    def read_chunks(self, document: CorpusDocument) -> List[ContextChunk]:
+        """Read the text of a document's chunks.
+
+        If a chunk's text no longer matches its indexed hash (the file changed
+        since ingestion), it and the rest of the document are skipped; the
+        next ingest re-chunks the file.
+        """
+        chunks = []
+        try:
+            with open(document.path, 'rb') as f:
+                if document.size >= self.mmap_threshold:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        texts = [mapped[s.byte_start:s.byte_end].decode('utf-8', errors='replace')
+                                 for s in document.chunks]
+                else:
+                    data = f.read()
+                    texts = [data[s.byte_start:s.byte_end].decode('utf-8', errors='replace')
+                             for s in document.chunks]
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Failed to read chunks of {document.path}: {e}")
+            return chunks
+
+        for span, text in zip(document.chunks, texts):
+            text = text.strip()
+            if content_hash(text) != span.chunk_hash:
+                print(f"⚠️ {document.path} changed since it was indexed - re-ingest to refresh it")
+                break
+            chunks.append(ContextChunk(chunk_id=span.chunk_id, text=text, start=span.start,
+                                       end=span.end, chunk_hash=span.chunk_hash))
+        return chunks
+
+    def _process_document(self, path: str) -> Optional[CorpusDocument]:
+        """Fingerprint and chunk one document (runs on the thread pool)"""
+        try:
+            stat = os.stat(path)
+            known = self.documents.get(path)
+            hasher = hashlib.sha1()
+            chunks = []
+            for text_window, offset, byte_offset in self._iter_text_windows(path, stat.st_size):
+                hasher.update(text_window.encode('utf-8'))
+                # Chunks come in order, so byte offsets are advanced incrementally
+                char_position, byte_position = 0, byte_offset
+                for chunk in chunk_document(text_window, self.chunk_chars):
+                    byte_start = byte_position + len(text_window[char_position:chunk.start].encode('utf-8'))
+                    byte_end = byte_start + len(text_window[chunk.start:chunk.end].encode('utf-8'))
+                    chunks.append(ChunkSpan(
+                        chunk_id=f"{path}#chunk_{len(chunks)}",
+                        start=offset + chunk.start,
+                        end=offset + chunk.end,
+                        byte_start=byte_start,
+                        byte_end=byte_end,
+                        chunk_hash=chunk.chunk_hash
+                    ))
+                    char_position, byte_position = chunk.end, byte_end
+
+            document_hash = hasher.hexdigest()
+            if known and known.document_hash == document_hash:
+                # Touched but identical - keep existing chunks, refresh fingerprint
+                known.mtime, known.size = stat.st_mtime, stat.st_size
+                return known
+
+            return CorpusDocument(path=path, mtime=stat.st_mtime, size=stat.st_size,
+                                  document_hash=document_hash, chunks=chunks)
+
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"⚠️ Failed to ingest {path}: {e}")
+            return None
+
+    def _iter_text_windows(self, path: str, size: int) -> Iterator[tuple]:
+        """Yield (text, char_offset, byte_offset) windows; large files are memory-mapped.
+
+        Windows end on paragraph boundaries so chunking never splits a paragraph
+        across two windows. A window without one ends on a line break, or
+        failing that on a UTF-8 character boundary.
+        """
+        if size == 0:
+            return
+
+        if size < self.mmap_threshold:
+            # Read bytes (no newline translation) so offsets match the file
+            with open(path, 'rb') as f:
+                yield f.read().decode('utf-8'), 0, 0
+            return
+
+        window_bytes = max(self.mmap_threshold, self.chunk_chars * 64)
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            position, char_offset = 0, 0
+            while position < size:
+                end = min(position + window_bytes, size)
+                if end < size:
+                    boundary = mapped.rfind(b'\n\n', position, end)
+                    if boundary > position:
+                        end = boundary + 2
+                    else:
+                        boundary = mapped.rfind(b'\n', position, end)
+                        if boundary > position:
+                            end = boundary + 1
+                        else:
+                            # Back off continuation bytes (10xxxxxx) to a character start
+                            while end > position + 1 and mapped[end] & 0xC0 == 0x80:
+                                end -= 1
+                text = mapped[position:end].decode('utf-8')
+                yield text, char_offset, position
+                char_offset += len(text)
+                position = end
+
+# =============================================================================
+# Usage Example
+# =============================================================================
+
+if __name__ == "__main__":
+    import sys
+
+    print("📚 Context Corpus Ingestion")
+    print("=" * 40)
+
+    spec = sys.argv[1] if len(sys.argv) > 1 else 'context_corpus'
+    corpus = ContextCorpus()
+    snapshot = corpus.ingest(spec)
+
+    print(f"✅ {len(snapshot.documents)} documents, {snapshot.chunk_count} chunks")
+    print(f"   New or changed this run: {snapshot.new_or_changed}")
@@ -0,0 +1,211 @@
+# =============================================================================
+# Context Retrieval - BM25 Chunk Selection for RAO Extraction
+# =============================================================================
+
+import re
+import json
+import math
+import hashlib
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, asdict
+from collections import Counter
+
+INDEX_VERSION = 1
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+(?:[.$%][a-z0-9]+)*')
+
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'for', 'from',
+    'has', 'have', 'how', 'in', 'is', 'it', 'its', 'of', 'on', 'or', 'our', 'should',
+    'that', 'the', 'their', 'this', 'to', 'was', 'we', 'what', 'which', 'while',
+    'will', 'with', 'you', 'your'
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+def content_hash(text: str) -> str:
+    """Stable hash of document or chunk content"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+# =============================================================================
+# Document Chunking
+# =============================================================================
+
+@dataclass
+class ContextChunk:
+    """Contiguous span of a context document"""
+    chunk_id: str
+    text: str
+    start: int
+    end: int
+    chunk_hash: str
+
+def chunk_document(content: str, target_chars: int = 400) -> List[ContextChunk]:
+    """Split a document into paragraph-aligned chunks of roughly target_chars.
+
+    Short paragraphs are merged with their neighbours; paragraphs longer than
+    twice the target are split on sentence boundaries.
+    """
+    spans = []
+    for match in re.finditer(r'\S(?:.*?\S)?(?=\n\s*\n|\s*\Z)', content, re.DOTALL):
+        start, end = match.start(), match.end()
+        if end - start <= target_chars * 2:
+            spans.append((start, end))
+            continue
+        # Long paragraph: break on sentence ends near the target size
+        cursor = start
+        for sentence_end in re.finditer(r'[.!?](?=\s)', content[start:end]):
+            position = start + sentence_end.end()
+            if position - cursor >= target_chars:
+                spans.append((cursor, position))
+                cursor = position
+        if cursor < end:
+            spans.append((cursor, end))
+
+    chunks = []
+    current_start, current_end = None, None
+    for start, end in spans:
+        if current_start is None:
+            current_start, current_end = start, end
+        elif end - current_start <= target_chars:
+            current_end = end
+        else:
+            chunks.append((current_start, current_end))
+            current_start, current_end = start, end
+    if current_start is not None:
+        chunks.append((current_start, current_end))
+
+    result = []
+    for i, (start, end) in enumerate(chunks):
+        text = content[start:end].strip()
+        if text:
+            result.append(ContextChunk(
+                chunk_id=f"chunk_{i}",
+                text=text,
+                start=start,
+                end=end,
+                chunk_hash=content_hash(text)
+            ))
+    return result
+
+# =============================================================================
+# BM25 Index
+# =============================================================================
+
+class BM25ChunkIndex:
+    """Okapi BM25 index over the chunks of one document"""
+
+    def __init__(self, chunks: List[ContextChunk], document_hash: str,
+                 k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.document_hash = document_hash
+        self.k1 = k1
+        self.b = b
+
+        self.term_freqs: List[Dict[str, int]] = [dict(Counter(tokenize(c.text))) for c in chunks]
+        self.chunk_lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.chunk_lengths) / len(self.chunk_lengths)) if chunks else 0.0
+
+        doc_freqs = Counter()
+        for tf in self.term_freqs:
+            doc_freqs.update(tf.keys())
+        n = len(chunks)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freqs.items()
+        }
+
+    @classmethod
+    def build(cls, content: str, target_chars: int = 400) -> 'BM25ChunkIndex':
+        """Chunk a document and index it"""
+        return cls(chunk_document(content, target_chars), content_hash(content))
+
+    def score(self, query: str) -> List[Tuple[int, float]]:
+        """BM25 score of every chunk for the query, best first"""
+        query_terms = set(tokenize(query))
+        scores = []
+        for i, tf in enumerate(self.term_freqs):
+            length_norm = self.k1 * (1 - self.b + self.b * self.chunk_lengths[i] / (self.avg_length or 1))
+            total = 0.0
+            for term in query_terms:
+                freq = tf.get(term)
+                if freq:
+                    total += self.idf[term] * freq * (self.k1 + 1) / (freq + length_norm)
+            scores.append((i, total))
+        scores.sort(key=lambda x: x[1], reverse=True)
+        return scores
+
+    def select(self, query: str, budget_chars: int, top_k: int = 5) -> List[ContextChunk]:
+        """Pick the top-k relevant chunks that fit the budget, in document order.
+
+        Chunks with no query overlap are still used to fill the remaining
+        budget so short queries do not starve extraction of context.
+        """
+        selected = []
+        used = 0
+        for i, _ in self.score(query):
+            if len(selected) >= top_k:
+                break
+            chunk = self.chunks[i]
+            if used + len(chunk.text) > budget_chars:
+                continue
+            selected.append(chunk)
+            used += len(chunk.text) + 2
+
+        return sorted(selected, key=lambda c: c.start)
+
+    def save(self, path: str):
+        """Persist the index as JSON"""
+        data = {
+            'version': INDEX_VERSION,
+            'document_hash': self.document_hash,
+            'k1': self.k1,
+            'b': self.b,
+            'chunks': [asdict(c) for c in self.chunks]
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path: str, expected_hash: str = None) -> Optional['BM25ChunkIndex']:
+        """Load a persisted index; returns None if missing, stale or unreadable"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data.get('version') != INDEX_VERSION:
+            return None
+        if expected_hash is not None and data.get('document_hash') != expected_hash:
+            return None
+
+        chunks = [ContextChunk(**c) for c in data.get('chunks', [])]
+        return cls(chunks, data['document_hash'], data.get('k1', 1.5), data.get('b', 0.75))
+
+def index_path_for(source_path: str) -> str:
+    """Location of the persisted index next to its source file"""
+    return f"{source_path}.bm25.json"
+
+# =============================================================================
+# Usage Example
+# =============================================================================
+
+if __name__ == "__main__":
+    print("🧪 Testing BM25 Context Retrieval")
+    print("=" * 40)
+
+    sample = """Project overview: the lab studies agricultural climate impacts.
+
+The NSF grant provides $2.1M over 4 years. Equipment costs are $380K.
+
+Eight PhD candidates and twelve Master's students need supervision.
+
+The March 2025 submission deadline is fixed by the funding agency."""
+
+    index = BM25ChunkIndex.build(sample, target_chars=80)
+    print(f"✅ Indexed {len(index.chunks)} chunks")
+    for chunk in index.select("What is our grant budget and funding deadline?", budget_chars=200, top_k=2):
+        print(f"   {chunk.chunk_id}: {chunk.text[:60]}")
@@ -3,15 +3,24 @@
 # CQB Core - Dynamic Agent Generation Brain with RAO
 # =============================================================================
 
+import gc
 import os
+import re
 import time
 import uuid
 import yaml
+import threading
 import torch
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Iterator
 from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from vllm import LLM, SamplingParams
 from license_manager import license_manager, get_models_manifest
+from degeneration_guard import DegenerationGuard
+from specialty_registry import merge_similar_specialties, specialty_similarity
+from compute_planner import ComputePlan, plan_compute
+from single_flight import SingleFlight, request_key
 from enhanced_rao_context_manager import EnhancedRAOContextManager as CQBContextManager
 
 # =============================================================================
@@ -32,6 +41,163 @@ class CQBModelConfig:
     quantization: Optional[str] = None
     enforce_eager: bool = True
     max_num_seqs: int = 2
+    enable_prefix_caching: bool = False
+    degeneration_guard: bool = False
+    guard_chunk_tokens: int = 256
+
+# Hugging Face repo ids ("org/name") accepted as non-local model paths
+_HF_REPO_ID = re.compile(r'^[\w.-]+/[\w.-]+$')
+
+# Roles that can be routed to a named model with the `model_routing` config section.
+# None means the role runs on the acting agent's own model.
+MODEL_ROLES = {
+    'extraction': 'conservative_model',       # LangExtract context extraction
+    'analysis': 'conservative_model',         # Expert-team analysis prompt
+    'summarization': None,                    # Sub-team summaries and tree-reduction merges
+    'conservative_agents': 'conservative_model',
+    'innovative_agents': 'innovative_model',
+    'judge': None,                            # Debate round evaluations and final verdict
+    'synthesis': None                         # Final collaboration synthesis
+}
+
+@dataclass
+class GenerationRequest:
+    """A prompt submitted to a batched engine step; the result is set on its future"""
+    prompt: str
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    future: Future = field(default_factory=Future)
+
+class CancelToken:
+    """Cooperative cancellation flag shared by a session and its generations
+
+    Orchestrators check it between phases, rounds and agents; the model manager
+    checks it between chunked engine steps, so a cancel frees the engine within
+    one step and leaves the text generated so far.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = ""
+        self.cancelled_at: Optional[float] = None
+
+    def cancel(self, reason: str = "cancelled by caller"):
+        """Request cancellation (thread-safe; later calls keep the first reason)"""
+        if not self._event.is_set():
+            self.reason = reason
+            self.cancelled_at = time.time()
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until cancelled or timeout; True if cancelled"""
+        return self._event.wait(timeout)
+
+@dataclass
+class _EngineJob:
+    """One caller's prompts waiting in an engine's request queue"""
+    prompts: List[str]
+    sampling_params: List[SamplingParams]
+    future: Future = field(default_factory=Future)
+    # Set when the outputs are in or this caller is handed the runner role
+    wake: threading.Event = field(default_factory=threading.Event)
+
+class EngineRequestQueue:
+    """Shared request queue in front of one engine
+
+    An offline vLLM engine must not run two generate calls at once. Callers
+    enqueue their prompts; whoever finds the engine idle becomes the runner and
+    submits every waiting caller's prompts in one engine step, so concurrent
+    requests are batched instead of serialized. Once its own outputs are in,
+    the runner hands the role to the oldest waiting caller and returns, so no
+    caller keeps stepping the engine for others after its own request is done.
+    """
+
+    def __init__(self, model_id: str):
+        self.model_id = model_id
+        self._lock = threading.Lock()
+        self._pending: List[_EngineJob] = []
+        self._running = False
+        self.steps = 0
+        self.jobs = 0
+        self.combined_steps = 0
+        self.max_depth = 0
+
+    def submit(self, prompts: List[str], sampling_params: List[SamplingParams], run) -> List[Any]:
+        """Queue prompts and wait for their outputs
+
+        Args:
+            prompts: Prompts to generate
+            sampling_params: One SamplingParams per prompt
+            run: run(prompts, sampling_params) -> outputs, one engine step
+
+        Returns:
+            Outputs for this caller's prompts, in order
+        """
+        job = _EngineJob(prompts, sampling_params)
+        job.future.add_done_callback(lambda _: job.wake.set())
+        with self._lock:
+            self._pending.append(job)
+            self.max_depth = max(self.max_depth, len(self._pending))
+            is_runner = not self._running
+            self._running = True
+
+        if not is_runner:
+            job.wake.wait()
+        if not job.future.done():
+            # Idle engine, or the previous runner handed over with this job first in line
+            self._drain(run, job)
+        return job.future.result()
+
+    def _drain(self, run, own_job: _EngineJob):
+        """Run queued jobs in combined engine steps until own_job is done
+
+        Then hand the runner role to the oldest waiting job, or mark the engine
+        idle if nothing is queued.
+        """
+        while True:
+            with self._lock:
+                if own_job.future.done() and self._pending:
+                    self._pending[0].wake.set()
+                    return
+                batch = self._pending[:]
+                del self._pending[:]
+                if not batch:
+                    self._running = False
+                    return
+
+            try:
+                outputs = run([p for job in batch for p in job.prompts],
+                              [sp for job in batch for sp in job.sampling_params])
+            except Exception as e:
+                for job in batch:
+                    job.future.set_exception(e)
+                continue
+
+            self.steps += 1
+            self.jobs += len(batch)
+            if len(batch) > 1:
+                self.combined_steps += 1
+
+            start = 0
+            for job in batch:
+                job.future.set_result(outputs[start:start + len(job.prompts)])
+                start += len(job.prompts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current depth and batching counters"""
+        with self._lock:
+            depth = len(self._pending)
+        return {
+            'queue_depth': depth,
+            'max_depth': self.max_depth,
+            'engine_steps': self.steps,
+            'requests': self.jobs,
+            'combined_steps': self.combined_steps
+        }
 
 class CQBModelManager:
     """Manages models for CQB"""
@@ -40,11 +206,36 @@ class CQBModelManager:
         self.models: Dict[str, LLM] = {}
         self.sampling_params: Dict[str, SamplingParams] = {}
         self.model_configs: Dict[str, CQBModelConfig] = {}
+        self.model_routing: Dict[str, str] = {}
+        self.engine_settings: Dict[str, Any] = {}
         self.license_manifest = None
         self.license_manager = license_manager
 
+        # Per-sequence decode speed (tokens/s) per model, an EMA over engine calls;
+        # deadline-aware orchestration plans with it
+        self.decode_rates: Dict[str, float] = {}
+        self.decode_rate_alpha = 0.3
+        self.default_decode_rate = 20.0
+
+        # Engine lifecycle: single-flight loading, in-use pins and LRU/idle unloading
+        self._engine_lock = threading.Lock()
+        self._loading: Dict[str, Future] = {}
+        self._in_use: Dict[str, int] = {}
+        self.last_used: Dict[str, float] = {}
+        self._reaper_stop = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+        self._request_queues: Dict[str, EngineRequestQueue] = {}
+
+        # Identical in-flight generate_text calls (same model, prompt and params) run once
+        self.generation_flights = SingleFlight("generation")
+
     def load_config(self, config_path: str = 'config.yaml'):
-        """Load model configurations"""
+        """Load model configurations
+
+        Every top-level section with a model_path is a named model, so the config
+        can define models beyond conservative_model and innovative_model. The
+        optional model_routing section maps roles (see MODEL_ROLES) to model names.
+        """
         try:
             with open(config_path, 'r') as file:
                 config_data = yaml.safe_load(file)
@@ -53,10 +244,15 @@ class CQBModelManager:
             valid_fields = set(inspect.signature(CQBModelConfig.__init__).parameters.keys()) - {'self'}
 
             for model_id, config in config_data.items():
-                if model_id in ['conservative_model', 'innovative_model']:
+                if isinstance(config, dict) and 'model_path' in config:
                     filtered_config = {k: v for k, v in config.items() if k in valid_fields}
                     self.model_configs[model_id] = CQBModelConfig(**filtered_config)
 
+            self._load_routing(config_data.get('model_routing') or {})
+            self.engine_settings = config_data.get('engine_settings') or {}
+            if self.engine_settings.get('idle_unload_seconds'):
+                self.start_idle_reaper()
+
             print(f"✅ Loaded {len(self.model_configs)} model configurations")
             self.license_manifest = get_models_manifest(self.model_configs)
             self.license_manager.print_startup_banner(self.model_configs)
@@ -90,11 +286,265 @@ class CQBModelManager:
             )
         }
 
+    def _load_routing(self, routing: Dict[str, str]):
+        """Validate the model_routing section against known roles and models"""
+        self.model_routing = {}
+        for role, model_id in routing.items():
+            if role not in MODEL_ROLES:
+                print(f"⚠️ Unknown routing role '{role}' (expected one of {', '.join(MODEL_ROLES)})")
+            elif model_id not in self.model_configs:
+                print(f"⚠️ Routing for '{role}' names unknown model '{model_id}' - using the default")
+            else:
+                self.model_routing[role] = model_id
+
+        for role, model_id in self.model_routing.items():
+            print(f"🔀 {role} -> {model_id}")
+
+    def resolve_model(self, role: str, default: str = None) -> Optional[str]:
+        """Model id for a role
+
+        Args:
+            role: One of MODEL_ROLES
+            default: Model to use when the role is not routed (e.g. the acting
+                agent's own model); falls back to the role's built-in default
+
+        Returns:
+            Model id, or None when the role should run on the acting agent's model
+        """
+        if role in self.model_routing:
+            return self.model_routing[role]
+        return default if default is not None else MODEL_ROLES.get(role)
+
+    def validate_configs(self) -> List[str]:
+        """Problems with the routed models' configs that would only surface at load time
+
+        Local model paths must exist; anything else must look like a Hugging Face
+        repo id ("org/name"). Nothing is downloaded or loaded.
+
+        Returns:
+            Problem descriptions (empty when every routed model is usable)
+        """
+        problems = []
+        for role in MODEL_ROLES:
+            model_id = self.resolve_model(role)
+            if model_id is not None and model_id not in self.model_configs:
+                problems.append(f"role '{role}' runs on '{model_id}', which has no config")
+
+        for model_id in self.get_routed_models():
+            config = self.model_configs[model_id]
+            path = config.model_path or ''
+            if path.startswith(('/', '.', '~')):
+                if not os.path.exists(os.path.expanduser(path)):
+                    problems.append(f"{model_id}: model path {config.model_path} does not exist")
+            elif not os.path.exists(path) and not _HF_REPO_ID.match(path):
+                problems.append(f"{model_id}: '{config.model_path}' is neither a local path nor an org/name repo id")
+
+            if not 0 < config.memory_fraction <= 1:
+                problems.append(f"{model_id}: memory_fraction {config.memory_fraction} must be in (0, 1]")
+            if config.max_tokens <= 0 or config.max_model_len <= 0:
+                problems.append(f"{model_id}: max_tokens and max_model_len must be positive")
+            elif config.max_tokens >= config.max_model_len:
+                problems.append(f"{model_id}: max_tokens {config.max_tokens} leaves no room for the "
+                                f"prompt in max_model_len {config.max_model_len}")
+            if config.temperature < 0 or not 0 < config.top_p <= 1:
+                problems.append(f"{model_id}: temperature must be >= 0 and top_p in (0, 1]")
+        return problems
+
+    def get_routed_models(self) -> List[str]:
+        """Models that at least one role runs on, in config order"""
+        routed = {self.resolve_model(role) for role in MODEL_ROLES}
+        return [model_id for model_id in self.model_configs if model_id in routed]
+
+    def get_model_routing(self) -> Dict[str, str]:
+        """Effective role-to-model routing, for session reports"""
+        return {role: self.resolve_model(role) or "agent_model" for role in MODEL_ROLES}
+
     def load_model(self, model_id: str) -> bool:
-        """Load a specific model"""
-        if model_id in self.models:
-            return True
+        """Load a specific model
+
+        Concurrent calls for the same model share one load.
+        """
+        with self._engine_lock:
+            if model_id in self.models:
+                return True
+            loading = self._loading.get(model_id)
+            is_owner = loading is None
+            if is_owner:
+                loading = self._loading[model_id] = Future()
+
+        if not is_owner:
+            return loading.result()
+
+        try:
+            success = self._load_engine(model_id)
+        except Exception as e:
+            print(f"❌ Failed to load {model_id}: {e}")
+            success = False
+        with self._engine_lock:
+            del self._loading[model_id]
+        loading.set_result(success)
+        return success
+
+    def load_models(self, model_ids: List[str]) -> bool:
+        """Load several models, initializing independent engines in parallel
+
+        Set engine_settings.parallel_loading to false to load one after another.
+        """
+        if len(model_ids) < 2 or not self.engine_settings.get('parallel_loading', True):
+            return all([self.load_model(model_id) for model_id in model_ids])
+
+        print(f"📥 Loading {len(model_ids)} engines in parallel...")
+        with ThreadPoolExecutor(max_workers=len(model_ids)) as pool:
+            return all(list(pool.map(self.load_model, model_ids)))
+
+    def unload_model(self, model_id: str, reason: str = "requested") -> bool:
+        """Shut down a loaded engine unless a generation is using it
+
+        Returns:
+            True if the engine was unloaded
+        """
+        with self._engine_lock:
+            if self._in_use.get(model_id, 0) > 0:
+                return False
+            model = self.models.pop(model_id, None)
+            self.last_used.pop(model_id, None)
+            last_engine = not self.models
+        if model is None:
+            return False
+
+        free_before = self._free_memory_fraction()
+        self._shutdown_engine(model, last_engine)
+        del model
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
 
+        config = self.model_configs.get(model_id)
+        name = config.name if config else model_id
+        free_after = self._free_memory_fraction()
+        if free_before is not None:
+            print(f"📤 Unloaded {name} ({reason}) - free GPU memory {free_before:.0%} -> {free_after:.0%}")
+            if config and free_after - free_before < config.memory_fraction / 2:
+                print(f"⚠️ {name} released less GPU memory than its {config.memory_fraction:.0%} reservation")
+        else:
+            print(f"📤 Unloaded {name} ({reason})")
+        return True
+
+    def _shutdown_engine(self, model: LLM, last_engine: bool):
+        """Release a vLLM engine's GPU memory before its reference is dropped
+
+        Deleting the LLM is not enough: the engine core (a separate process in
+        vLLM V1) and the model-parallel groups keep weights and KV cache alive.
+        The parallel state is process-wide, so it is only torn down with the
+        last loaded engine.
+        """
+        engine = getattr(model, 'llm_engine', None)
+        engine_core = getattr(engine, 'engine_core', None)
+        if hasattr(engine_core, 'shutdown'):
+            try:
+                engine_core.shutdown()
+            except Exception as e:
+                print(f"⚠️ Engine core shutdown failed: {e}")
+
+        if not last_engine:
+            return
+        try:
+            from vllm.distributed.parallel_state import (
+                destroy_distributed_environment, destroy_model_parallel
+            )
+            destroy_model_parallel()
+            destroy_distributed_environment()
+        except ImportError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Model-parallel teardown failed: {e}")
+
+    def unload_idle_models(self) -> List[str]:
+        """Unload engines idle longer than idle_unload_seconds, and the least
+        recently used idle engine while the GPU is under memory pressure"""
+        unloaded = []
+        idle_seconds = self.engine_settings.get('idle_unload_seconds')
+        if idle_seconds:
+            now = time.time()
+            with self._engine_lock:
+                idle = [(model_id, now - used) for model_id, used in self.last_used.items()
+                        if now - used >= idle_seconds]
+            for model_id, idle_for in idle:
+                if self.unload_model(model_id, f"idle {idle_for:.0f}s"):
+                    unloaded.append(model_id)
+
+        while self._memory_pressure():
+            victim = self._least_recently_used_idle()
+            if victim is None or not self.unload_model(victim, "memory pressure"):
+                break
+            unloaded.append(victim)
+        return unloaded
+
+    def start_idle_reaper(self, interval: float = None):
+        """Check for idle engines and memory pressure in a background thread"""
+        if self._reaper and self._reaper.is_alive():
+            return
+        idle_seconds = self.engine_settings.get('idle_unload_seconds') or 300
+        interval = interval or max(1.0, min(60.0, idle_seconds / 2))
+
+        def reap():
+            while not self._reaper_stop.wait(interval):
+                try:
+                    self.unload_idle_models()
+                except Exception as e:
+                    print(f"⚠️ Idle engine check failed: {e}")
+
+        self._reaper_stop.clear()
+        self._reaper = threading.Thread(target=reap, name="cqb-engine-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop_idle_reaper(self):
+        """Stop the background idle check"""
+        self._reaper_stop.set()
+
+    def _free_memory_fraction(self) -> Optional[float]:
+        """Fraction of GPU memory free, or None without CUDA"""
+        if not torch.cuda.is_available():
+            return None
+        free, total = torch.cuda.mem_get_info()
+        return free / total
+
+    def _memory_pressure(self, required_fraction: float = 0.0) -> bool:
+        """Whether free GPU memory is below required_fraction plus the min_free_memory_fraction margin"""
+        free = self._free_memory_fraction()
+        if free is None:
+            return False
+        margin = self.engine_settings.get('min_free_memory_fraction', 0.05)
+        return free < required_fraction + margin
+
+    def _least_recently_used_idle(self, exclude: str = None) -> Optional[str]:
+        """Loaded engine with the oldest last use that no generation is using"""
+        with self._engine_lock:
+            candidates = [model_id for model_id in self.models
+                          if model_id != exclude and self._in_use.get(model_id, 0) == 0]
+            return min(candidates, key=lambda m: self.last_used.get(m, 0.0)) if candidates else None
+
+    def _make_room(self, model_id: str, config: CQBModelConfig):
+        """Unload least recently used idle engines until the new engine fits"""
+        max_loaded = self.engine_settings.get('max_loaded_models')
+        while True:
+            with self._engine_lock:
+                over_limit = bool(max_loaded) and len(self.models) >= max_loaded
+            if not over_limit and not self._memory_pressure(config.memory_fraction):
+                return
+
+            victim = self._least_recently_used_idle(exclude=model_id)
+            free_before = self._free_memory_fraction()
+            if victim is None or not self.unload_model(victim, f"making room for {config.name}"):
+                print(f"⚠️ No idle engine to unload for {config.name} - loading anyway")
+                return
+            if not over_limit and free_before is not None and self._free_memory_fraction() <= free_before:
+                # Evicting more engines will not help if unloading frees nothing
+                print(f"⚠️ Unloading freed no GPU memory - loading {config.name} anyway")
+                return
+
+    def _load_engine(self, model_id: str) -> bool:
+        """Create the vLLM engine for a model (callers go through load_model)"""
         config = self.model_configs.get(model_id)
         if not config:
             print(f"❌ No config for {model_id}")
@@ -121,6 +571,11 @@ class CQBModelManager:
             if config.quantization:
                 llm_args["quantization"] = config.quantization
 
+            if config.enable_prefix_caching:
+                # Shared prompt prefixes (e.g. the extraction few-shot block) are prefilled once
+                llm_args["enable_prefix_caching"] = True
+
+            self._make_room(model_id, config)
             model = LLM(**llm_args)
 
             sampling_params = SamplingParams(
@@ -130,8 +585,10 @@ class CQBModelManager:
                 stop=["</s>", "<|im_end|>"]
             )
 
-            self.models[model_id] = model
-            self.sampling_params[model_id] = sampling_params
+            with self._engine_lock:
+                self.sampling_params[model_id] = sampling_params
+                self.models[model_id] = model
+                self.last_used[model_id] = time.time()
 
             print(f"✅ {config.name} loaded")
             return True
@@ -140,13 +597,108 @@ class CQBModelManager:
             print(f"❌ Failed to load {config.name}: {e}")
             return False
 
+    def get_tokenizer(self, model_id: str):
+        """Get the tokenizer of a loaded model (loads the model if needed)"""
+        return self._get_model(model_id).get_tokenizer()
+
     def get_license_manifest(self) -> Dict[str, Any]:
         """Get license manifest for all configured models"""
         if self.license_manifest is None:
             self.license_manifest = get_models_manifest(self.model_configs)
         return self.license_manifest
 
-    def generate_text(self, model_id: str, prompt: str, temperature: float = None, max_tokens: int = None) -> str:
+    def _get_model(self, model_id: str) -> LLM:
+        """Get a loaded model, loading it on first use"""
+        while True:
+            with self._engine_lock:
+                model = self.models.get(model_id)
+                if model is not None:
+                    self.last_used[model_id] = time.time()
+                    return model
+            if not self.load_model(model_id):
+                raise ValueError(f"Model {model_id} not available")
+
+    @contextmanager
+    def _engine(self, model_id: str) -> Iterator[LLM]:
+        """A loaded engine, pinned so it cannot be unloaded until the block exits"""
+        while True:
+            model = self._get_model(model_id)
+            with self._engine_lock:
+                # Re-check: an unload may have happened between the load and the pin
+                if self.models.get(model_id) is model:
+                    self._in_use[model_id] = self._in_use.get(model_id, 0) + 1
+                    break
+        try:
+            yield model
+        finally:
+            with self._engine_lock:
+                self._in_use[model_id] -= 1
+                self.last_used[model_id] = time.time()
+
+    def _request_queue(self, model_id: str) -> EngineRequestQueue:
+        """The shared request queue in front of a model's engine"""
+        with self._engine_lock:
+            queue = self._request_queues.get(model_id)
+            if queue is None:
+                queue = self._request_queues[model_id] = EngineRequestQueue(model_id)
+            return queue
+
+    def get_engine_queue_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Queue depth and batching counters per engine"""
+        with self._engine_lock:
+            queues = dict(self._request_queues)
+        return {model_id: queue.get_stats() for model_id, queue in queues.items()}
+
+    def _run_engine(self, model_id: str, model: LLM, prompts: List[str], sampling_params):
+        """Run prompts through the engine's shared request queue
+
+        Threads generating on the same engine at once are combined into one
+        engine step instead of calling model.generate concurrently.
+        """
+        if not isinstance(sampling_params, list):
+            sampling_params = [sampling_params] * len(prompts)
+        return self._request_queue(model_id).submit(
+            prompts, sampling_params,
+            lambda step_prompts, step_params: self._generate_step(model_id, model, step_prompts, step_params)
+        )
+
+    def _generate_step(self, model_id: str, model: LLM, prompts: List[str], sampling_params):
+        """Run model.generate and fold the step's speed into the model's decode rate
+
+        A step lasts about as long as its longest sequence, so the rate is that
+        sequence's tokens over the wall time. Short outputs are skipped because
+        prefill dominates them.
+        """
+        start = time.time()
+        outputs = model.generate(prompts, sampling_params)
+        elapsed = time.time() - start
+
+        longest = max((len(output.outputs[0].token_ids) for output in outputs), default=0)
+        if elapsed > 0 and longest >= 16:
+            rate = longest / elapsed
+            previous = self.decode_rates.get(model_id)
+            self.decode_rates[model_id] = rate if previous is None else \
+                (1 - self.decode_rate_alpha) * previous + self.decode_rate_alpha * rate
+        return outputs
+
+    def estimate_generation_seconds(self, model_id: str, tokens: int) -> float:
+        """Seconds one sequence needs for `tokens` new tokens at the measured decode rate"""
+        return tokens / self.decode_rates.get(model_id, self.default_decode_rate)
+
+    def _build_sampling_params(self, model_id: str, temperature: float = None,
+                               max_tokens: int = None) -> SamplingParams:
+        """Copy the model's sampling params with any overrides applied"""
+        base_sampling_params = self.sampling_params[model_id]
+        return SamplingParams(
+            temperature=temperature if temperature is not None else base_sampling_params.temperature,
+            top_p=base_sampling_params.top_p,
+            max_tokens=max_tokens if max_tokens is not None else base_sampling_params.max_tokens,
+            stop=base_sampling_params.stop
+        )
+
+    def generate_text(self, model_id: str, prompt: str, temperature: float = None, max_tokens: int = None,
+                      side_requests: List[GenerationRequest] = None,
+                      cancel_token: CancelToken = None) -> str:
         """Generate text using specified model
 
         Args:
@@ -154,29 +706,239 @@ class CQBModelManager:
             prompt: Input prompt
             temperature: Override temperature (optional)
             max_tokens: Override max tokens (optional)
+            side_requests: Queued requests to run in the same engine step (optional)
+            cancel_token: Stop between chunked steps once cancelled (optional)
 
         Returns:
-            Generated text
+            Generated text; concurrent identical calls without side requests or a
+            cancel token share one generation
         """
-        if model_id not in self.models:
-            if not self.load_model(model_id):
-                raise ValueError(f"Model {model_id} not available")
+        if side_requests or cancel_token is not None:
+            riders = side_requests[:] if side_requests else []
+            if side_requests:
+                del side_requests[:]
+            return self.generate_batch(model_id, [GenerationRequest(prompt, temperature, max_tokens)] + riders,
+                                       cancel_token)[0]
+
+        return self.generation_flights.do(
+            request_key(model_id, prompt, temperature, max_tokens),
+            self._generate_single, model_id, prompt, temperature, max_tokens
+        )
 
-        model = self.models[model_id]
-        base_sampling_params = self.sampling_params[model_id]
+    def _generate_single(self, model_id: str, prompt: str, temperature: float = None,
+                         max_tokens: int = None) -> str:
+        """One prompt in one engine step (callers go through generate_text)"""
+        with self._engine(model_id) as model:
+            sampling_params = self._build_sampling_params(model_id, temperature, max_tokens)
+            outputs = self._run_engine(model_id, model, [prompt], sampling_params)
+        return outputs[0].outputs[0].text.strip()
 
-        # Create new sampling params with any overrides
-        from vllm import SamplingParams
+    def generate_batch(self, model_id: str, requests: List[GenerationRequest],
+                       cancel_token: CancelToken = None) -> List[str]:
+        """Run several prompts in one engine step, each with its own sampling params
 
-        sampling_params = SamplingParams(
-            temperature=temperature if temperature is not None else base_sampling_params.temperature,
-            top_p=base_sampling_params.top_p,
-            max_tokens=max_tokens if max_tokens is not None else base_sampling_params.max_tokens,
-            stop=base_sampling_params.stop
-        )
+        Args:
+            model_id: Which model to use
+            requests: Prompts with optional temperature/max_tokens overrides
+            cancel_token: Run in chunked steps and stop once cancelled (optional)
 
-        outputs = model.generate([prompt], sampling_params)
-        return outputs[0].outputs[0].text.strip()
+        Returns:
+            Generated texts in request order (also set on each request's future)
+        """
+        if not requests:
+            return []
+        if cancel_token is not None:
+            # A single engine call cannot be interrupted, so cancellable batches
+            # run in chunked steps without the degeneration guard
+            return [text for text, _ in self.generate_guarded_batch(model_id, requests, cancel_token,
+                                                                     use_guard=False)]
+
+        try:
+            with self._engine(model_id) as model:
+                outputs = self._run_engine(
+                    model_id, model,
+                    [r.prompt for r in requests],
+                    [self._build_sampling_params(model_id, r.temperature, r.max_tokens) for r in requests]
+                )
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            raise
+
+        texts = [output.outputs[0].text.strip() for output in outputs]
+        for request, text in zip(requests, texts):
+            request.future.set_result(text)
+        return texts
+
+    def generate_guarded(self, model_id: str, prompt: str, temperature: float = None,
+                         max_tokens: int = None, cancel_token: CancelToken = None) -> Tuple[str, str]:
+        """Generate text with the degeneration guard
+
+        Returns:
+            (generated text, stop reason)
+        """
+        return self.generate_guarded_batch(model_id, [GenerationRequest(prompt, temperature, max_tokens)],
+                                           cancel_token)[0]
+
+    def generate_guarded_batch(self, model_id: str, requests: List[GenerationRequest],
+                               cancel_token: CancelToken = None,
+                               use_guard: bool = True) -> List[Tuple[str, str]]:
+        """Generate a batch in chunked steps, aborting requests that degenerate
+
+        Every step advances all unfinished requests by guard_chunk_tokens in one
+        engine call. After each step a DegenerationGuard checks each request's
+        output; looping or role-drifting requests are cut back to their useful
+        prefix and dropped from later steps, freeing their sequence slot. Once
+        the cancel token is set, all unfinished requests stop before the next step.
+
+        Args:
+            model_id: Which model to use
+            requests: Prompts with optional temperature/max_tokens overrides
+            cancel_token: Abort unfinished requests once cancelled (optional)
+            use_guard: Check outputs with the degeneration guard
+
+        Returns:
+            (text, stop_reason) per request, where stop_reason is "stop", "length",
+            "repetition", "role_drift" or "cancelled"; texts are also set on the
+            request futures
+        """
+        if not requests:
+            return []
+
+        chunk_tokens = self.model_configs[model_id].guard_chunk_tokens
+        default_limit = self.model_configs[model_id].max_tokens
+
+        limits = [r.max_tokens if r.max_tokens is not None else default_limit for r in requests]
+        guards = [DegenerationGuard() if use_guard else None for _ in requests]
+        generated = [""] * len(requests)
+        produced = [0] * len(requests)
+        stop_reasons = ["length"] * len(requests)
+
+        active = list(range(len(requests)))
+        try:
+            with self._engine(model_id) as model:
+                while active:
+                    if cancel_token is not None and cancel_token.cancelled:
+                        for i in active:
+                            stop_reasons[i] = "cancelled"
+                        print(f"   🛑 Aborted {len(active)} generations ({cancel_token.reason})")
+                        break
+
+                    outputs = self._run_engine(
+                        model_id, model,
+                        [requests[i].prompt + generated[i] for i in active],
+                        [self._build_sampling_params(model_id, requests[i].temperature,
+                                                     min(chunk_tokens, limits[i] - produced[i]))
+                         for i in active]
+                    )
+
+                    still_active = []
+                    for i, output in zip(active, outputs):
+                        completion = output.outputs[0]
+                        generated[i] += completion.text
+                        produced[i] += len(completion.token_ids)
+
+                        verdict = guards[i].check(generated[i]) if guards[i] else None
+                        if verdict is not None:
+                            cut, stop_reasons[i] = verdict
+                            generated[i] = generated[i][:cut]
+                            print(f"   ✂️ Stopped generation early ({stop_reasons[i]}) after {produced[i]} tokens")
+                        elif completion.finish_reason != "length" or not completion.token_ids:
+                            stop_reasons[i] = "stop"
+                        elif produced[i] < limits[i]:
+                            still_active.append(i)
+                    active = still_active
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            raise
+
+        results = []
+        for request, text, stop_reason in zip(requests, generated, stop_reasons):
+            request.future.set_result(text.strip())
+            results.append((text.strip(), stop_reason))
+        return results
+
+    def stream_text(self, model_id: str, prompt: str, temperature: float = None,
+                    max_tokens: int = None, chunk_tokens: int = 128,
+                    side_requests: List[GenerationRequest] = None,
+                    cancel_token: CancelToken = None) -> Iterator[str]:
+        """Generate text in chunked steps, yielding each new piece as it arrives
+
+        The offline vLLM engine returns whole completions, so the stream is built
+        by continuation: each step generates up to chunk_tokens, appends them to
+        the prompt and resumes. With enable_prefix_caching the resumed prompt is
+        served from the KV cache, so a step costs little more than its new tokens.
+
+        Requests appended to side_requests while the stream is running are
+        batched into the next step with the streamed prompt; any left when the
+        stream ends run in one final step. Once the cancel token is set the
+        stream ends before its next step and queued side requests are cancelled
+        instead of run.
+
+        Args:
+            model_id: Which model to use
+            prompt: Input prompt
+            temperature: Override temperature (optional)
+            max_tokens: Total token limit for the streamed generation (optional)
+            chunk_tokens: Tokens generated per step
+            side_requests: Shared queue of prompts to piggyback on the stream
+            cancel_token: End the stream once cancelled (optional)
+
+        Yields:
+            Newly generated text pieces (unstripped)
+        """
+        token_limit = max_tokens if max_tokens is not None else self.model_configs[model_id].max_tokens
+        side_requests = side_requests if side_requests is not None else []
+
+        generated = ""
+        produced = 0
+        with self._engine(model_id) as model:
+            while produced < token_limit:
+                if cancel_token is not None and cancel_token.cancelled:
+                    break
+
+                riders = side_requests[:]
+                del side_requests[:len(riders)]
+
+                step_params = self._build_sampling_params(
+                    model_id, temperature, min(chunk_tokens, token_limit - produced)
+                )
+                try:
+                    outputs = self._run_engine(
+                        model_id, model,
+                        [prompt + generated] + [r.prompt for r in riders],
+                        [step_params] + [self._build_sampling_params(model_id, r.temperature, r.max_tokens)
+                                         for r in riders]
+                    )
+                except Exception as e:
+                    for request in riders + side_requests:
+                        request.future.set_exception(e)
+                    del side_requests[:]
+                    raise
+
+                for request, output in zip(riders, outputs[1:]):
+                    request.future.set_result(output.outputs[0].text.strip())
+
+                completion = outputs[0].outputs[0]
+                produced += len(completion.token_ids)
+                if completion.text:
+                    generated += completion.text
+                    yield completion.text
+
+                # Stopped on EOS/stop string rather than the step limit: generation is complete
+                if completion.finish_reason != "length" or not completion.token_ids:
+                    break
+
+        if side_requests:
+            riders = side_requests[:]
+            del side_requests[:]
+            if cancel_token is not None and cancel_token.cancelled:
+                for request in riders:
+                    request.future.cancel()
+                print(f"   🛑 Dropped {len(riders)} queued requests ({cancel_token.reason})")
+            else:
+                self.generate_batch(model_id, riders)
 
 # =============================================================================
 # CQB Agent (Unchanged)
@@ -213,25 +975,60 @@ class CQBAgent:
     def specialty(self) -> str:
         return self.spec.specialty
 
-    def generate_response(self, prompt: str, context: Dict[str, Any] = None) -> str:
-        """Generate response to prompt"""
+    def generate_response(self, prompt: str, context: Dict[str, Any] = None,
+                          max_tokens: int = None, model_id: str = None,
+                          cancel_token: CancelToken = None) -> str:
+        """Generate response to prompt
+
+        max_tokens overrides the model's limit; model_id runs this agent's
+        prompt on another model (role routing, e.g. judge or synthesis). With a
+        cancel token the generation stops early once cancelled, keeping its prefix.
+        """
         formatted_prompt = self._format_prompt(prompt, context)
+        model_id = model_id or self.spec.model_assignment
+
+        stop_reason = None
+        config = self.model_manager.model_configs.get(model_id)
+        if (config and config.degeneration_guard) or cancel_token is not None:
+            response, stop_reason = self.model_manager.generate_guarded_batch(
+                model_id,
+                [GenerationRequest(formatted_prompt, self.spec.temperature, max_tokens)],
+                cancel_token,
+                use_guard=bool(config and config.degeneration_guard)
+            )[0]
+        else:
+            response = self.model_manager.generate_text(
+                model_id,
+                formatted_prompt,
+                self.spec.temperature,
+                max_tokens
+            )
 
-        response = self.model_manager.generate_text(
-            self.spec.model_assignment,
-            formatted_prompt,
-            self.spec.temperature
-        )
+        self.record_response(prompt, response, context, stop_reason)
+        return response
 
+    def build_request(self, prompt: str, context: Dict[str, Any] = None,
+                      max_tokens: int = None) -> GenerationRequest:
+        """Build this agent's generation request for batched execution"""
+        return GenerationRequest(self._format_prompt(prompt, context),
+                                 temperature=self.spec.temperature, max_tokens=max_tokens)
+
+    def count_prompt_tokens(self, prompt: str, context: Dict[str, Any] = None) -> int:
+        """Prefill tokens this agent's formatted prompt would cost"""
+        tokenizer = self.model_manager.get_tokenizer(self.spec.model_assignment)
+        return len(tokenizer.encode(self._format_prompt(prompt, context)))
+
+    def record_response(self, prompt: str, response: str, context: Dict[str, Any] = None,
+                        stop_reason: str = None):
+        """Add a prompt/response exchange to the conversation history"""
         self.conversation_history.append({
             'prompt': prompt,
             'response': response,
             'timestamp': time.time(),
-            'context_provided': context is not None
+            'context_provided': context is not None,
+            'stop_reason': stop_reason
         })
 
-        return response
-
     def _format_prompt(self, base_prompt: str, context: Dict[str, Any] = None) -> str:
         """Format prompt for this agent"""
 
@@ -267,9 +1064,81 @@ Agent Type: {self.spec.agent_type}"""
             'temperature': self.spec.temperature,
             'persona': self.spec.persona,
             'context_summary': self.spec.context_summary,
-            'conversation_count': len(self.conversation_history)
+            'conversation_count': len(self.conversation_history),
+            'early_stops': {
+                reason: sum(1 for turn in self.conversation_history if turn.get('stop_reason') == reason)
+                for reason in ('repetition', 'role_drift')
+            }
         }
 
+def generate_agent_responses(model_manager: CQBModelManager,
+                             tasks: List[Tuple[CQBAgent, str, Optional[Dict[str, Any]]]],
+                             max_tokens: int = None, model_id: str = None,
+                             cancel_token: CancelToken = None) -> List[str]:
+    """Generate responses for many agents with one batched engine step per model
+
+    Each agent keeps its own persona, context and temperature; agents sharing a
+    model are submitted together so vLLM can schedule them concurrently.
+
+    Args:
+        model_manager: Model manager the agents generate with
+        tasks: (agent, prompt, context) triples
+        max_tokens: Optional per-response token limit
+        model_id: Run every task on this model instead of each agent's own
+            (role routing, e.g. summarization on a small model)
+        cancel_token: Stop the batches between chunked steps once cancelled
+
+    Returns:
+        Responses in task order; a failed model batch yields "Error: ..." entries
+    """
+    by_model: Dict[str, List[int]] = {}
+    for i, (agent, _, _) in enumerate(tasks):
+        by_model.setdefault(model_id or agent.spec.model_assignment, []).append(i)
+
+    responses = [""] * len(tasks)
+    for model_id, indices in by_model.items():
+        requests = [tasks[i][0].build_request(tasks[i][1], tasks[i][2], max_tokens) for i in indices]
+        config = model_manager.model_configs.get(model_id)
+        try:
+            if (config and config.degeneration_guard) or cancel_token is not None:
+                results = model_manager.generate_guarded_batch(
+                    model_id, requests, cancel_token,
+                    use_guard=bool(config and config.degeneration_guard)
+                )
+            else:
+                results = [(text, None) for text in model_manager.generate_batch(model_id, requests)]
+        except Exception as e:
+            print(f"   ❌ Batch on {model_id} failed: {e}")
+            for i in indices:
+                responses[i] = f"Error: {str(e)}"
+            continue
+
+        for i, (text, stop_reason) in zip(indices, results):
+            agent, prompt, context = tasks[i]
+            agent.record_response(prompt, text, context, stop_reason)
+            responses[i] = text
+
+    return responses
+
+def balanced_team(agents: List[CQBAgent], size: int) -> List[CQBAgent]:
+    """Trim a team to size, alternating Conservative and Innovative agents
+
+    Teams list every Conservative agent before the Innovative ones, so a prefix
+    slice would drop the Innovative agents first. The agents kept are the
+    leading ones of each type, returned in their original order.
+    """
+    if size >= len(agents):
+        return list(agents)
+
+    conservative = [a for a in agents if a.agent_type == 'Conservative']
+    innovative = [a for a in agents if a.agent_type != 'Conservative']
+    interleaved = []
+    for i in range(max(len(conservative), len(innovative))):
+        interleaved.extend(group[i] for group in (conservative, innovative) if i < len(group))
+
+    kept = {id(a) for a in interleaved[:max(size, 0)]}
+    return [a for a in agents if id(a) in kept]
+
 # =============================================================================
 # Enhanced Dynamic Agent Generation with RAO
 # =============================================================================
@@ -282,19 +1151,71 @@ class DynamicAgentGenerator:
         self.rao_config = rao_config or {}
         self.context_manager = None
 
+        # Details of the last team built, per thread so concurrent callers read their own
+        self._last = threading.local()
+
         # Initialize RAO if enabled
         if self.rao_config.get('enabled', False):
             # Pass the model manager
             self.context_manager = CQBContextManager(
                 self.model_manager,  # Add this line
-                max_context_length=self.rao_config.get('max_context_length', 2000)
+                max_context_length=self.rao_config.get('max_context_length', 2000),
+                specialty_registry_path=self.rao_config.get('specialty_registry'),
+                extraction_tier=self.rao_config.get('extraction_tier', 'auto'),
+                fast_path_confidence=self.rao_config.get('fast_path_confidence', 0.75),
+                llm_extraction_min_budget=self.rao_config.get('llm_extraction_min_budget', 30.0),
+                retrieval_top_k=self.rao_config.get('retrieval_top_k', 5),
+                retrieval_chunk_chars=self.rao_config.get('retrieval_chunk_chars', 400),
+                persist_retrieval_index=self.rao_config.get('persist_retrieval_index', True),
+                corpus_index_dir=self.rao_config.get('corpus_index_dir', '.cqb_corpus'),
+                few_shot_examples=self.rao_config.get('few_shot_examples'),
+                few_shot_token_budget=self.rao_config.get('few_shot_token_budget'),
+                streaming_chunk_tokens=self.rao_config.get('streaming_chunk_tokens', 128)
             )
             print("✅ RAO enabled - Context-aware agent generation active")
         else:
             print("ℹ️ RAO disabled - Using query-only agent generation")
 
-    def analyze_and_generate_agents(self, query: str, max_agents: int = 8) -> List[CQBAgent]:
-        """Analyze query and generate appropriate agents with RAO support"""
+    @property
+    def last_specialty_merges(self) -> Dict[str, List[str]]:
+        return getattr(self._last, 'specialty_merges', {})
+
+    @last_specialty_merges.setter
+    def last_specialty_merges(self, merges: Dict[str, List[str]]):
+        self._last.specialty_merges = merges
+
+    @property
+    def last_agents_pruned(self) -> int:
+        return getattr(self._last, 'agents_pruned', 0)
+
+    @last_agents_pruned.setter
+    def last_agents_pruned(self, count: int):
+        self._last.agents_pruned = count
+
+    @property
+    def last_compute_plan(self) -> Optional[ComputePlan]:
+        return getattr(self._last, 'compute_plan', None)
+
+    @last_compute_plan.setter
+    def last_compute_plan(self, plan: Optional[ComputePlan]):
+        self._last.compute_plan = plan
+
+    def analyze_and_generate_agents(self, query: str, max_agents: int = 8,
+                                    latency_budget: float = None, auto_size: bool = False,
+                                    compute_budget: int = None,
+                                    cancel_token: CancelToken = None) -> List[CQBAgent]:
+        """Analyze query and generate appropriate agents with RAO support
+
+        Args:
+            query: Query to build a team for
+            max_agents: Maximum number of agents to generate
+            latency_budget: Optional seconds available; tight budgets skip LLM extraction
+            auto_size: Size the team (and plan rounds and max_tokens) from query and
+                context complexity, with max_agents as the upper bound
+            compute_budget: Optional generated-token budget for the auto-sized run
+            cancel_token: Stop context extraction and the analysis generation at
+                their next chunked step once cancelled
+        """
 
         print(f"🔍 Analyzing query to determine agent needs...")
 
@@ -303,15 +1224,60 @@ class DynamicAgentGenerator:
         context_content = None # Initialize context_content
         domain_analysis = None # Initialize domain_analysis
 
-        if self.rao_config.get('enabled', False) and self.context_manager:
-            context_filename = self.rao_config.get('context_filename', 'cqb_framework_rao.txt')
-            context_content = self.context_manager.load_context_file(context_filename)
+        # Analysis prompt generated alongside LLM extraction instead of after it
+        early_analysis = None
+        side_requests: List[GenerationRequest] = []
+
+        # Early analysis rides extraction engine steps, so both roles must share a model
+        analysis_model = self.model_manager.resolve_model('analysis')
+        can_overlap = bool(self.context_manager) and \
+            analysis_model == self.context_manager.vllm_language_model.model_id
+
+        # Pipelined setup: a query-only expert analysis shares the first extraction step
+        if self.rao_config.get('pipelined_setup', False) and can_overlap:
+            early_analysis = GenerationRequest(self._build_standard_analysis_prompt(query), temperature=0.3)
+            side_requests.append(early_analysis)
+
+        # Streaming extraction: issue the analysis prompt as soon as enough entities are in
+        on_partial_analysis = None
+        if self.rao_config.get('streaming_extraction', False) and can_overlap:
+            min_entities = self.rao_config.get('streaming_min_entities', 6)
+
+            def on_partial_analysis(partial_analysis, side_requests):
+                nonlocal early_analysis
+                if early_analysis is None and len(partial_analysis['extraction_results']) >= min_entities:
+                    early_analysis = GenerationRequest(
+                        self._build_rao_analysis_prompt(query, partial_analysis), temperature=0.3
+                    )
+                    # Rides along with the next extraction step on the same engine
+                    side_requests.append(early_analysis)
+                    print(f"🚀 Issuing analysis prompt early ({min_entities}+ entities streamed)")
 
-            if context_content:
+        if self.rao_config.get('enabled', False) and self.context_manager:
+            # A context corpus (directory or glob of documents) takes precedence over the single file
+            context_corpus = self.rao_config.get('context_corpus')
+            if context_corpus:
+                context_content = self.context_manager.load_context_corpus(context_corpus)
+            else:
+                context_filename = self.rao_config.get('context_filename', 'cqb_framework_rao.txt')
+                context_content = self.context_manager.load_context_file(context_filename)
+
+            if context_content and context_corpus:
+                print("🧠 RAO: Analyzing context corpus for agent generation...")
+                context_analysis = self.context_manager.analyze_corpus_for_agent_generation(
+                    context_content, query, latency_budget=latency_budget,
+                    on_partial_analysis=on_partial_analysis, side_requests=side_requests,
+                    cancel_token=cancel_token
+                )
+            elif context_content:
                 print("🧠 RAO: Analyzing context file for agent generation...")
                 context_analysis = self.context_manager.analyze_context_for_agent_generation(
-                    context_content, query
+                    context_content, query, latency_budget=latency_budget,
+                    source_path=context_filename, on_partial_analysis=on_partial_analysis,
+                    side_requests=side_requests, cancel_token=cancel_token
                 )
+
+            if context_content:
                 # Ensure domain_analysis is set here when context_analysis is available
                 if context_analysis:
                     domain_analysis = {
@@ -327,15 +1293,41 @@ class DynamicAgentGenerator:
                 print("❌ RAO: No context file found and fallback disabled")
                 return []
 
-        # Build analysis prompt (enhanced with context if available)
-        if context_analysis:
-            analysis_prompt = self._build_rao_analysis_prompt(query, context_analysis)
+        if side_requests:
+            # No LLM extraction step ran to carry it - use the context-aware prompt instead
+            side_requests.clear()
+            early_analysis = None
+
+        self.last_compute_plan = None
+        if auto_size:
+            config = self.model_manager.model_configs.get(self.model_manager.resolve_model('innovative_agents'))
+            self.last_compute_plan = plan_compute(
+                query, context_analysis, compute_budget, max_agents=max_agents,
+                max_tokens=config.max_tokens if config else 1024
+            )
+            max_agents = self.last_compute_plan.agents
+            print(f"📐 Compute plan: {max_agents} agents, {self.last_compute_plan.rounds} rounds, "
+                  f"{self.last_compute_plan.max_tokens} max tokens ({self.last_compute_plan.reason})")
+
+        # A cancelled stream drops its queued riders, so their futures may be cancelled
+        early_future = early_analysis.future if early_analysis is not None else None
+        if early_future is not None and early_future.done() and not early_future.cancelled() \
+                and early_future.exception() is None:
+            # Generated alongside the extraction; the final context analysis still
+            # supplies the leading specialists and their context summaries below
+            analysis = early_future.result()
+            print(f"✅ Query analysis complete (overlapped with extraction)")
         else:
-            analysis_prompt = self._build_standard_analysis_prompt(query)
+            # Build analysis prompt (enhanced with context if available)
+            if context_analysis:
+                analysis_prompt = self._build_rao_analysis_prompt(query, context_analysis)
+            else:
+                analysis_prompt = self._build_standard_analysis_prompt(query)
 
-        # Use conservative model for analysis
-        analysis = self.model_manager.generate_text('conservative_model', analysis_prompt, temperature=0.3)
-        print(f"✅ Query analysis complete")
+            # Use conservative model for analysis
+            analysis = self.model_manager.generate_text(analysis_model, analysis_prompt, temperature=0.3,
+                                                        cancel_token=cancel_token)
+            print(f"✅ Query analysis complete")
 
         # Extract agent specifications
         # Pass context_analysis and context_content to _extract_agent_specs
@@ -423,26 +1415,44 @@ Format your response as a simple list of expert types, one per line."""
             # Prioritize context specialists by adding them to the beginning
             expert_types = context_specialists + [e for e in expert_types if e not in context_specialists]
 
+        # Merge near-duplicate specialties ("Budget Analyst" / "Financial Budget Analyst").
+        # Duplicates that would have been selected are not refilled, so each one
+        # saves a generation in every round
+        threshold = self.rao_config.get('specialty_merge_threshold', 0.7)
+        candidates = expert_types[:max_agents]
+        expert_types, merges = merge_similar_specialties(expert_types, threshold)
+        merged = [d for duplicates in merges.values() for d in duplicates]
+        team_size = max_agents - sum(1 for c in candidates if c in merged)
+        self.last_specialty_merges = merges
+        self.last_agents_pruned = max_agents - team_size
+
+        if merges:
+            print(f"✂️ Merged {len(merged)} near-duplicate specialties "
+                  f"(team of {team_size} instead of {max_agents}, "
+                  f"saving {max_agents - team_size} agent-generations per round)")
+            for kept, duplicates in merges.items():
+                print(f"   - {kept} ⟵ {', '.join(duplicates)}")
 
         # Ensure we have enough expert types
-        if len(expert_types) < max_agents:
+        if len(expert_types) < team_size:
             general_experts = [
                 "Systems Analyst", "Strategic Thinker", "Risk Assessor",
                 "Innovation Specialist", "Quality Reviewer", "Process Expert",
                 "Data Analyst", "Research Methodologist"
             ]
-            # Add general experts if needed, avoiding duplicates
+            # Add general experts if needed, skipping any that duplicate a listed specialty
             for expert in general_experts:
-                if len(expert_types) < max_agents and expert not in expert_types:
+                if len(expert_types) < team_size and all(
+                        specialty_similarity(expert, e) < threshold for e in expert_types):
                     expert_types.append(expert)
 
 
-        # Take first max_agents experts
-        selected_experts = expert_types[:max_agents]
+        # Take first team_size experts
+        selected_experts = expert_types[:team_size]
 
         # Create agent specifications
         agent_specs = []
-        conservative_count = max_agents // 2
+        conservative_count = len(selected_experts) // 2
 
         # Ensure domain_analysis is a valid dictionary before using it
         effective_domain_analysis = domain_analysis if domain_analysis is not None else {
@@ -482,7 +1492,8 @@ Format your response as a simple list of expert types, one per line."""
                 agent_id=f"{'Conservative' if is_conservative else 'Innovative'}_{expert_type.replace(' ', '')}_{i+1}",
                 agent_type="Conservative" if is_conservative else "Innovative",
                 specialty=expert_type,
-                model_assignment="conservative_model" if is_conservative else "innovative_model",
+                model_assignment=self.model_manager.resolve_model(
+                    'conservative_agents' if is_conservative else 'innovative_agents'),
                 temperature=0.1 + (i * 0.05) if is_conservative else 0.7 + (i * 0.05),
                 persona=f"{'Analytical and systematic' if is_conservative else 'Creative and forward-thinking'} {expert_type}",
                 context_summary=specialist_context  # Use the specialist context!
@@ -503,8 +1514,15 @@ class CentralQueryBrain:
         self.model_manager = CQBModelManager()
         self.agent_generator = None
         self.active_sessions: Dict[str, Dict[str, Any]] = {}
+        self._sessions_lock = threading.Lock()
         self.rao_config = {}
 
+        # Identical team requests in flight share one generation. A request also joins
+        # a larger team in flight for the same query, up to max_shared_team_size agents
+        # (a collaboration of 6 joins a debate of 7); each keeps a balanced subset
+        self.team_flights = SingleFlight("team generation")
+        self.max_shared_team_size = 8
+
         print("🧠 CQB Dynamic Agent Generation Brain initialized")
 
     def initialize_models(self, config_path: str = 'config.yaml') -> bool:
@@ -534,11 +1552,24 @@ class CentralQueryBrain:
             print("🔧 Please review licenses.yaml and third_party_licenses/")
             print("📋 Continuing with warnings...")
 
-        # Load both models
-        success = True
-        for model_id in ['conservative_model', 'innovative_model']:
-            if not self.model_manager.load_model(model_id):
-                success = False
+        # Catch bad configs now - with lazy loading nothing else checks them before first use
+        problems = self.model_manager.validate_configs()
+        if problems:
+            for problem in problems:
+                print(f"❌ Invalid model config: {problem}")
+            print("❌ Model initialization failed")
+            return False
+
+        # Engines load on first use unless lazy loading is off; listed preloads
+        # (or, without lazy loading, every routed model) initialize in parallel
+        engine_settings = self.model_manager.engine_settings
+        if engine_settings.get('lazy_loading', True):
+            preload = [m for m in engine_settings.get('preload', []) if m in self.model_manager.model_configs]
+            print(f"💤 Lazy engine loading: models load on first use"
+                  f"{' (preloading ' + ', '.join(preload) + ')' if preload else ''}")
+        else:
+            preload = self.model_manager.get_routed_models()
+        success = self.model_manager.load_models(preload)
 
         if success:
             print("✅ CQB models ready with license compliance tracking")
@@ -549,45 +1580,127 @@ class CentralQueryBrain:
 
         return success
 
-    def analyze_query_and_generate_agents(self, query: str, max_agents: int = 8) -> str:
-        """Analyze query and generate appropriate agents (RAO-aware)"""
+    def analyze_query_and_generate_agents(self, query: str, max_agents: int = 8,
+                                          latency_budget: float = None,
+                                          reuse_team: bool = True, auto_size: bool = False,
+                                          compute_budget: int = None,
+                                          cancel_token: CancelToken = None) -> str:
+        """Analyze query and generate appropriate agents (RAO-aware)
+
+        Identical requests in flight share one team generation: a request
+        arriving while the team is being generated waits for it. Latency
+        budgets only coalesce with budgets that make the same fast-path choice.
+        Without auto_size, a request also joins a larger team in flight for the
+        same query (up to max_shared_team_size agents); otherwise it generates
+        exactly max_agents. Each caller gets its own session holding a
+        type-balanced subset of at most max_agents agents. Nothing is reused
+        once the team is built.
+
+        Args:
+            query: Query to build a team for
+            max_agents: Maximum number of agents to generate
+            latency_budget: Optional seconds available for setup (interactive requests)
+            reuse_team: Set False to generate a team of max_agents without
+                joining an identical request in flight
+            auto_size: Size the team from query and context complexity (max_agents
+                is the upper bound); the plan is stored as the session's compute_plan
+            compute_budget: Optional generated-token budget for auto-sizing
+            cancel_token: Optional CancelToken for the extraction and analysis
+                generations; cancellable requests are not coalesced, so one
+                caller's cancel cannot cut short another's team
+        """
+        if not reuse_team or cancel_token is not None:
+            team = self._generate_team(query, max_agents, latency_budget, auto_size,
+                                       compute_budget, cancel_token)
+            return self._create_session(query, team, max_agents)
+
+        # The deadline only decides whether extraction stays on the fast path
+        context_manager = self.agent_generator.context_manager
+        fast_path_only = bool(context_manager) and not context_manager.allows_llm_extraction(latency_budget)
+
+        def team_key(team_size: int) -> str:
+            return request_key(query, team_size, auto_size, compute_budget, fast_path_only)
+
+        # Join the smallest larger team in flight; the compute plan depends on the
+        # cap, so auto-sized teams only join their own size
+        team_size = max_agents
+        if not auto_size:
+            for size in range(max_agents + 1, self.max_shared_team_size + 1):
+                if self.team_flights.is_in_flight(team_key(size)):
+                    team_size = size
+                    break
+
+        team = self.team_flights.do(
+            team_key(team_size),
+            self._generate_team, query, team_size, latency_budget, auto_size, compute_budget
+        )
+        return self._create_session(query, team, max_agents)
+
+    def _generate_team(self, query: str, max_agents: int, latency_budget: float = None,
+                       auto_size: bool = False, compute_budget: int = None,
+                       cancel_token: CancelToken = None) -> Dict[str, Any]:
+        """Generate a team for the query (shared by coalesced requests, so read-only)"""
 
         print(f"\n🧠 CQB Processing Query")
         print("=" * 40)
 
+        # Generate agents dynamically (with RAO support)
+        agents = self.agent_generator.analyze_and_generate_agents(
+            query, max_agents, latency_budget, auto_size, compute_budget, cancel_token
+        )
+        compute_plan = self.agent_generator.last_compute_plan
+
+        return {
+            'team_id': str(uuid.uuid4()),
+            'agents': agents,
+            'specialty_merges': dict(self.agent_generator.last_specialty_merges),
+            'agents_pruned': self.agent_generator.last_agents_pruned,
+            'compute_plan': compute_plan.to_dict() if compute_plan else None
+        }
+
+    def _create_session(self, query: str, team: Dict[str, Any], max_agents: int) -> str:
+        """Register up to max_agents of a generated team as a new session"""
+
         # Generate session ID
         session_id = str(uuid.uuid4())
-
-        # Generate agents dynamically (with RAO support)
-        agents = self.agent_generator.analyze_and_generate_agents(query, max_agents)
+        agents = balanced_team(team['agents'], max_agents)
 
         # Store session
-        self.active_sessions[session_id] = {
+        session = {
             'query': query,
             'agents': {agent.agent_id: agent for agent in agents},
             'agent_list': agents,
             'created_at': time.time(),
-            'rao_enabled': self.rao_config.get('enabled', False)
+            'rao_enabled': self.rao_config.get('enabled', False),
+            'team_id': team['team_id'],
+            'specialty_merges': team['specialty_merges'],
+            'agents_pruned': team['agents_pruned'],
+            'compute_plan': team['compute_plan'],
+            'model_routing': self.model_manager.get_model_routing()
         }
+        with self._sessions_lock:
+            self.active_sessions[session_id] = session
 
         rao_indicator = "🧠" if self.rao_config.get('enabled', False) else ""
         print(f"✅ Session {session_id[:8]}... created with {len(agents)} agents {rao_indicator}")
 
         return session_id
 
-    def get_agents(self, session_id: str) -> List[CQBAgent]:
-        """Get agents for a session"""
-        session = self.active_sessions.get(session_id)
+    def _get_session(self, session_id: str) -> Dict[str, Any]:
+        """Session dict by id (ValueError if unknown)"""
+        with self._sessions_lock:
+            session = self.active_sessions.get(session_id)
         if not session:
             raise ValueError(f"Session {session_id} not found")
+        return session
 
-        return session['agent_list']
+    def get_agents(self, session_id: str) -> List[CQBAgent]:
+        """Get agents for a session"""
+        return self._get_session(session_id)['agent_list']
 
     def get_agent(self, session_id: str, agent_id: str) -> CQBAgent:
         """Get specific agent from session"""
-        session = self.active_sessions.get(session_id)
-        if not session:
-            raise ValueError(f"Session {session_id} not found")
+        session = self._get_session(session_id)
 
         agent = session['agents'].get(agent_id)
         if not agent:
@@ -597,9 +1710,7 @@ class CentralQueryBrain:
 
     def get_session_info(self, session_id: str) -> Dict[str, Any]:
         """Get session information"""
-        session = self.active_sessions.get(session_id)
-        if not session:
-            raise ValueError(f"Session {session_id} not found")
+        session = self._get_session(session_id)
 
         return {
             'session_id': session_id,
@@ -608,17 +1719,34 @@ class CentralQueryBrain:
             'agents': [agent.get_agent_info() for agent in session['agent_list']],
             'created_at': session['created_at'],
             'rao_enabled': session.get('rao_enabled', False),
+            'team_id': session.get('team_id'),
+            'specialty_merges': session.get('specialty_merges', {}),
+            'agents_pruned': session.get('agents_pruned', 0),
+            'compute_plan': session.get('compute_plan'),
+            'model_routing': session.get('model_routing', {}),
             'license_manifest': self.model_manager.get_license_manifest()
         }
 
+    def get_coalescing_stats(self) -> Dict[str, Dict[str, int]]:
+        """How many team, extraction, index and generation requests ran vs. joined one in flight"""
+        stats = {'generation': self.model_manager.generation_flights.get_stats()}
+        context_manager = self.agent_generator.context_manager if self.agent_generator else None
+        if context_manager:
+            stats['extraction'] = context_manager.extraction_flights.get_stats()
+            stats['retrieval_index'] = context_manager.index_flights.get_stats()
+        stats['teams'] = self.team_flights.get_stats()
+        return stats
+
     def list_active_sessions(self) -> List[str]:
         """List active session IDs"""
-        return list(self.active_sessions.keys())
+        with self._sessions_lock:
+            return list(self.active_sessions.keys())
 
     def remove_session(self, session_id: str):
         """Remove session and clean up"""
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
+        with self._sessions_lock:
+            removed = self.active_sessions.pop(session_id, None)
+        if removed is not None:
             print(f"🗑️ Session {session_id[:8]}... removed")
 
 # =============================================================================
@@ -666,6 +1794,91 @@ def test_rao_cqb(cqb: CentralQueryBrain):
 
     return session_id
 
+def test_team_coalescing(cqb: CentralQueryBrain) -> bool:
+    """Check that a collaboration started during a debate's team generation shares it"""
+    import inspect
+    from collaboration_module import AgentCollaborationModule
+    from adversarial_debate_module import AdversarialDebateModule
+
+    collab_module = AgentCollaborationModule(cqb)
+    debate_module = AdversarialDebateModule(cqb)
+    collab_agents = inspect.signature(collab_module.collaborate_on_query).parameters['max_agents'].default
+    debate_agents = inspect.signature(debate_module.run_debate_on_query).parameters['max_agents'].default
+
+    # Hold the first generation until the second request has joined it
+    generate = cqb.agent_generator.analyze_and_generate_agents
+    joined_before = cqb.team_flights.coalesced
+
+    def held_generate(*args, **kwargs):
+        deadline = time.time() + 5.0
+        while cqb.team_flights.coalesced == joined_before and time.time() < deadline:
+            time.sleep(0.01)
+        return generate(*args, **kwargs)
+
+    test_query = "How should we phase the migration of our billing system to the new platform?"
+    executed_before = cqb.team_flights.executed
+    cqb.agent_generator.analyze_and_generate_agents = held_generate
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            # The larger team must be in flight for the smaller request to join it
+            debate = pool.submit(debate_module._resolve_agents, test_query, debate_agents)
+            deadline = time.time() + 5.0
+            while cqb.team_flights.executed == executed_before and time.time() < deadline:
+                time.sleep(0.01)
+            collab = pool.submit(collab_module._resolve_agents, test_query, collab_agents)
+            (collab_session, collab_team), (debate_session, debate_team) = collab.result(), debate.result()
+    finally:
+        del cqb.agent_generator.analyze_and_generate_agents
+
+    generations = cqb.team_flights.executed - executed_before
+    shared = cqb.get_session_info(collab_session)['team_id'] == cqb.get_session_info(debate_session)['team_id']
+    coalesced = generations == 1 and shared
+
+    print(f"\n🔗 Team Coalescing Test:")
+    print(f"   Collaboration ({collab_agents} agents): {len(collab_team)} agents")
+    print(f"   Debate ({debate_agents} agents): {len(debate_team)} agents")
+    print(f"   Team generations: {generations} {'✅' if coalesced else '❌'}")
+    return coalesced
+
+def test_streaming_cancel(cqb: CentralQueryBrain) -> bool:
+    """Check that cancelling a streamed extraction with an early analysis queued still builds a team"""
+    generator = cqb.agent_generator
+    if not generator.context_manager:
+        print("⚠️ Streaming cancel test needs RAO enabled")
+        return False
+
+    # Cancel as soon as the early analysis is queued, before an engine step can carry it
+    cancel_token = CancelToken()
+    dropped = []
+    stream_text = cqb.model_manager.stream_text
+
+    def cancelling_stream(*args, **kwargs):
+        side_requests = kwargs.get('side_requests')
+        for piece in stream_text(*args, **kwargs):
+            yield piece
+            if side_requests and not cancel_token.cancelled:
+                dropped.extend(side_requests)
+                cancel_token.cancel("streaming cancel test")
+
+    rao_config = generator.rao_config
+    generator.rao_config = dict(rao_config, streaming_extraction=True, streaming_min_entities=1)
+    cqb.model_manager.stream_text = cancelling_stream
+    try:
+        agents = generator.analyze_and_generate_agents(
+            "Which budget items put the project deadline at risk?", max_agents=4, cancel_token=cancel_token
+        )
+    finally:
+        del cqb.model_manager.stream_text
+        generator.rao_config = rao_config
+
+    dropped_cancelled = all(request.future.cancelled() for request in dropped)
+    print(f"\n🛑 Streaming Cancel Test:")
+    print(f"   Queued analysis dropped: {len(dropped)} {'✅' if dropped_cancelled else '❌'}")
+    print(f"   Agents after cancel: {len(agents)}")
+    if not dropped:
+        print("   ⚠️ No early analysis was queued - extraction streamed no entities")
+    return bool(dropped) and dropped_cancelled
+
 if __name__ == "__main__":
     print("🧠 CQB Dynamic Agent Generation Brain with RAO")
     print("=" * 50)
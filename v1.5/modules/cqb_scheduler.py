@@ -0,0 +1,420 @@
+# =============================================================================
+# CQB Scheduler - Admission Control, Priority Classes and Fair Queuing
+# =============================================================================
+
+import time
+import uuid
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from dataclasses import dataclass, field
+from concurrent.futures import Future
+
+# Lower value dispatches first; a waiting interactive job always beats a batch job
+PRIORITY_CLASSES = {'interactive': 0, 'batch': 1}
+
+class QueueFullError(RuntimeError):
+    """Raised by submit() when admitting the job would exceed a queue limit"""
+
+    def __init__(self, message: str, tenant: str, priority: str, depth: int, limit: int):
+        super().__init__(message)
+        self.tenant = tenant
+        self.priority = priority
+        self.depth = depth
+        self.limit = limit
+
+@dataclass
+class TenantPolicy:
+    """Fair-share weight and limits for one tenant"""
+    weight: float = 1.0
+    max_concurrent: int = 2
+    max_queued: int = 32
+
+@dataclass
+class ScheduledJob:
+    """A submitted unit of work waiting for (or holding) a worker slot"""
+    job_id: str
+    tenant: str
+    priority: str
+    fn: Callable[..., Any]
+    args: tuple = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    cost: float = 1.0
+    virtual_start: float = 0.0
+    virtual_finish: float = 0.0
+    sequence: int = 0
+    enqueued_at: float = 0.0
+    started_at: Optional[float] = None
+    future: Future = field(default_factory=Future)
+
+# =============================================================================
+# Scheduler
+# =============================================================================
+
+class CQBScheduler:
+    """Admission control and fair scheduling in front of a CQBModelManager.
+
+    Jobs are admitted into per-priority queues. Interactive jobs dispatch before
+    batch jobs, and batch jobs may never hold the worker slots reserved for
+    interactive traffic. Within a priority class, tenants share workers by
+    weighted fair queuing (start-time fair queuing over job cost), subject to
+    each tenant's concurrency limit. Full queues reject new jobs with
+    QueueFullError instead of growing without bound.
+    """
+
+    def __init__(self, backend, max_workers: int = 4, reserved_interactive_workers: int = 1,
+                 max_queue_depth: Dict[str, int] = None, default_policy: TenantPolicy = None,
+                 autostart: bool = True):
+        """Initialize the scheduler.
+
+        Args:
+            backend: Object the convenience methods call (a CQBModelManager or StubBackend)
+            max_workers: Jobs running at once
+            reserved_interactive_workers: Worker slots batch jobs may not occupy
+            max_queue_depth: Waiting jobs allowed per priority class
+            default_policy: Policy for tenants without configure_tenant()
+            autostart: Start the workers now (tests start them after queuing)
+        """
+        self.backend = backend
+        self.max_workers = max_workers
+        self.reserved_interactive_workers = min(reserved_interactive_workers, max_workers - 1)
+        self.max_queue_depth = {'interactive': 64, 'batch': 256, **(max_queue_depth or {})}
+        self.default_policy = default_policy or TenantPolicy()
+        self.tenant_policies: Dict[str, TenantPolicy] = {}
+
+        self._condition = threading.Condition()
+        self._queues: Dict[str, List[ScheduledJob]] = {priority: [] for priority in PRIORITY_CLASSES}
+        self._running: Dict[str, int] = {}
+        self._running_by_priority: Dict[str, int] = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._tenant_finish: Dict[str, float] = {}
+        self._virtual_time: Dict[str, float] = {priority: 0.0 for priority in PRIORITY_CLASSES}
+        self._sequence = 0
+        self._shutdown = False
+        self._workers: List[threading.Thread] = []
+
+        # Metrics
+        self.completed: Dict[str, int] = {priority: 0 for priority in PRIORITY_CLASSES}
+        self.failed: Dict[str, int] = {priority: 0 for priority in PRIORITY_CLASSES}
+        self.rejected: Dict[str, int] = {priority: 0 for priority in PRIORITY_CLASSES}
+        self.wait_times: Dict[str, List[float]] = {priority: [] for priority in PRIORITY_CLASSES}
+        self.wait_sample_size = 1024
+
+        if autostart:
+            self.start()
+
+        print(f"🚦 CQB Scheduler initialized ({max_workers} workers, "
+              f"{self.reserved_interactive_workers} reserved for interactive)")
+
+    def configure_tenant(self, tenant: str, weight: float = 1.0, max_concurrent: int = 2,
+                         max_queued: int = 32):
+        """Set a tenant's fair-share weight, running-job limit and waiting-job limit"""
+        with self._condition:
+            self.tenant_policies[tenant] = TenantPolicy(weight, max_concurrent, max_queued)
+
+    def _policy(self, tenant: str) -> TenantPolicy:
+        return self.tenant_policies.get(tenant, self.default_policy)
+
+    # -------------------------------------------------------------------------
+    # Submission
+    # -------------------------------------------------------------------------
+
+    def submit(self, tenant: str, fn: Callable[..., Any], *args, priority: str = 'interactive',
+               cost: float = 1.0, **kwargs) -> Future:
+        """Admit a job or reject it with QueueFullError
+
+        Args:
+            tenant: Tenant the job is accounted to
+            fn: Work to run, called as fn(*args, **kwargs) on a worker thread
+            priority: "interactive" or "batch"
+            cost: Relative size (e.g. max_tokens) used for fair queuing
+
+        Returns:
+            Future with the job's result
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority '{priority}' (expected one of {', '.join(PRIORITY_CLASSES)})")
+
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Scheduler is shut down")
+
+            depth = len(self._queues[priority])
+            limit = self.max_queue_depth[priority]
+            if depth >= limit:
+                self.rejected[priority] += 1
+                raise QueueFullError(
+                    f"{priority} queue full ({depth}/{limit} waiting) - retry later",
+                    tenant, priority, depth, limit
+                )
+
+            policy = self._policy(tenant)
+            tenant_depth = sum(1 for queue in self._queues.values() for job in queue if job.tenant == tenant)
+            if tenant_depth >= policy.max_queued:
+                self.rejected[priority] += 1
+                raise QueueFullError(
+                    f"Tenant '{tenant}' has {tenant_depth}/{policy.max_queued} jobs waiting - retry later",
+                    tenant, priority, tenant_depth, policy.max_queued
+                )
+
+            # Start-time fair queuing: a tenant's next job starts where its previous
+            # one finished in virtual time, and lasts cost / weight
+            finish_key = f"{priority}:{tenant}"
+            virtual_start = max(self._virtual_time[priority], self._tenant_finish.get(finish_key, 0.0))
+            virtual_finish = virtual_start + cost / max(policy.weight, 1e-6)
+            self._tenant_finish[finish_key] = virtual_finish
+
+            self._sequence += 1
+            job = ScheduledJob(
+                job_id=str(uuid.uuid4()),
+                tenant=tenant,
+                priority=priority,
+                fn=fn,
+                args=args,
+                kwargs=kwargs,
+                cost=cost,
+                virtual_start=virtual_start,
+                virtual_finish=virtual_finish,
+                sequence=self._sequence,
+                enqueued_at=time.time()
+            )
+            self._queues[priority].append(job)
+            self._condition.notify()
+        return job.future
+
+    def generate_text(self, tenant: str, model_id: str, prompt: str, temperature: float = None,
+                      max_tokens: int = None, priority: str = 'interactive') -> Future:
+        """Schedule backend.generate_text; cost is the token limit"""
+        cost = max_tokens or self._default_max_tokens(model_id)
+        return self.submit(tenant, self.backend.generate_text, model_id, prompt, temperature, max_tokens,
+                           priority=priority, cost=cost)
+
+    def _default_max_tokens(self, model_id: str) -> int:
+        config = getattr(self.backend, 'model_configs', {}).get(model_id)
+        return config.max_tokens if config else 1
+
+    # -------------------------------------------------------------------------
+    # Dispatch
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        """Start the worker threads"""
+        with self._condition:
+            if self._workers:
+                return
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._work, name=f"cqb-scheduler-{i}", daemon=True)
+                self._workers.append(worker)
+        for worker in self._workers:
+            worker.start()
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs; workers exit once the queues are drained"""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _next_job(self) -> Optional[ScheduledJob]:
+        """Highest-priority eligible job with the smallest virtual finish (caller holds the lock)"""
+        running_total = sum(self._running_by_priority.values())
+        for priority in sorted(PRIORITY_CLASSES, key=PRIORITY_CLASSES.get):
+            if priority != 'interactive' and \
+                    running_total >= self.max_workers - self.reserved_interactive_workers:
+                continue
+            eligible = [job for job in self._queues[priority]
+                        if self._running.get(job.tenant, 0) < self._policy(job.tenant).max_concurrent]
+            if eligible:
+                return min(eligible, key=lambda job: (job.virtual_finish, job.sequence))
+        return None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    if self._shutdown and not any(self._queues.values()):
+                        return
+                    self._condition.wait()
+                    job = self._next_job()
+
+                self._queues[job.priority].remove(job)
+                self._virtual_time[job.priority] = max(self._virtual_time[job.priority], job.virtual_start)
+                self._running[job.tenant] = self._running.get(job.tenant, 0) + 1
+                self._running_by_priority[job.priority] += 1
+                job.started_at = time.time()
+                self._record_wait(job.priority, job.started_at - job.enqueued_at)
+
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except Exception as e:
+                job.future.set_exception(e)
+                succeeded = False
+            else:
+                job.future.set_result(result)
+                succeeded = True
+
+            with self._condition:
+                self._running[job.tenant] -= 1
+                self._running_by_priority[job.priority] -= 1
+                if succeeded:
+                    self.completed[job.priority] += 1
+                else:
+                    self.failed[job.priority] += 1
+                self._condition.notify_all()
+
+    def _record_wait(self, priority: str, seconds: float):
+        samples = self.wait_times[priority]
+        samples.append(seconds)
+        if len(samples) > self.wait_sample_size:
+            del samples[0]
+
+    # -------------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------------
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, running jobs and wait times per priority class and tenant"""
+        with self._condition:
+            tenants: Dict[str, Dict[str, int]] = {}
+            for priority, queue in self._queues.items():
+                for job in queue:
+                    tenants.setdefault(job.tenant, {'queued': 0, 'running': 0})['queued'] += 1
+            for tenant, running in self._running.items():
+                tenants.setdefault(tenant, {'queued': 0, 'running': 0})['running'] = running
+
+            classes = {}
+            for priority in PRIORITY_CLASSES:
+                waits = sorted(self.wait_times[priority])
+                classes[priority] = {
+                    'queue_depth': len(self._queues[priority]),
+                    'max_queue_depth': self.max_queue_depth[priority],
+                    'running': self._running_by_priority[priority],
+                    'completed': self.completed[priority],
+                    'failed': self.failed[priority],
+                    'rejected': self.rejected[priority],
+                    'wait_seconds': {
+                        'mean': sum(waits) / len(waits) if waits else 0.0,
+                        'p95': waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0,
+                        'max': waits[-1] if waits else 0.0
+                    }
+                }
+            return {'classes': classes, 'tenants': tenants}
+
+# =============================================================================
+# Deterministic Stub Backend
+# =============================================================================
+
+class StubBackend:
+    """Stand-in for CQBModelManager with fixed latency and deterministic output
+
+    Records the prompts in the order they ran, so scheduling decisions can be
+    checked without a GPU. With a hold event, calls block until it is set, so
+    tests can inspect the scheduler while jobs are known to be running.
+    """
+
+    def __init__(self, latency: float = 0.0, hold: threading.Event = None):
+        self.latency = latency
+        self.hold = hold
+        self.model_configs: Dict[str, Any] = {}
+        self.calls: List[str] = []
+        self._lock = threading.Lock()
+
+    def generate_text(self, model_id: str, prompt: str, temperature: float = None,
+                      max_tokens: int = None) -> str:
+        with self._lock:
+            self.calls.append(prompt)
+        if self.hold is not None:
+            self.hold.wait()
+        if self.latency:
+            time.sleep(self.latency)
+        return f"[{model_id}] {prompt}"
+
+def _wait_for(condition: Callable[[], bool], timeout: float = 2.0) -> bool:
+    """Poll condition until it holds or timeout passes"""
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+def test_scheduler():
+    """Check priority, fair queuing, tenant limits and backpressure on the stub backend"""
+
+    print("🧪 Testing CQB Scheduler")
+    print("=" * 40)
+
+    # One worker, started after queuing, makes the dispatch order deterministic
+    backend = StubBackend()
+    scheduler = CQBScheduler(backend, max_workers=1, reserved_interactive_workers=0, autostart=False)
+    scheduler.configure_tenant('eval_job', weight=1.0)
+    scheduler.configure_tenant('analytics', weight=2.0)
+
+    for i in range(4):
+        scheduler.generate_text('eval_job', 'stub', f"eval {i}", max_tokens=100, priority='batch')
+        scheduler.generate_text('analytics', 'stub', f"analytics {i}", max_tokens=100, priority='batch')
+    interactive = scheduler.generate_text('alice', 'stub', "alice question", max_tokens=100)
+    scheduler.start()
+    scheduler.shutdown()
+
+    assert interactive.result() == "[stub] alice question"
+    assert backend.calls[0] == "alice question", "interactive job must run first"
+    batch_order = [call.split()[0] for call in backend.calls[1:]]
+    # Weight 2 gets two jobs for each of the weight-1 tenant's, until it runs out
+    assert batch_order[:3].count('analytics') == 2, batch_order
+    print(f"   ✅ Priority + weighted fair queuing order: {backend.calls}")
+
+    # Batch jobs never take the reserved interactive slot; the held batch job
+    # keeps the unreserved slot busy while the interactive one runs
+    hold = threading.Event()
+    backend = StubBackend(hold=hold)
+    scheduler = CQBScheduler(backend, max_workers=2, reserved_interactive_workers=1,
+                             default_policy=TenantPolicy(max_concurrent=4))
+    batch = [scheduler.generate_text('eval_job', 'stub', f"eval {i}", priority='batch') for i in range(4)]
+    assert _wait_for(lambda: len(backend.calls) == 1), "first batch job never started"
+    assert scheduler.get_metrics()['classes']['batch']['running'] == 1
+    assert scheduler.submit('bob', lambda: "bob answer").result(timeout=1.0) == "bob answer"
+    assert scheduler.get_metrics()['classes']['batch']['queue_depth'] == 3, "interactive job waited behind batch"
+    hold.set()
+    [job.result(timeout=1.0) for job in batch]
+    print(f"   ✅ Interactive job ran while {len(batch)} batch jobs were queued")
+    scheduler.shutdown()
+
+    # Per-tenant concurrency limit
+    hold = threading.Event()
+    backend = StubBackend(hold=hold)
+    scheduler = CQBScheduler(backend, max_workers=3, reserved_interactive_workers=0)
+    scheduler.configure_tenant('eval_job', max_concurrent=1)
+    jobs = [scheduler.generate_text('eval_job', 'stub', f"eval {i}", priority='batch') for i in range(3)]
+    assert _wait_for(lambda: len(backend.calls) == 1), "first job never started"
+    running = scheduler.get_metrics()['tenants']['eval_job']['running']
+    assert running == 1 and len(backend.calls) == 1, running
+    hold.set()
+    [job.result(timeout=1.0) for job in jobs]
+    print(f"   ✅ Tenant concurrency limit held ({running} running)")
+    scheduler.shutdown()
+
+    # Backpressure
+    scheduler = CQBScheduler(StubBackend(), max_workers=1, max_queue_depth={'batch': 2}, autostart=False)
+    scheduler.generate_text('eval_job', 'stub', "a", priority='batch')
+    scheduler.generate_text('eval_job', 'stub', "b", priority='batch')
+    try:
+        scheduler.generate_text('eval_job', 'stub', "c", priority='batch')
+        raise AssertionError("expected QueueFullError")
+    except QueueFullError as e:
+        print(f"   ✅ Backpressure: {e}")
+    scheduler.start()
+    scheduler.shutdown()
+
+    metrics = scheduler.get_metrics()
+    assert metrics['classes']['batch']['rejected'] == 1 and metrics['classes']['batch']['completed'] == 2
+    print(f"   📊 Metrics: {metrics['classes']['batch']}")
+    print("✅ Scheduler tests passed")
+
+# =============================================================================
+# Usage Example
+# =============================================================================
+
+if __name__ == "__main__":
+    test_scheduler()
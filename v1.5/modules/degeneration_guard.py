@@ -0,0 +1,121 @@
+# =============================================================================
+# Degeneration Guard - Early Abort for Looping or Role-Drifting Generations
+# =============================================================================
+
+import re
+from typing import Dict, List, Optional, Tuple
+from collections import Counter
+
+# Chat-template markers that mean the model started writing another turn
+ROLE_MARKERS = ('<|im_start|>', '<|im_end|>', '<|endoftext|>', '</s>')
+
+_WORD_PATTERN = re.compile(r'\S+')
+
+# =============================================================================
+# Degeneration Guard
+# =============================================================================
+
+class DegenerationGuard:
+    """Checks partial generations for repetition loops and role-token drift.
+
+    Called after every chunked generation step. A verdict gives the character
+    position to cut the text at and the stop reason, so the caller can abort
+    the request and keep only the useful prefix.
+    """
+
+    def __init__(self, ngram_size: int = 6, max_ngram_repeats: int = 3,
+                 max_line_repeats: int = 3, window_words: int = 300):
+        """Initialize the guard.
+
+        Args:
+            ngram_size: Word n-gram length used to detect loops
+            max_ngram_repeats: Occurrences of one n-gram in the window that count as a loop
+            max_line_repeats: Occurrences of one (non-trivial) line that count as a loop
+            window_words: Only the most recent words are scanned for n-gram loops
+        """
+        self.ngram_size = ngram_size
+        self.max_ngram_repeats = max_ngram_repeats
+        self.max_line_repeats = max_line_repeats
+        self.window_words = window_words
+
+    def check(self, text: str) -> Optional[Tuple[int, str]]:
+        """Check generated text so far.
+
+        Args:
+            text: Everything generated for the request so far
+
+        Returns:
+            (cut position, stop reason) if generation should stop, else None
+        """
+        drift = self._find_role_drift(text)
+        if drift is not None:
+            return drift, "role_drift"
+
+        loop = self._find_line_loop(text)
+        if loop is None:
+            loop = self._find_ngram_loop(text)
+        if loop is not None:
+            return loop, "repetition"
+
+        return None
+
+    def _find_role_drift(self, text: str) -> Optional[int]:
+        """Position of the first chat-template marker, if any"""
+        positions = [text.find(marker) for marker in ROLE_MARKERS]
+        positions = [p for p in positions if p >= 0]
+        return min(positions) if positions else None
+
+    def _find_line_loop(self, text: str) -> Optional[int]:
+        """Cut position before the second copy of a line repeated too often"""
+        seen: Dict[str, List[int]] = {}
+        offset = 0
+        for line in text.split('\n'):
+            key = line.strip().lower()
+            if len(key) >= 12:
+                seen.setdefault(key, []).append(offset)
+                if len(seen[key]) >= self.max_line_repeats:
+                    return seen[key][1]
+            offset += len(line) + 1
+        return None
+
+    def _find_ngram_loop(self, text: str) -> Optional[int]:
+        """Cut position at the second occurrence of an n-gram repeated too often"""
+        words = list(_WORD_PATTERN.finditer(text))
+        n = self.ngram_size
+        if len(words) < n * self.max_ngram_repeats:
+            return None
+
+        window = words[-self.window_words:]
+        tokens = [w.group().lower() for w in window]
+        grams = [tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+
+        counts = Counter(grams)
+        gram, count = counts.most_common(1)[0]
+        if count < self.max_ngram_repeats:
+            return None
+
+        occurrences = [i for i, g in enumerate(grams) if g == gram]
+        return window[occurrences[1]].start()
+
+# =============================================================================
+# Usage Example
+# =============================================================================
+
+if __name__ == "__main__":
+    print("🧪 Testing Degeneration Guard")
+    print("=" * 40)
+
+    guard = DegenerationGuard()
+    samples = {
+        "clean": "Budget allocation should favour the equipment line. Staffing costs are fixed.",
+        "loop": "Key point: " + "we must reduce costs across every department now. " * 5,
+        "drift": "Final recommendation is to delay.<|im_end|>\n<|im_start|>user\nThanks!",
+    }
+
+    for name, sample in samples.items():
+        verdict = guard.check(sample)
+        if verdict:
+            cut, reason = verdict
+            print(f"   {name}: {reason} -> kept {sample[:cut]!r}")
+        else:
+            print(f"   {name}: ok")
@@ -7,6 +7,7 @@ import os
 import json
 import time
 import re
+import threading
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from collections import defaultdict
@@ -19,7 +20,14 @@ from cqb.langextract import resolver
 
 # Local imports
 from vllm_langextract_adapter import VLLMLanguageModel
-from universal_extraction_schemas import UniversalExtractionSchemas
+from universal_extraction_schemas import (
+    UniversalExtractionSchemas, ExampleSelector, get_compiled_extraction_prompt
+)
+from specialty_registry import get_specialty_registry
+from heuristic_extractor import HeuristicExtractor
+from context_retrieval import BM25ChunkIndex, ContextChunk, content_hash, index_path_for
+from context_corpus import ContextCorpus, CorpusSnapshot
+from single_flight import SingleFlight, request_key
 
 # =============================================================================
 # ROBUST JSON SANITIZATION PIPELINE
@@ -187,6 +195,86 @@ def final_json_repair(text: str) -> str:
     
     return text
 
+# =============================================================================
+# INCREMENTAL EXTRACTION PARSING (STREAMING)
+# =============================================================================
+
+_EXTRACTIONS_ARRAY = re.compile(r'"extractions"\s*:\s*\[')
+
+class IncrementalExtractionParser:
+    """Pulls complete entity objects out of a partially generated extraction response.
+
+    String and brace state is carried across fed pieces, so each object in the
+    "extractions" array is returned as soon as its closing brace arrives. The
+    full response still goes through the robust sanitizer once generation ends.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.closed = False
+        self._position = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+
+    def feed(self, text: str) -> List[Dict]:
+        """Add generated text; returns the entity objects completed by it"""
+        self.buffer += text
+        if self.closed:
+            return []
+
+        if self._position is None:
+            match = _EXTRACTIONS_ARRAY.search(self.buffer)
+            if not match:
+                return []
+            self._position = match.end()
+
+        completed = []
+        buffer = self.buffer
+        position = self._position
+        while position < len(buffer):
+            char = buffer[position]
+            position += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._object_start = position - 1
+                self._depth += 1
+            elif char == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    entity = self._parse_object(buffer[self._object_start:position])
+                    if entity is not None:
+                        completed.append(entity)
+            elif char == ']' and self._depth == 0:
+                self.closed = True
+                break
+
+        self._position = position
+        return completed
+
+    def _parse_object(self, text: str) -> Optional[Dict]:
+        """Parse one entity object, with light repair; None if it stays broken"""
+        try:
+            entity = json.loads(text)
+        except json.JSONDecodeError:
+            # Repair only objects that fail to parse as generated
+            try:
+                entity = json.loads(sanitize_content(text))
+            except json.JSONDecodeError:
+                return None
+        return entity if isinstance(entity, dict) else None
+
 # =============================================================================
 # Enhanced RAO Context Manager with Robust Parsing
 # =============================================================================
@@ -197,16 +285,69 @@ class EnhancedRAOContextManager:
     NOW WITH ROBUST JSON SANITIZATION PIPELINE!
     """
     
-    def __init__(self, cqb_model_manager, max_context_length: int = 2000):
+    def __init__(self, cqb_model_manager, max_context_length: int = 2000,
+                 specialty_registry_path: str = None, extraction_tier: str = "auto",
+                 fast_path_confidence: float = 0.75, llm_extraction_min_budget: float = 30.0,
+                 retrieval_top_k: int = 5, retrieval_chunk_chars: int = 400,
+                 persist_retrieval_index: bool = True, corpus_index_dir: str = '.cqb_corpus',
+                 few_shot_examples: int = None, few_shot_token_budget: int = None,
+                 streaming_chunk_tokens: int = 128):
         """Initialize the enhanced context manager.
         
         Args:
             cqb_model_manager: CQB model manager for vLLM inference
             max_context_length: Maximum context length for processing
+            specialty_registry_path: Optional path to a specialty registry YAML
+            extraction_tier: "auto" (fast pass, escalate when unsure), "fast" or "llm"
+            fast_path_confidence: Minimum fast-pass confidence to skip the LLM pass
+            llm_extraction_min_budget: Latency budgets (seconds) below this skip the LLM pass
+            retrieval_top_k: Maximum query-relevant chunks passed to LLM extraction
+            retrieval_chunk_chars: Target chunk size for the BM25 retrieval index
+            persist_retrieval_index: Save retrieval indexes next to their context files
+            corpus_index_dir: Directory for the persisted multi-document corpus index
+            few_shot_examples: Use only the k examples closest to each document (None = all)
+            few_shot_token_budget: Estimated-token budget for the selected examples
+            streaming_chunk_tokens: Tokens per engine step when extraction is streamed
         """
         self.max_context_length = max_context_length
         self.model_manager = cqb_model_manager
         self.context_file_cache = {}
+        self._file_cache_lock = threading.Lock()
+        self.extraction_tier = extraction_tier
+        self.fast_path_confidence = fast_path_confidence
+        self.llm_extraction_min_budget = llm_extraction_min_budget
+        self.heuristic_extractor = HeuristicExtractor()
+        
+        # BM25 retrieval indexes keyed by document hash
+        self.retrieval_top_k = retrieval_top_k
+        self.retrieval_chunk_chars = retrieval_chunk_chars
+        self.persist_retrieval_index = persist_retrieval_index
+        self.retrieval_indexes: Dict[str, BM25ChunkIndex] = {}
+        self._index_lock = threading.Lock()
+        
+        # (prefix version used, LLM extractions) keyed by (chunk content hash, extraction prompt version)
+        self.chunk_extraction_cache: Dict[Tuple[str, str], Tuple[str, List[Dict]]] = {}
+        self.chunk_cache_size = 2048
+        self._extraction_cache_lock = threading.Lock()
+        
+        # Identical in-flight extractions and index builds (same content hash) run once
+        self.extraction_flights = SingleFlight("extraction")
+        self.index_flights = SingleFlight("retrieval index build")
+        
+        # Multi-document corpus (created on first use)
+        self.corpus_index_dir = corpus_index_dir
+        self.corpus: Optional[ContextCorpus] = None
+        self._corpus_lock = threading.Lock()
+        
+        # Relevance-based few-shot selection (None keeps every universal example)
+        self.few_shot_examples = few_shot_examples
+        self.few_shot_token_budget = few_shot_token_budget
+        
+        # Streamed extraction generates in steps of this many tokens
+        self.streaming_chunk_tokens = streaming_chunk_tokens
+        
+        # Specialty-to-extraction focus mapping (loaded once per process)
+        self.specialty_registry = get_specialty_registry(specialty_registry_path)
         
         # Initialize LangExtract components
         self._initialize_extraction_engine()
@@ -219,19 +360,15 @@ class EnhancedRAOContextManager:
             # Create vLLM adapter
             self.vllm_language_model = VLLMLanguageModel(
                 cqb_model_manager=self.model_manager,
-                model_id="conservative_model",
+                model_id=self.model_manager.resolve_model('extraction'),
                 temperature=0.3
             )
             
-            # Get universal extraction template
-            self.extraction_template = UniversalExtractionSchemas.create_extraction_template()
-            
-            # Create prompt generator
-            self.prompt_generator = QAPromptGenerator(
-                template=self.extraction_template,
-                format_type=FormatType.JSON,
-                fence_output=True
-            )
+            # Compiled prompt: description + few-shot examples rendered once per process
+            self.compiled_prompt = get_compiled_extraction_prompt(FormatType.JSON, fence_output=True)
+            self.prompt_generator = self.compiled_prompt.prompt_generator
+            self.extraction_template = self.prompt_generator.template
+            self.example_selector = ExampleSelector(FormatType.JSON, fence_output=True)
             
             # Get specialist mapping
             self.specialist_mapping = UniversalExtractionSchemas.get_specialist_mapping()
@@ -243,7 +380,11 @@ class EnhancedRAOContextManager:
             raise
     
     def load_context_file(self, filename: str) -> Optional[str]:
-        """Load context file content with caching.
+        """Load context file content with change-aware caching.
+        
+        The cached copy is reused while the file's mtime and size are unchanged.
+        If either differs, the file is re-read and its content hash compared, so
+        a touched-but-identical file keeps its cached state.
         
         Args:
             filename: Path to context file
@@ -252,34 +393,65 @@ class EnhancedRAOContextManager:
             File content or None if not found
         """
         try:
-            if filename in self.context_file_cache:
+            if not os.path.exists(filename):
+                print(f"⚠️ Context file not found: {filename}")
+                return None
+            
+            stat = os.stat(filename)
+            with self._file_cache_lock:
+                cached = self.context_file_cache.get(filename)
+            
+            if cached and cached['mtime'] == stat.st_mtime and cached['size'] == stat.st_size:
                 print(f"📋 Using cached context file: {filename}")
-                return self.context_file_cache[filename]
+                return cached['content']
             
-            if os.path.exists(filename):
-                with open(filename, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    
-                # Cache the content
-                self.context_file_cache[filename] = content
-                
-                print(f"✅ Loaded context file: {filename} ({len(content)} chars)")
-                return content
+            with open(filename, 'r', encoding='utf-8') as f:
+                content = f.read()
+            
+            document_hash = content_hash(content)
+            if cached and cached['hash'] == document_hash:
+                print(f"📋 Context file touched but unchanged: {filename}")
+            elif cached:
+                print(f"🔄 Context file changed, reloaded: {filename} ({len(content)} chars)")
             else:
-                print(f"⚠️ Context file not found: {filename}")
-                return None
+                print(f"✅ Loaded context file: {filename} ({len(content)} chars)")
+            
+            # Cache the content with its validation fingerprint
+            with self._file_cache_lock:
+                self.context_file_cache[filename] = {
+                    'content': content,
+                    'mtime': stat.st_mtime,
+                    'size': stat.st_size,
+                    'hash': document_hash
+                }
+            return content
                 
         except Exception as e:
             print(f"❌ Error loading context file {filename}: {e}")
             return None
     
     def analyze_context_for_agent_generation(self, context_content: str, 
-                                          query: str) -> Dict[str, Any]:
+                                          query: str, extraction_tier: str = None,
+                                          latency_budget: float = None,
+                                          source_path: str = None,
+                                          on_partial_analysis=None,
+                                          side_requests: List = None,
+                                          cancel_token=None) -> Dict[str, Any]:
         """Analyze context content using LangExtract for agent generation.
         
         Args:
             context_content: Raw context document content
             query: Query that will be processed by agents
+            extraction_tier: Override the configured tier ("auto", "fast" or "llm")
+            latency_budget: Optional seconds available; tight budgets stay on the fast path
+            source_path: Context file the content came from (retrieval index location)
+            on_partial_analysis: Optional callback(partial_analysis, side_requests); when
+                set, LLM extraction is streamed and the callback sees the analysis
+                rebuilt after every newly parsed entity
+            side_requests: Optional queue of generation requests to batch into the
+                first LLM extraction step (left queued if no LLM pass runs)
+            cancel_token: Optional CancelToken; LLM extraction stops at its next
+                chunked step once cancelled and the fast path results are used
             
         Returns:
             Dictionary with agent generation parameters
@@ -290,45 +462,464 @@ class EnhancedRAOContextManager:
         print("🔍 Running enhanced extraction analysis...")
         
         try:
-            # Step 1: Extract structured information using LangExtract
-            extraction_results = self._perform_extraction(context_content)
+            # Step 1: Extract structured information (fast path first, LLM if needed)
+            extraction_results, extraction_info = self._perform_tiered_extraction(
+                context_content, extraction_tier or self.extraction_tier, latency_budget,
+                query=query, source_path=source_path,
+                stream_listener=self._partial_analysis_listener(on_partial_analysis, query),
+                side_requests=side_requests, cancel_token=cancel_token
+            )
             
-            # Step 2: Analyze extractions for domain and complexity
-            domain_analysis = self._analyze_extraction_results(extraction_results)
+            # Steps 2-4: Domain analysis, specialist requirements, agent context summary
+            return self._build_context_analysis(extraction_results, extraction_info, query)
             
-            # Step 3: Generate specialist requirements
-            specialist_requirements = self._generate_specialist_requirements(
-                extraction_results, query, domain_analysis
-            )
+        except Exception as e:
+            print(f"❌ Enhanced extraction failed: {e}")
+            print("🔄 Falling back to basic analysis...")
+            return self._get_fallback_analysis(query)
+    
+    def load_context_corpus(self, corpus_spec: str) -> Optional[CorpusSnapshot]:
+        """Ingest a directory or glob of context documents.
+        
+        Only new or changed documents are read and chunked; the rest come from
+        the persisted corpus index.
+        
+        Args:
+            corpus_spec: Directory, glob pattern or file path
             
-            # Step 4: Build context summary for agents
-            context_summary = self._build_agent_context_summary(
-                extraction_results, query, domain_analysis
+        Returns:
+            Corpus snapshot, or None if no documents matched
+        """
+        try:
+            with self._corpus_lock:
+                if self.corpus is None:
+                    self.corpus = ContextCorpus(
+                        index_dir=self.corpus_index_dir,
+                        chunk_chars=self.retrieval_chunk_chars
+                    )
+                    # Persisted extractions feed the chunk cache so unchanged documents skip the LLM
+                    version = self.compiled_prompt.version
+                    with self._extraction_cache_lock:
+                        self.chunk_extraction_cache.update(
+                            ((chunk_hash, version), tuple(entry)) for chunk_hash, entry
+                            in self.corpus.extractions_for(version).items()
+                        )
+                
+                snapshot = self.corpus.ingest(corpus_spec)
+            if not snapshot.documents:
+                return None
+            
+            print(f"✅ Loaded context corpus: {len(snapshot.documents)} documents, {snapshot.chunk_count} chunks")
+            return snapshot
+            
+        except Exception as e:
+            print(f"❌ Error loading context corpus {corpus_spec}: {e}")
+            return None
+    
+    def analyze_corpus_for_agent_generation(self, snapshot: CorpusSnapshot, query: str,
+                                            extraction_tier: str = None,
+                                            latency_budget: float = None,
+                                            on_partial_analysis=None,
+                                            side_requests: List = None,
+                                            cancel_token=None) -> Dict[str, Any]:
+        """Analyze a multi-document corpus for agent generation.
+        
+        A BM25 index over all corpus chunks selects the query-relevant chunks.
+        The fast path scans a wider retrieval window; the LLM pass gets the
+        chunks that fit max_context_length.
+        
+        Args:
+            snapshot: Corpus snapshot from load_context_corpus
+            query: Query that will be processed by agents
+            extraction_tier: Override the configured tier ("auto", "fast" or "llm")
+            latency_budget: Optional seconds available; tight budgets stay on the fast path
+            on_partial_analysis: Optional streaming callback, as in
+                analyze_context_for_agent_generation
+            side_requests: Optional queue batched into the first LLM extraction step
+            cancel_token: Optional CancelToken, as in analyze_context_for_agent_generation
+            
+        Returns:
+            Dictionary with agent generation parameters
+        """
+        if not snapshot or not snapshot.chunk_count:
+            return self._get_fallback_analysis(query)
+        
+        print("🔍 Running corpus extraction analysis...")
+        
+        try:
+            with self._index_lock:
+                index = self.retrieval_indexes.get(snapshot.corpus_hash)
+                if index is None:
+                    index = BM25ChunkIndex(snapshot.chunks, snapshot.corpus_hash)
+                    if len(self.retrieval_indexes) >= 32:
+                        self.retrieval_indexes.pop(next(iter(self.retrieval_indexes)))
+                    self.retrieval_indexes[snapshot.corpus_hash] = index
+            
+            llm_chunks = (index.select(query, self.max_context_length, self.retrieval_top_k)
+                          or self._leading_chunks(index.chunks))
+            fast_chunks = index.select(query, self.max_context_length * 4, self.retrieval_top_k * 4)
+            print(f"🎯 Selected {len(llm_chunks)}/{len(index.chunks)} corpus chunks for extraction")
+            
+            extraction_results, extraction_info = self._perform_tiered_extraction(
+                "\n\n".join(c.text for c in fast_chunks),
+                extraction_tier or self.extraction_tier, latency_budget,
+                query=query, llm_chunks=llm_chunks,
+                stream_listener=self._partial_analysis_listener(on_partial_analysis, query),
+                side_requests=side_requests, cancel_token=cancel_token
             )
             
-            return {
-                "specialties_needed": specialist_requirements,
-                "context_summary": context_summary,
-                "domain_focus": domain_analysis["primary_domain"],
-                "complexity_level": domain_analysis["complexity_level"],
-                "key_concepts": domain_analysis["key_concepts"],
-                "extraction_metadata": {
-                    "total_extractions": len(extraction_results),
-                    "extraction_categories": list(set(e.get('extraction_class', 'unknown') for e in extraction_results)),
-                    "extraction_method": "langextract_enhanced_with_robust_sanitizer"
+            # Persist any new LLM extractions with the corpus index
+            version = self.compiled_prompt.version
+            with self._extraction_cache_lock:
+                new_extractions = {
+                    c.chunk_hash: self.chunk_extraction_cache[(c.chunk_hash, version)]
+                    for c in llm_chunks if (c.chunk_hash, version) in self.chunk_extraction_cache
                 }
-            }
+            with self._corpus_lock:
+                self.corpus.store_extractions(new_extractions, version)
+            
+            extraction_info["corpus_documents"] = len(snapshot.documents)
+            extraction_info["corpus_sources"] = sorted({c.chunk_id.split('#')[0] for c in llm_chunks})
+            return self._build_context_analysis(extraction_results, extraction_info, query)
             
         except Exception as e:
-            print(f"❌ Enhanced extraction failed: {e}")
+            print(f"❌ Corpus extraction failed: {e}")
             print("🔄 Falling back to basic analysis...")
             return self._get_fallback_analysis(query)
     
-    def _perform_extraction(self, context_content: str) -> List[Any]:
+    def _partial_analysis_listener(self, on_partial_analysis, query: str):
+        """Wrap a partial-analysis callback as a listener for streamed entities"""
+        if on_partial_analysis is None:
+            return None
+        
+        def listener(extractions: List[Dict], side_requests: List):
+            partial_analysis = self._build_context_analysis(extractions, {
+                "extraction_tier": "llm",
+                "extraction_method": "langextract_streaming",
+                "partial": True
+            }, query)
+            print(f"📡 Streamed {len(extractions)} entities - domain so far: "
+                  f"{partial_analysis['domain_focus']}")
+            on_partial_analysis(partial_analysis, side_requests)
+        
+        return listener
+    
+    def _build_context_analysis(self, extraction_results: List[Dict],
+                                extraction_info: Dict[str, Any], query: str) -> Dict[str, Any]:
+        """Turn extractions into the agent generation parameters."""
+        # Analyze extractions for domain and complexity
+        domain_analysis = self._analyze_extraction_results(extraction_results)
+        
+        # Generate specialist requirements
+        specialist_requirements = self._generate_specialist_requirements(
+            extraction_results, query, domain_analysis
+        )
+        
+        # Build context summary for agents
+        context_summary = self._build_agent_context_summary(
+            extraction_results, query, domain_analysis
+        )
+        
+        return {
+            "specialties_needed": specialist_requirements,
+            "context_summary": context_summary,
+            "domain_focus": domain_analysis["primary_domain"],
+            "complexity_level": domain_analysis["complexity_level"],
+            "key_concepts": domain_analysis["key_concepts"],
+            "category_distribution": domain_analysis["category_distribution"],
+            "extraction_results": extraction_results,
+            "extraction_metadata": {
+                "total_extractions": len(extraction_results),
+                "extraction_categories": list(set(e.get('extraction_class', 'unknown') for e in extraction_results)),
+                **extraction_info
+            }
+        }
+    
+    def allows_llm_extraction(self, latency_budget: float = None) -> bool:
+        """Whether a latency budget leaves time for the LLM extraction pass"""
+        return latency_budget is None or latency_budget >= self.llm_extraction_min_budget
+
+    def _perform_tiered_extraction(self, context_content: str, tier: str,
+                                   latency_budget: float = None, query: str = "",
+                                   source_path: str = None,
+                                   llm_chunks: List[ContextChunk] = None,
+                                   stream_listener=None,
+                                   side_requests: List = None,
+                                   cancel_token=None) -> Tuple[List[Dict], Dict[str, Any]]:
+        """Run the CPU fast pass and escalate to LangExtract only when needed.
+        
+        Args:
+            context_content: Document content to extract from
+            tier: "fast" (never call the LLM), "llm" (always call it) or "auto"
+            latency_budget: Optional seconds available for extraction
+            query: Query used to select relevant chunks for the LLM pass
+            source_path: Context file path, used to persist the retrieval index
+            llm_chunks: Pre-selected chunks for the LLM pass (skips retrieval)
+            stream_listener: Stream the LLM pass, calling this with entities as they parse
+            side_requests: Generation requests to batch into the first LLM extraction step
+            cancel_token: Stop LLM extraction once cancelled (escalation is skipped
+                if it already is)
+            
+        Returns:
+            (extractions, metadata describing which tier produced them)
+        """
+        if tier == "llm":
+            if llm_chunks is None:
+                llm_chunks = self._select_extraction_chunks(context_content, query, source_path)
+            llm_extractions, prefix_versions = self._perform_incremental_extraction(
+                llm_chunks, stream_listener, side_requests, cancel_token
+            )
+            return llm_extractions, {
+                "extraction_tier": "llm",
+                "extraction_method": "langextract_enhanced_with_robust_sanitizer",
+                "prompt_prefix_version": ", ".join(prefix_versions)
+            }
+        
+        fast_extractions, confidence = self.heuristic_extractor.extract(context_content)
+        print(f"⚡ Fast path: {len(fast_extractions)} extractions (confidence {confidence:.2f})")
+        
+        fast_info = {
+            "extraction_tier": "fast",
+            "extraction_method": "heuristic_fast_path",
+            "fast_path_confidence": confidence
+        }
+        
+        if tier == "fast":
+            return fast_extractions, fast_info
+        
+        if not self.allows_llm_extraction(latency_budget):
+            print(f"⏱️ Latency budget {latency_budget:.1f}s too tight for LLM extraction - using fast path")
+            fast_info["escalation_skipped"] = "latency_budget"
+            return fast_extractions, fast_info
+        
+        if confidence >= self.fast_path_confidence:
+            return fast_extractions, fast_info
+        
+        if cancel_token is not None and cancel_token.cancelled:
+            print("🛑 Cancelled - keeping fast path results")
+            fast_info["escalation_skipped"] = "cancelled"
+            return fast_extractions, fast_info
+        
+        print(f"🔼 Fast path confidence below {self.fast_path_confidence:.2f} - escalating to LangExtract")
+        if llm_chunks is None:
+            llm_chunks = self._select_extraction_chunks(context_content, query, source_path)
+        llm_extractions, prefix_versions = self._perform_incremental_extraction(
+            llm_chunks, stream_listener, side_requests, cancel_token
+        )
+        if not llm_extractions:
+            print("🔄 LLM extraction returned nothing - keeping fast path results")
+            fast_info["escalation_failed"] = True
+            return fast_extractions, fast_info
+        
+        return llm_extractions, {
+            "extraction_tier": "llm",
+            "extraction_method": "langextract_enhanced_with_robust_sanitizer",
+            "fast_path_confidence": confidence,
+            "prompt_prefix_version": ", ".join(prefix_versions)
+        }
+    
+    def _get_retrieval_index(self, context_content: str,
+                             source_path: str = None) -> BM25ChunkIndex:
+        """Get the BM25 index for a document from memory, disk, or by building it."""
+        document_hash = content_hash(context_content)
+        
+        with self._index_lock:
+            index = self.retrieval_indexes.get(document_hash)
+        if index is not None:
+            return index
+        
+        return self.index_flights.do(document_hash, self._load_or_build_index,
+                                     context_content, document_hash, source_path)
+    
+    def _load_or_build_index(self, context_content: str, document_hash: str,
+                             source_path: str = None) -> BM25ChunkIndex:
+        """Load the persisted index or build one, and keep it in memory."""
+        index = None
+        index_path = index_path_for(source_path) if source_path else None
+        if index_path:
+            index = BM25ChunkIndex.load(index_path, expected_hash=document_hash)
+            if index is not None:
+                print(f"📋 Using persisted retrieval index: {index_path}")
+        
+        if index is None:
+            index = BM25ChunkIndex.build(context_content, self.retrieval_chunk_chars)
+            print(f"🗂️ Built retrieval index with {len(index.chunks)} chunks")
+            if index_path and self.persist_retrieval_index:
+                try:
+                    index.save(index_path)
+                except OSError as e:
+                    print(f"⚠️ Could not persist retrieval index {index_path}: {e}")
+        
+        with self._index_lock:
+            if len(self.retrieval_indexes) >= 32:
+                self.retrieval_indexes.pop(next(iter(self.retrieval_indexes)))
+            self.retrieval_indexes[document_hash] = index
+        return index
+    
+    def _select_extraction_chunks(self, context_content: str, query: str,
+                                  source_path: str = None) -> List[ContextChunk]:
+        """Select the query-relevant chunks that fit the extraction budget.
+        
+        Documents already within max_context_length are used whole. If
+        retrieval selects nothing, the leading chunks are used.
+        """
+        index = self._get_retrieval_index(context_content, source_path)
+        
+        if len(context_content) <= self.max_context_length:
+            return list(index.chunks)
+        
+        selected = index.select(query, self.max_context_length, self.retrieval_top_k)
+        if not selected:
+            selected = self._leading_chunks(index.chunks)
+            print(f"🎯 No query-relevant chunks - using the first {len(selected)} chunks for extraction")
+            return selected
+        print(f"🎯 Selected {len(selected)}/{len(index.chunks)} query-relevant chunks for extraction")
+        return selected
+    
+    def _leading_chunks(self, chunks: List[ContextChunk]) -> List[ContextChunk]:
+        """Chunks from the start of the document up to max_context_length characters.
+        
+        A first chunk longer than the budget is truncated, as the document
+        itself was before chunk retrieval.
+        """
+        leading, used = [], 0
+        for chunk in chunks:
+            if used + len(chunk.text) > self.max_context_length:
+                break
+            leading.append(chunk)
+            used += len(chunk.text) + 2
+        
+        if not leading and chunks:
+            first = chunks[0]
+            text = first.text[:self.max_context_length]
+            leading.append(ContextChunk(first.chunk_id, text, first.start,
+                                        first.start + len(text), content_hash(text)))
+        return leading
+    
+    def _perform_incremental_extraction(self, chunks: List[ContextChunk],
+                                        stream_listener=None,
+                                        side_requests: List = None,
+                                        cancel_token=None) -> Tuple[List[Dict], List[str]]:
+        """Extract from chunks, re-running LangExtract only for chunks not seen before.
+        
+        Extractions are cached per chunk content hash and extraction prompt
+        version, so prompt, example or schema changes re-extract. Uncached chunks are grouped
+        into prompts of up to max_context_length characters and each extraction
+        is attributed back to the chunk whose text contains it.
+        
+        Args:
+            chunks: Chunks selected for extraction, in document order
+            stream_listener: Optional callback(extractions, side_requests) for streamed
+                extraction; it sees cached extractions plus the entities parsed so far
+            side_requests: Generation requests to batch into the first extraction step
+            cancel_token: Stop once cancelled; the cancelled group and later ones
+                are not cached, so a later call extracts them in full
+            
+        Returns:
+            (merged extractions for all chunks, versions of the compiled prompt
+            prefixes they were extracted with)
+        """
+        version = self.compiled_prompt.version
+        with self._extraction_cache_lock:
+            pending = [c for c in chunks if (c.chunk_hash, version) not in self.chunk_extraction_cache]
+        reused = len(chunks) - len(pending)
+        if reused:
+            print(f"♻️ Reusing cached extractions for {reused}/{len(chunks)} chunks")
+        
+        partial = []
+        
+        # Group uncached chunks into extraction-sized batches
+        groups, current, current_len = [], [], 0
+        for chunk in pending:
+            if current and current_len + len(chunk.text) > self.max_context_length:
+                groups.append(current)
+                current, current_len = [], 0
+            current.append(chunk)
+            current_len += len(chunk.text) + 2
+        if current:
+            groups.append(current)
+        
+        for group in groups:
+            if cancel_token is not None and cancel_token.cancelled:
+                print(f"🛑 Extraction cancelled ({cancel_token.reason})")
+                break
+            
+            group_listener = None
+            if stream_listener is not None:
+                # Entities already known (cached chunks, earlier groups) lead each report
+                with self._extraction_cache_lock:
+                    known = [e for c in chunks
+                             for e in self.chunk_extraction_cache.get((c.chunk_hash, version), ('', []))[1]]
+                
+                def group_listener(streamed, side_requests, known=known):
+                    stream_listener(known + streamed, side_requests)
+            
+            group_text = "\n\n".join(c.text for c in group)
+            compiled_prompt = self._extraction_prompt(group_text)
+            if cancel_token is not None:
+                # Cancellable extractions run alone: another caller's cancel must not cut this one short
+                extractions = self._perform_extraction(group_text, group_listener, side_requests,
+                                                       compiled_prompt, cancel_token)
+            else:
+                # Callers extracting the same group at once share one LLM extraction
+                extractions = self.extraction_flights.do(
+                    request_key(self.vllm_language_model.model_id, version, content_hash(group_text)),
+                    self._perform_extraction, group_text, group_listener, side_requests, compiled_prompt
+                )
+            if cancel_token is not None and cancel_token.cancelled:
+                # Possibly cut short - returned but kept out of the cache
+                partial = extractions or []
+                break
+            if not extractions:
+                # Failed or empty extraction is not cached so the next load retries it
+                continue
+            
+            per_chunk = {c.chunk_hash: [] for c in group}
+            for extraction in extractions:
+                text = str(extraction.get('extraction_text', '')).lower()
+                owner = next((c for c in group if text and text in c.text.lower()), group[0])
+                per_chunk[owner.chunk_hash].append(extraction)
+            
+            with self._extraction_cache_lock:
+                for chunk_hash, chunk_extractions in per_chunk.items():
+                    if len(self.chunk_extraction_cache) >= self.chunk_cache_size:
+                        self.chunk_extraction_cache.pop(next(iter(self.chunk_extraction_cache)))
+                    self.chunk_extraction_cache[(chunk_hash, version)] = (
+                        compiled_prompt.version, chunk_extractions
+                    )
+        
+        merged, prefix_versions = [], set()
+        with self._extraction_cache_lock:
+            for chunk in chunks:
+                entry = self.chunk_extraction_cache.get((chunk.chunk_hash, version))
+                if entry:
+                    prefix_versions.add(entry[0])
+                    merged.extend(entry[1])
+        if partial:
+            merged.extend(partial)
+            prefix_versions.add(compiled_prompt.version)
+        return merged, sorted(prefix_versions)
+    
+    def _extraction_prompt(self, context_content: str):
+        """Compiled extraction prompt for a document: the selected few-shot subset, or all examples."""
+        if not self.few_shot_examples:
+            return self.compiled_prompt
+        return self.example_selector.compiled_prompt_for(
+            context_content[:self.max_context_length], self.few_shot_examples, self.few_shot_token_budget
+        )
+    
+    def _perform_extraction(self, context_content: str, stream_listener=None,
+                            side_requests: List = None, compiled_prompt=None,
+                            cancel_token=None) -> List[Any]:
         """Perform structured extraction using LangExtract.
         
         Args:
             context_content: Document content to extract from
+            stream_listener: Optional callback(extractions, side_requests); streams the
+                generation and reports entities as soon as each one is complete
+            side_requests: Queued generation requests to run in the same engine step
+            compiled_prompt: Prompt already selected for this content (selected here if omitted)
+            cancel_token: Generate in chunked steps and stop once cancelled
             
         Returns:
             List of Extraction objects
@@ -342,14 +933,35 @@ class EnhancedRAOContextManager:
                 print(f"📝 Truncated context to {self.max_context_length} characters")
             
             # Generate extraction prompt
-            extraction_prompt = self.prompt_generator.render(context_content)
+            if compiled_prompt is None:
+                compiled_prompt = self._extraction_prompt(context_content)
+            if self.few_shot_examples:
+                print(f"📚 Using {len(compiled_prompt.prompt_generator.template.examples)} "
+                      f"relevant few-shot examples")
+            extraction_prompt = compiled_prompt.render(context_content)
             
-            # Run extraction with higher token limit
-            response = self.vllm_language_model.generate_single(
-                extraction_prompt,
-                temperature=0.3,
-                max_output_tokens=4096
-            )
+            if stream_listener is not None:
+                response = self._stream_extraction_response(extraction_prompt, stream_listener,
+                                                            side_requests, cancel_token)
+            elif side_requests:
+                # Pipelined setup: other prompts share this engine step
+                response = self.model_manager.generate_text(
+                    self.vllm_language_model.model_id, extraction_prompt,
+                    temperature=0.3, max_tokens=4096, side_requests=side_requests, cancel_token=cancel_token
+                )
+            elif cancel_token is not None:
+                # Chunked generation that stops once cancelled
+                response = self.model_manager.generate_text(
+                    self.vllm_language_model.model_id, extraction_prompt,
+                    temperature=0.3, max_tokens=4096, cancel_token=cancel_token
+                )
+            else:
+                # Run extraction with higher token limit
+                response = self.vllm_language_model.generate_single(
+                    extraction_prompt,
+                    temperature=0.3,
+                    max_output_tokens=4096
+                )
             
             # Parse the structured response using ROBUST SANITIZATION
             extraction_results = self._parse_extraction_response(response)
@@ -361,6 +973,31 @@ class EnhancedRAOContextManager:
             print(f"❌ Extraction failed: {e}")
             return []
     
+    def _stream_extraction_response(self, extraction_prompt: str, stream_listener,
+                                    side_requests: List = None, cancel_token=None) -> str:
+        """Stream the extraction generation, reporting entities as they complete.
+        
+        The listener gets the side_requests queue; prompts it appends there are
+        batched into the next generation step of the stream.
+        
+        Returns:
+            The full generated response
+        """
+        parser = IncrementalExtractionParser()
+        side_requests = side_requests if side_requests is not None else []
+        streamed = []
+        
+        for piece in self.model_manager.stream_text(
+                self.vllm_language_model.model_id, extraction_prompt,
+                temperature=0.3, max_tokens=4096, chunk_tokens=self.streaming_chunk_tokens,
+                side_requests=side_requests, cancel_token=cancel_token):
+            entities = self._convert_extractions(parser.feed(piece))
+            if entities:
+                streamed.extend(entities)
+                stream_listener(list(streamed), side_requests)
+        
+        return parser.buffer
+    
     def _parse_extraction_response(self, response: str) -> List[Any]:
         """
         Parse LangExtract response using ROBUST SANITIZATION PIPELINE.
@@ -416,65 +1053,13 @@ class EnhancedRAOContextManager:
         return converted
 
     def _get_specialty_extraction_focus(self, agent_specialty: str) -> Dict[str, Any]:
-        """Map agent specialties to relevant extraction types and concepts."""
-        
-        specialty_mappings = {
-            "Venture Capitalist": {
-                "priority_types": ["constraint", "stakeholder"],
-                "key_concepts": ["funding", "investor", "runway", "burn_rate", "Series A", "valuation", "Kleiner Perkins"],
-                "focus_areas": ["financial_constraints", "investor_relations", "funding_timeline"]
-            },
-            
-            "Healthcare Market Analyst": {
-                "priority_types": ["objective", "stakeholder"],
-                "key_concepts": ["healthcare", "market", "pivot", "vertical", "competition", "medical"],
-                "focus_areas": ["market_opportunity", "competitive_landscape", "pivot_strategy"]
-            },
-            
-            "Strategic Partnerships Manager": {
-                "priority_types": ["objective", "constraint"],
-                "key_concepts": ["partnership", "Microsoft", "revenue", "integration", "collaboration", "licensing"],
-                "focus_areas": ["partnership_opportunities", "integration_challenges", "revenue_impact"]
-            },
-            
-            "Microsoft Partnership Specialist": {
-                "priority_types": ["objective", "resource"],
-                "key_concepts": ["Microsoft", "partnership", "Azure", "integration", "licensing", "technology"],
-                "focus_areas": ["Microsoft_ecosystem", "technical_integration", "partnership_terms"]
-            },
-            
-            "Budget Analyst": {
-                "priority_types": ["constraint", "resource"],
-                "key_concepts": ["budget", "cost", "burn_rate", "capital", "expenses", "runway", "funding"],
-                "focus_areas": ["financial_constraints", "cost_optimization", "resource_allocation"]
-            },
-            
-            "Project Manager": {
-                "priority_types": ["constraint", "objective"],
-                "key_concepts": ["timeline", "milestone", "development", "implementation", "deadline", "product"],
-                "focus_areas": ["project_constraints", "timeline_management", "deliverable_tracking"]
-            },
-            
-            "Implementation Coordinator": {
-                "priority_types": ["constraint", "resource"],
-                "key_concepts": ["implementation", "coordination", "timeline", "resources", "deployment"],
-                "focus_areas": ["implementation_planning", "resource_coordination", "execution_timeline"]
-            }
-        }
-        
-        # Default mapping for unknown specialties
-        default_mapping = {
-            "priority_types": ["constraint", "objective"],
-            "key_concepts": [],
-            "focus_areas": ["general_context"]
-        }
-        
-        # Handle partial matches (e.g., "Climate Scientist specializing in agricultural impacts")
-        for specialty_key in specialty_mappings.keys():
-            if specialty_key.lower() in agent_specialty.lower():
-                return specialty_mappings[specialty_key]
-        
-        return specialty_mappings.get(agent_specialty, default_mapping)
+        """Map agent specialties to relevant extraction types and concepts.
+
+        Resolution is delegated to the specialty registry, which matches partial
+        names (e.g., "Climate Scientist specializing in agricultural impacts")
+        against its token/trigram index and memoizes the result.
+        """
+        return self.specialty_registry.resolve(agent_specialty)
 
     def _filter_extractions_for_specialty(self, extractions: List[Dict], 
                                         specialty_focus: Dict) -> List[Dict]:
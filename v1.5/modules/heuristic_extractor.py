@@ -0,0 +1,204 @@
+# =============================================================================
+# Heuristic Extractor - Zero-LLM Fast Path for RAO Context Analysis
+# =============================================================================
+
+import re
+from typing import Dict, List, Any, Tuple
+from collections import defaultdict
+
+# =============================================================================
+# Pattern Definitions
+# =============================================================================
+
+# One combined pattern so each sentence is scanned once; the named group that
+# matched decides the extraction class and attributes.
+_MONTHS = (r'(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|'
+           r'Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)')
+
+# Bounded "within" deadlines need a time unit ("within 6 months", "within a week"),
+# so phrases like "within the team" are not tagged as time limits
+_WITHIN = (r'within\s+(?:the\s+next\s+)?(?:\d[\d,.]*\s*|(?:a|an|one|two|three|four|five|six|'
+           r'seven|eight|nine|ten|twelve)\s+)?(?:business\s+|calendar\s+)?'
+           r'(?:hours?|days?|weeks?|months?|quarters?|years?)\b[^.;\n]{0,40}')
+
+# Case-insensitivity is scoped to keyword alternatives with (?i:...); the
+# capitalised-name stakeholder alternative must stay case-sensitive
+_EXTRACTION_PATTERN = re.compile(
+    r'(?P<money>\$\s?\d[\d,]*(?:\.\d+)?\s?(?:[KMB]\b|(?i:million|billion|thousand))?)'
+    r'|(?P<deadline>\b(?i:(?:deadline|due(?:\s+date)?|no later than|must be (?:completed|delivered|submitted) by)'
+    r'\s+[^.;\n]{3,40}|' + _WITHIN + r'))'
+    r'|(?P<date>\b(?i:' + _MONTHS + r')\.?\s+(?:\d{1,2},\s+)?\d{4}\b|\b\d{4}-\d{2}-\d{2}\b|\b[Qq][1-4]\s+\d{4}\b)'
+    r'|(?P<percentage>\b\d+(?:\.\d+)?\s?%)'
+    r'|(?P<ratio>\b\d+(?:\.\d+)?\s?/\s?\d+(?:\.\d+)?\b)'
+    r'|(?P<measurement>\b\d[\d,]*(?:\.\d+)?\s?(?i:ms|milliseconds?|seconds?|minutes?|hours?|days?|weeks?|months?|years?|'
+    r'bpm|ng/mL|mg|users|customers|employees|transactions per second|requests per second)\b)'
+    r'|(?P<stakeholder>\b\d[\d,]*\s+(?:[A-Za-z-]+\s){0,2}(?i:representatives|engineers|employees|staff|students|customers|'
+    r'physicians|nurses|researchers|candidates|analysts|partners)\b'
+    r'|\b(?:(?!(?:The|A|An|Our|This|That|Each|Every)\b)[A-Z][a-z]+\s){0,2}'
+    r'(?:Manager|Director|Officer|Engineer|Team|Department|Board|Committee|Council)\b)'
+    r'|(?P<objective>\b(?i:(?:goal|target|objective|aim|priority)\s+(?:is|are|was)?\s*(?:to\s+)?)[^.;\n]{3,60})'
+    r'|(?P<regulatory>\b(?:(?i:must comply|compliance|regulat\w+|policy requires|mandates?)|HIPAA|GDPR|SOC\s?2)\b)'
+)
+
+# group name -> (extraction_class, attribute type, category attribute)
+_GROUP_MAPPING = {
+    'money': ('constraint', 'financial', 'budget_limit'),
+    'deadline': ('constraint', 'temporal', 'time_limit'),
+    'date': ('constraint', 'temporal', 'date_reference'),
+    'percentage': ('metric', 'performance', 'percentage'),
+    'ratio': ('metric', 'performance', 'rating'),
+    'measurement': ('metric', 'operational', 'measurement'),
+    'stakeholder': ('stakeholder', 'role', 'internal_team'),
+    'objective': ('objective', 'goal', 'stated_objective'),
+    'regulatory': ('constraint', 'regulatory', 'compliance'),
+}
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+
+# Domain keyword sets (carried over from the v1.3 keyword analysis)
+DOMAIN_KEYWORDS = {
+    'medical': ['diagnosis', 'treatment', 'patient', 'clinical', 'medical', 'healthcare', 'hospital'],
+    'business': ['strategy', 'market', 'revenue', 'customer', 'business', 'operational', 'budget'],
+    'technical': ['system', 'architecture', 'implementation', 'technology', 'software', 'infrastructure'],
+    'research': ['study', 'analysis', 'methodology', 'findings', 'research', 'academic', 'grant'],
+    'legal': ['compliance', 'regulation', 'legal', 'policy', 'governance', 'ethics']
+}
+
+_DOMAIN_PATTERNS = {
+    domain: re.compile(r'\b(?:' + '|'.join(keywords) + r')\w*\b', re.IGNORECASE)
+    for domain, keywords in DOMAIN_KEYWORDS.items()
+}
+
+# =============================================================================
+# Heuristic Extractor
+# =============================================================================
+
+class HeuristicExtractor:
+    """CPU-only extractor producing RAO-compatible extractions without an LLM call.
+
+    Extractions use the same dictionary format as the LangExtract path
+    ({'extraction_class', 'extraction_text', 'attributes'}) so downstream
+    domain analysis and specialist context building work unchanged.
+    """
+
+    def __init__(self, max_extractions: int = 40, max_text_length: int = 160):
+        self.max_extractions = max_extractions
+        self.max_text_length = max_text_length
+
+    def extract(self, content: str) -> Tuple[List[Dict[str, Any]], float]:
+        """Run the fast extraction pass.
+
+        Args:
+            content: Document content
+
+        Returns:
+            (extractions, confidence) where confidence is in [0, 1]
+        """
+        if not content:
+            return [], 0.0
+
+        sentences = [s.strip() for s in _SENTENCE_SPLIT.split(content) if s and s.strip()]
+
+        extractions = []
+        seen = set()
+        for sentence in sentences:
+            for match in _EXTRACTION_PATTERN.finditer(sentence):
+                group = match.lastgroup
+                extraction_class, attr_type, category = _GROUP_MAPPING[group]
+
+                key = (extraction_class, sentence)
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                extractions.append({
+                    'extraction_class': extraction_class,
+                    'extraction_text': self._clip(sentence, match.start(), match.end()),
+                    'attributes': {
+                        'type': attr_type,
+                        'value': match.group(group).strip(),
+                        f'{extraction_class}_category': category,
+                        'source': 'heuristic'
+                    }
+                })
+
+                if len(extractions) >= self.max_extractions:
+                    break
+            if len(extractions) >= self.max_extractions:
+                break
+
+        domain_scores, domain_sentences = self._score_domains(sentences)
+        for domain, _ in sorted(domain_scores.items(), key=lambda x: x[1], reverse=True)[:2]:
+            extractions.append({
+                'extraction_class': 'domain_indicator',
+                'extraction_text': self._clip(domain_sentences[domain], 0, 0),
+                'attributes': {
+                    'domain': domain,
+                    'domain_category': 'keyword_density',
+                    'source': 'heuristic'
+                }
+            })
+
+        confidence = self._estimate_confidence(extractions, domain_scores)
+        return extractions, confidence
+
+    def _clip(self, sentence: str, start: int, end: int) -> str:
+        """Trim a sentence to max_text_length, keeping the matched span visible"""
+        if len(sentence) <= self.max_text_length:
+            return sentence
+        center = (start + end) // 2
+        window_start = max(0, min(center - self.max_text_length // 2,
+                                  len(sentence) - self.max_text_length))
+        return sentence[window_start:window_start + self.max_text_length].strip()
+
+    def _score_domains(self, sentences: List[str]) -> Tuple[Dict[str, int], Dict[str, str]]:
+        """Count domain keyword hits and remember the densest sentence per domain"""
+        domain_scores = defaultdict(int)
+        domain_sentences = {}
+        best_hits = defaultdict(int)
+
+        for sentence in sentences:
+            for domain, pattern in _DOMAIN_PATTERNS.items():
+                hits = len(pattern.findall(sentence))
+                if hits:
+                    domain_scores[domain] += hits
+                    if hits > best_hits[domain]:
+                        best_hits[domain] = hits
+                        domain_sentences[domain] = sentence
+
+        return dict(domain_scores), domain_sentences
+
+    def _estimate_confidence(self, extractions: List[Dict[str, Any]],
+                             domain_scores: Dict[str, int]) -> float:
+        """Estimate how well the fast pass covers the document.
+
+        Combines class coverage (constraints, metrics, stakeholders, objectives),
+        extraction volume and how clearly one domain dominates.
+        """
+        classes_found = set(e['extraction_class'] for e in extractions) - {'domain_indicator'}
+        class_coverage = len(classes_found) / 4
+        volume = min(len(extractions) / 8, 1.0)
+
+        total_domain_hits = sum(domain_scores.values())
+        domain_strength = (max(domain_scores.values()) / total_domain_hits) if total_domain_hits else 0.0
+
+        return round(min(class_coverage * 0.5 + volume * 0.3 + domain_strength * 0.2, 1.0), 3)
+
+# =============================================================================
+# Usage Example
+# =============================================================================
+
+if __name__ == "__main__":
+    print("🧪 Testing Heuristic Extractor")
+    print("=" * 40)
+
+    sample = """Department budget is $2.1M annually with 25 full-time representatives.
+Current customer satisfaction rating is 3.2/5.0, with average response time of 48 hours.
+Target is to improve satisfaction to 4.0+ while reducing costs by 20%.
+Implementation window is 6 months. Must comply with data privacy regulations.
+Final report deadline is March 15, 2025."""
+
+    extractions, confidence = HeuristicExtractor().extract(sample)
+    print(f"✅ {len(extractions)} extractions, confidence {confidence}")
+    for extraction in extractions:
+        print(f"   {extraction['extraction_class']}: {extraction['extraction_text'][:70]}")
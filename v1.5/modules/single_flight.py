@@ -0,0 +1,111 @@
+# =============================================================================
+# Single Flight - Coalescing of Identical Concurrent Requests
+# =============================================================================
+
+import hashlib
+import threading
+from typing import Any, Callable, Dict
+from concurrent.futures import Future
+
+def request_key(*parts: Any) -> str:
+    """Content hash identifying a request by everything that determines its result"""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+# =============================================================================
+# Single Flight
+# =============================================================================
+
+class SingleFlight:
+    """Runs each key's work once while it is in flight.
+
+    The first caller for a key runs the function; callers arriving with the
+    same key before it finishes wait on its future and receive the same result
+    (or exception). Nothing is cached: once the call completes, the next caller
+    runs it again.
+    """
+
+    def __init__(self, name: str = "request"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) for key, or join the identical call in flight
+
+        Args:
+            key: Request identity, usually from request_key()
+            fn: Work to run if no identical call is in flight
+
+        Returns:
+            The (shared) result; results are shared by reference, so callers
+            must not mutate them
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            print(f"🔗 Joined in-flight {self.name} {key[:8]}")
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def is_in_flight(self, key: str) -> bool:
+        """Whether a call for key is running now (it may finish before a later do())"""
+        with self._lock:
+            return key in self._calls
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Calls run, calls that joined one in flight, and calls running now"""
+        return {'executed': self.executed, 'coalesced': self.coalesced, 'in_flight': self.in_flight()}
+
+# =============================================================================
+# Usage Example
+# =============================================================================
+
+if __name__ == "__main__":
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    print("🧪 Testing Single Flight")
+    print("=" * 40)
+
+    flights = SingleFlight("extraction")
+
+    def slow_extraction(document: str):
+        time.sleep(0.2)
+        return f"{len(document)} chars extracted"
+
+    documents = ["shared dashboard context"] * 6 + ["another document"] * 2
+    with ThreadPoolExecutor(max_workers=len(documents)) as pool:
+        results = list(pool.map(
+            lambda doc: flights.do(request_key(doc), slow_extraction, doc), documents
+        ))
+
+    print(f"   results: {sorted(set(results))}")
+    print(f"   stats: {flights.get_stats()}")
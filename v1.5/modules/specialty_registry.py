@@ -0,0 +1,405 @@
+# =============================================================================
+# Specialty Registry - Indexed Specialty-to-Extraction Focus Lookup for RAO
+# =============================================================================
+
+import os
+import re
+import yaml
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+from collections import OrderedDict, defaultdict
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     'specialty_registry.yaml')
+
+# Filler words that LLM-generated specialty names add around the actual role
+_STOPWORDS = {
+    'a', 'an', 'and', 'as', 'at', 'by', 'for', 'in', 'of', 'on', 'or', 'the',
+    'to', 'with', 'specializing', 'specialized', 'focused', 'focusing'
+}
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+def normalize_specialty_tokens(text: str) -> List[str]:
+    """Lowercase, tokenize and lightly stem a specialty name."""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        # Cheap plural folding so "Analysts" and "Analyst" index together
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def specialty_trigrams(tokens: List[str]) -> set:
+    """Character trigrams of each token, padded so short tokens still contribute."""
+    trigrams = set()
+    for token in tokens:
+        padded = f" {token} "
+        for i in range(len(padded) - 2):
+            trigrams.add(padded[i:i + 3])
+    return trigrams
+
+# Role nouns that say little about what a specialist actually covers
+_ROLE_WORDS = {
+    'analyst', 'specialist', 'expert', 'consultant', 'advisor', 'adviser',
+    'manager', 'officer', 'lead', 'professional', 'assessor', 'reviewer'
+}
+
+def specialty_similarity(first: str, second: str) -> float:
+    """Similarity of two specialty names in [0, 1].
+
+    Blends the overlap of topic tokens (role nouns like "Analyst" removed) with
+    character-trigram Jaccard, so "Budget Analyst" and "Financial Budget Analyst"
+    score high while "Data Analyst" and "Systems Analyst" do not.
+    """
+    first_tokens = normalize_specialty_tokens(first)
+    second_tokens = normalize_specialty_tokens(second)
+    if not first_tokens or not second_tokens:
+        return 0.0
+
+    first_topic = set(first_tokens) - _ROLE_WORDS or set(first_tokens)
+    second_topic = set(second_tokens) - _ROLE_WORDS or set(second_tokens)
+    topic_overlap = len(first_topic & second_topic) / min(len(first_topic), len(second_topic))
+
+    first_trigrams = specialty_trigrams(first_tokens)
+    second_trigrams = specialty_trigrams(second_tokens)
+    trigram_jaccard = len(first_trigrams & second_trigrams) / len(first_trigrams | second_trigrams)
+
+    return 0.6 * topic_overlap + 0.4 * trigram_jaccard
+
+def merge_similar_specialties(specialties: List[str],
+                              threshold: float = 0.7) -> Tuple[List[str], Dict[str, List[str]]]:
+    """Greedily cluster near-duplicate specialties, keeping the first of each cluster.
+
+    Args:
+        specialties: Candidate specialties in priority order
+        threshold: Similarity at or above which two specialties are merged
+
+    Returns:
+        (kept specialties in order, {kept specialty: [merged duplicates]})
+    """
+    kept: List[str] = []
+    merges: Dict[str, List[str]] = {}
+
+    for specialty in specialties:
+        best, best_score = None, 0.0
+        for representative in kept:
+            score = specialty_similarity(specialty, representative)
+            if score > best_score:
+                best, best_score = representative, score
+
+        if best is not None and best_score >= threshold:
+            merges.setdefault(best, []).append(specialty)
+        else:
+            kept.append(specialty)
+
+    return kept, merges
+
+class SpecialtyRegistry:
+    """Data-driven specialty registry with token and trigram indexes.
+
+    Entries are loaded once from YAML. Each entry name (and alias) is indexed by
+    normalized tokens and character trigrams so free-text specialties can be
+    resolved without scanning every entry.
+    """
+
+    def __init__(self, registry_path: str = DEFAULT_REGISTRY_PATH):
+        self.registry_path = registry_path
+        self.match_threshold = 0.75
+        self.cache_size = 4096
+        self.default_focus: Dict[str, Any] = {
+            "priority_types": ["constraint", "objective"],
+            "key_concepts": [],
+            "focus_areas": ["general_context"]
+        }
+        self.specialties: Dict[str, Dict[str, Any]] = {}
+
+        # Index state: one "key" per entry name or alias
+        self._key_entries: List[str] = []
+        self._key_tokens: List[set] = []
+        self._key_trigrams: List[set] = []
+        self._token_index: Dict[str, List[int]] = defaultdict(list)
+        self._trigram_index: Dict[str, List[int]] = defaultdict(list)
+        self._exact_index: Dict[str, int] = {}
+        # Candidate indexes over each key's rarest features, built for one threshold
+        self._token_prefix_index: Dict[str, List[int]] = {}
+        self._trigram_prefix_index: Dict[str, List[int]] = {}
+        self._prefix_threshold: Optional[float] = None
+        self._resolve_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self.load_registry()
+
+    def load_registry(self):
+        """Load specialty entries from YAML and rebuild the indexes"""
+        try:
+            with open(self.registry_path, 'r') as file:
+                registry_data = yaml.safe_load(file) or {}
+        except FileNotFoundError:
+            print(f"⚠️ Specialty registry not found at {self.registry_path}")
+            print("ℹ️ All specialties will use the default extraction focus")
+            registry_data = {}
+        except Exception as e:
+            print(f"❌ Error loading specialty registry: {e}")
+            registry_data = {}
+
+        settings = registry_data.get('settings', {}) or {}
+        self.match_threshold = float(settings.get('match_threshold', self.match_threshold))
+        self.cache_size = int(settings.get('cache_size', self.cache_size))
+
+        if registry_data.get('default'):
+            self.default_focus = self._build_focus(registry_data['default'])
+
+        self.specialties = {}
+        for name, entry in (registry_data.get('specialties', {}) or {}).items():
+            self.specialties[name] = self._build_focus(entry or {})
+
+        self._build_indexes(registry_data.get('specialties', {}) or {})
+
+        if self.specialties:
+            print(f"✅ Loaded specialty registry with {len(self.specialties)} specialties")
+
+    def _build_focus(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize a registry entry to the focus structure used by RAO"""
+        return {
+            "priority_types": list(entry.get('priority_types', self.default_focus["priority_types"])),
+            "key_concepts": list(entry.get('key_concepts', [])),
+            "focus_areas": list(entry.get('focus_areas', self.default_focus["focus_areas"]))
+        }
+
+    def _build_indexes(self, raw_entries: Dict[str, Any]):
+        """Build exact, token and trigram indexes over entry names and aliases"""
+        self._key_entries = []
+        self._key_tokens = []
+        self._key_trigrams = []
+        self._token_index = defaultdict(list)
+        self._trigram_index = defaultdict(list)
+        self._exact_index = {}
+        with self._cache_lock:
+            self._resolve_cache = OrderedDict()
+
+        for name, entry in raw_entries.items():
+            aliases = (entry or {}).get('aliases', []) or []
+            for key in [name] + list(aliases):
+                tokens = normalize_specialty_tokens(key)
+                if not tokens:
+                    continue
+
+                key_id = len(self._key_entries)
+                token_set = set(tokens)
+                trigram_set = specialty_trigrams(tokens)
+
+                self._key_entries.append(name)
+                self._key_tokens.append(token_set)
+                self._key_trigrams.append(trigram_set)
+                self._exact_index.setdefault(' '.join(tokens), key_id)
+
+                for token in token_set:
+                    self._token_index[token].append(key_id)
+                for trigram in trigram_set:
+                    self._trigram_index[trigram].append(key_id)
+
+        self._build_prefix_indexes()
+
+    def _build_prefix_indexes(self):
+        """Index each key under the rarest features it cannot match without
+
+        A key scores |query & key| / |key|, so it clears match_threshold only if
+        the query misses at most (1 - threshold) of its features, and therefore
+        shares one of its (1 - threshold) * |key| + 1 rarest features. Indexing
+        only those prefixes keeps every key that can still match a candidate,
+        while common features ("analyst", " an") stay out of most postings.
+        """
+        threshold = self.match_threshold
+        self._token_prefix_index = self._prefix_index(self._key_tokens, self._token_index, threshold)
+        self._trigram_prefix_index = self._prefix_index(self._key_trigrams, self._trigram_index, threshold)
+        self._prefix_threshold = threshold
+
+    @staticmethod
+    def _prefix_index(key_features: List[set], index: Dict[str, List[int]],
+                      threshold: float) -> Dict[str, List[int]]:
+        """Posting lists over each key's prefix of highest-IDF (rarest) features"""
+        prefix_index: Dict[str, List[int]] = defaultdict(list)
+        for key_id, features in enumerate(key_features):
+            ranked = sorted(features, key=lambda feature: (len(index[feature]), feature))
+            prefix_length = int((1 - threshold) * len(ranked) + 1e-9) + 1
+            for feature in ranked[:prefix_length]:
+                prefix_index[feature].append(key_id)
+        return prefix_index
+
+    def match(self, agent_specialty: str) -> Optional[Tuple[str, float]]:
+        """Find the best registry entry for a free-text specialty.
+
+        Args:
+            agent_specialty: Specialty string, typically produced by the LLM
+
+        Returns:
+            (entry name, similarity score) or None if nothing clears the threshold
+        """
+        tokens = normalize_specialty_tokens(agent_specialty or "")
+        if not tokens:
+            return None
+
+        exact = self._exact_index.get(' '.join(tokens))
+        if exact is not None:
+            return self._key_entries[exact], 1.0
+
+        query_tokens = set(tokens)
+        if self._prefix_threshold != self.match_threshold:
+            self._build_prefix_indexes()
+
+        # Pass 1: token overlap. A key whose tokens all appear in the query is
+        # contained in it ("Climate Scientist" in "Climate Scientist specializing in ...")
+        best_key, best_score = None, 0.0
+        for key_id in self._candidates(query_tokens, self._token_prefix_index):
+            score = len(query_tokens & self._key_tokens[key_id]) / len(self._key_tokens[key_id])
+            if self._is_better(key_id, score, best_key, best_score):
+                best_key, best_score = key_id, score
+
+        # Pass 2: trigram overlap catches spelling variants ("Budgeting Analyst")
+        if best_score < 1.0:
+            query_trigrams = specialty_trigrams(tokens)
+            for key_id in self._candidates(query_trigrams, self._trigram_prefix_index):
+                score = len(query_trigrams & self._key_trigrams[key_id]) / len(self._key_trigrams[key_id])
+                if self._is_better(key_id, score, best_key, best_score):
+                    best_key, best_score = key_id, score
+
+        if best_key is None or best_score < self.match_threshold:
+            return None
+
+        return self._key_entries[best_key], best_score
+
+    def _candidates(self, features: set, prefix_index: Dict[str, List[int]]) -> set:
+        """Keys whose prefix shares a feature with the query - every key that can clear the threshold"""
+        candidates = set()
+        for feature in features:
+            posting = prefix_index.get(feature)
+            if posting:
+                candidates.update(posting)
+        return candidates
+
+    def _is_better(self, key_id: int, score: float,
+                   best_key: Optional[int], best_score: float) -> bool:
+        """Higher score wins; ties go to the more specific (longer) key, then registry order"""
+        if best_key is None or score > best_score:
+            return True
+        if score < best_score:
+            return False
+        best_len = len(self._key_tokens[best_key])
+        key_len = len(self._key_tokens[key_id])
+        return key_len > best_len or (key_len == best_len and key_id < best_key)
+
+    def resolve(self, agent_specialty: str) -> Dict[str, Any]:
+        """Resolve a specialty to its extraction focus, memoized per specialty string (LRU)"""
+        with self._cache_lock:
+            cached = self._resolve_cache.get(agent_specialty)
+            if cached is not None:
+                self._resolve_cache.move_to_end(agent_specialty)
+                return cached
+
+        match = self.match(agent_specialty)
+        focus = self.specialties[match[0]] if match else self.default_focus
+
+        with self._cache_lock:
+            self._resolve_cache[agent_specialty] = focus
+            self._resolve_cache.move_to_end(agent_specialty)
+            while len(self._resolve_cache) > self.cache_size:
+                self._resolve_cache.popitem(last=False)
+
+        return focus
+
+# =============================================================================
+# Shared Registry Instances
+# =============================================================================
+
+_registries: Dict[str, SpecialtyRegistry] = {}
+
+def get_specialty_registry(registry_path: str = None) -> SpecialtyRegistry:
+    """Get the process-wide registry for a path, loading it on first use"""
+    path = registry_path or DEFAULT_REGISTRY_PATH
+    if path not in _registries:
+        _registries[path] = SpecialtyRegistry(path)
+    return _registries[path]
+
+def test_large_registry_recall() -> bool:
+    """Check that specific roles still match on a large registry whose tokens are all common"""
+    import random
+    import tempfile
+
+    rng = random.Random(11)
+    domains = ["Budget", "Healthcare", "Energy", "Retail", "Legal", "Marketing", "Cloud"]
+    roles = ["Analyst", "Specialist", "Manager", "Consultant", "Engineer"]
+    entries = {"Budget Analyst": {"focus_areas": ["budget_constraints"]}}
+    while len(entries) < 2000:
+        name = f"{rng.choice(domains)} {rng.choice(roles)} {rng.randrange(10**6):x}"
+        entries[name] = {"focus_areas": ["synthetic"]}
+
+    with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as handle:
+        yaml.safe_dump({'specialties': entries}, handle)
+    try:
+        registry = SpecialtyRegistry(handle.name)
+    finally:
+        os.unlink(handle.name)
+
+    passed = True
+    for specialty in ["Senior Budget Analyst", "Budget Analyst for Healthcare", "Budgeting Analysts"]:
+        match = registry.match(specialty)
+        ok = match is not None and match[0] == "Budget Analyst"
+        passed = passed and ok
+        print(f"   {'✅' if ok else '❌'} {specialty} -> {match}")
+    return passed
+
+# =============================================================================
+# Usage Example
+# =============================================================================
+
+if __name__ == "__main__":
+    import time
+
+    print("🧪 Testing Specialty Registry")
+    print("=" * 40)
+
+    registry = get_specialty_registry()
+
+    test_specialties = [
+        "Budget Analyst",
+        "Financial Budget Analysts",
+        "Microsoft Partnership Specialist for Azure integration",
+        "Climate Scientist specializing in agricultural impacts"
+    ]
+
+    for specialty in test_specialties:
+        match = registry.match(specialty)
+        print(f"\n{specialty}")
+        print(f"  Match: {match}")
+        print(f"  Focus: {registry.resolve(specialty)['focus_areas']}")
+
+    # Timing check: uncached lookups against a 5,000-entry registry
+    import random
+    import tempfile
+    rng = random.Random(7)
+    domains = ["Budget", "Climate", "Supply Chain", "Healthcare", "Energy", "Retail", "Legal",
+               "Marketing", "Cloud", "Security", "Logistics", "Education", "Insurance", "Mining"]
+    roles = ["Analyst", "Specialist", "Manager", "Consultant", "Scientist", "Engineer", "Advisor"]
+    entries = {}
+    while len(entries) < 5000:
+        name = f"{rng.choice(domains)} {rng.choice(roles)} {rng.randrange(10**6):x}"
+        entries[name] = {"focus_areas": ["synthetic"]}
+
+    with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as handle:
+        yaml.safe_dump({'specialties': entries}, handle)
+    large = SpecialtyRegistry(handle.name)
+    os.unlink(handle.name)
+
+    queries = [f"Senior {rng.choice(domains)} {rng.choice(roles)} for region {i}" for i in range(1000)]
+    start = time.perf_counter()
+    for query in queries:
+        large.match(query)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    status = "✅" if elapsed_ms < 1.0 else "⚠️"
+    print(f"\n{status} Average uncached lookup over {len(large._key_entries)} keys: {elapsed_ms:.3f} ms (target < 1 ms)")
+
+    print(f"\n🔍 Large registry recall:")
+    test_large_registry_recall()
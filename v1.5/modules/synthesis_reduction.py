@@ -0,0 +1,142 @@
+# =============================================================================
+# Synthesis Reduction - Map-Reduce Summaries Sized to the Model Context
+# =============================================================================
+
+from typing import List, Tuple
+
+from cqb_framework import generate_agent_responses
+
+# =============================================================================
+# Tree Reducer
+# =============================================================================
+
+class TreeReducer:
+    """Reduces many labelled texts until they fit one final prompt.
+
+    Texts are packed into groups that fill the summarization model's context
+    window, so the fan-in follows from that model's max_model_len. Every group of a level
+    is summarized in the same batched engine step, and levels repeat until the
+    summaries fit the final synthesis or verdict prompt.
+    """
+
+    def __init__(self, agent, summary_tokens: int = 200, max_levels: int = 6,
+                 final_model_id: str = None):
+        """Initialize the reducer.
+
+        Args:
+            agent: CQB agent that writes the summaries (usually the synthesizer or judge)
+            summary_tokens: Token limit for each group summary
+            max_levels: Safety limit on reduction levels
+            final_model_id: Model that will run the final prompt (defaults to the agent's)
+        """
+        self.agent = agent
+        self.summary_tokens = summary_tokens
+        self.max_levels = max_levels
+        self.levels = 0
+
+        model_manager = agent.model_manager
+        # Merge steps follow the summarization route; the final budget follows the final model
+        self.model_id = model_manager.resolve_model('summarization', agent.spec.model_assignment)
+        merge_config = model_manager.model_configs.get(self.model_id)
+        final_config = model_manager.model_configs.get(final_model_id or agent.spec.model_assignment)
+
+        self.merge_model_len = merge_config.max_model_len if merge_config else 2048
+        self.max_model_len = final_config.max_model_len if final_config else 2048
+        self.output_tokens = final_config.max_tokens if final_config else 1024
+        self._tokenizer = None
+
+    def count_tokens(self, text: str) -> int:
+        """Token count with the agent model's tokenizer (chars/4 estimate if unavailable)"""
+        if self._tokenizer is None:
+            try:
+                self._tokenizer = self.agent.model_manager.get_tokenizer(self.model_id)
+            except Exception:
+                self._tokenizer = False
+        if self._tokenizer:
+            return len(self._tokenizer.encode(text))
+        return len(text) // 4 + 1
+
+    def budget_for(self, template_prompt: str, output_tokens: int, max_model_len: int = None) -> int:
+        """Tokens left for listed items once the prompt template and reserved output are counted"""
+        try:
+            overhead = self.agent.count_prompt_tokens(template_prompt)
+        except Exception:
+            overhead = self.count_tokens(template_prompt) + 64
+        return max(self.summary_tokens, (max_model_len or self.max_model_len) - output_tokens - overhead)
+
+    def reduce(self, query: str, items: List[Tuple[str, str]], final_template: str,
+               instruction: str) -> List[Tuple[str, str]]:
+        """Reduce labelled texts to a list that fits the final prompt.
+
+        Args:
+            query: Query under discussion (shown in each merge prompt)
+            items: (label, text) pairs, e.g. one per agent response
+            final_template: The final prompt with no items listed (sizes the final budget)
+            instruction: What each merge step should produce
+
+        Returns:
+            (label, text) pairs - the originals if they already fit, otherwise summaries
+        """
+        final_budget = self.budget_for(final_template, self.output_tokens)
+        merge_budget = self.budget_for(self._merge_prompt(query, "", instruction), self.summary_tokens,
+                                       self.merge_model_len)
+
+        while self._total_tokens(items) > final_budget and self.levels < self.max_levels:
+            groups = self._pack(items, merge_budget)
+            tasks = [(self.agent, self._merge_prompt(query, self._listing(group), instruction), None)
+                     for group in groups]
+            summaries = generate_agent_responses(self.agent.model_manager, tasks,
+                                                 max_tokens=self.summary_tokens, model_id=self.model_id)
+
+            self.levels += 1
+            print(f"   🌲 Level {self.levels}: {len(items)} texts in {len(groups)} groups "
+                  f"(fan-in up to {max(len(g) for g in groups)}) -> {len(summaries)} summaries")
+            items = [(f"Summary {self.levels}.{i + 1}", text) for i, text in enumerate(summaries)]
+
+        if self._total_tokens(items) > final_budget:
+            # Level limit reached: clip evenly so the final prompt still fits
+            share = max(1, final_budget // max(1, len(items)))
+            items = [(label, self._clip(text, share)) for label, text in items]
+
+        return items
+
+    def _merge_prompt(self, query: str, listed: str, instruction: str) -> str:
+        """Prompt that summarizes one group"""
+        return f"""Query: {query}
+
+{listed}
+
+{instruction}"""
+
+    def _listing(self, items: List[Tuple[str, str]]) -> str:
+        return "\n".join(f"- {label}: {text}" for label, text in items)
+
+    def _total_tokens(self, items: List[Tuple[str, str]]) -> int:
+        return sum(self.count_tokens(f"- {label}: {text}\n") for label, text in items)
+
+    def _pack(self, items: List[Tuple[str, str]], budget: int) -> List[List[Tuple[str, str]]]:
+        """Greedily fill groups up to the budget; oversized texts are clipped so every group merges at least two"""
+        item_limit = max(1, budget // 2)
+        groups, current, used = [], [], 0
+
+        for label, text in items:
+            tokens = self.count_tokens(f"- {label}: {text}\n")
+            if tokens > item_limit:
+                text = self._clip(text, item_limit)
+                tokens = item_limit
+            if current and used + tokens > budget:
+                groups.append(current)
+                current, used = [], 0
+            current.append((label, text))
+            used += tokens
+
+        if current:
+            groups.append(current)
+        return groups
+
+    def _clip(self, text: str, max_tokens: int) -> str:
+        """Trim text to roughly max_tokens, proportionally by characters"""
+        tokens = self.count_tokens(text)
+        if tokens <= max_tokens:
+            return text
+        return text[:max(1, int(len(text) * max_tokens / tokens) - 3)] + "..."
@@ -3,12 +3,18 @@
 # Universal Extraction Schemas for Domain-Agnostic Context Analysis
 # =============================================================================
 
-from typing import List, Dict, Any
+import re
+import hashlib
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
 # LangExtract imports (adapted from provided files)
 from cqb.langextract.data import ExampleData, Extraction
-from cqb.langextract.prompting import PromptTemplateStructured
+from cqb.langextract.prompting import PromptTemplateStructured, QAPromptGenerator
+
+# Bump when the description or examples change so compiled prefixes are invalidated
+SCHEMA_VERSION = "1.5.1"
 
 # =============================================================================
 # Universal Extraction Schema Definition
@@ -40,8 +46,12 @@ Provide meaningful attributes to add context for specialist selection.
 """
 
     @staticmethod
+    @lru_cache(maxsize=1)
     def get_universal_examples() -> List[ExampleData]:
-        """Get universal extraction examples that work across domains."""
+        """Get universal extraction examples that work across domains.
+        
+        Built once per process; treat the returned examples as read-only.
+        """
         
         return [
             # Business/Operations Example
@@ -336,6 +346,150 @@ DevOps engineer needs access to production logs. Budget allocated for cloud infr
             ]
         }
 
+# =============================================================================
+# Compiled Extraction Prompt
+# =============================================================================
+
+class CompiledExtractionPrompt:
+    """QAPromptGenerator with the description and few-shot block rendered once.
+    
+    The prefix (description + formatted examples) is identical for every
+    extraction call, so it is serialized once and only the question suffix is
+    rendered per call; vLLM prefix caching reuses its KV blocks across calls.
+    version (schema version + prefix hash) keys the extraction caches, so
+    any prompt, example or schema change invalidates them.
+    """
+    
+    def __init__(self, prompt_generator: QAPromptGenerator):
+        self.prompt_generator = prompt_generator
+        self.prefix = self._compile_prefix()
+        self.prefix_hash = hashlib.sha256(
+            f"{SCHEMA_VERSION}|{prompt_generator.format_type.value}|{self.prefix}".encode('utf-8')
+        ).hexdigest()[:16]
+        self.version = f"{SCHEMA_VERSION}+{self.prefix_hash}"
+    
+    def _compile_prefix(self) -> str:
+        """Render everything QAPromptGenerator.render emits before the question."""
+        generator = self.prompt_generator
+        prompt_lines = [f"{generator.template.description}\n"]
+        
+        if generator.template.examples:
+            prompt_lines.append(generator.examples_heading)
+            for example in generator.template.examples:
+                prompt_lines.append(generator.format_example_as_text(example))
+        
+        return "\n".join(prompt_lines) + "\n"
+    
+    def render(self, question: str, additional_context: str = None) -> str:
+        """Render a full prompt; output matches QAPromptGenerator.render."""
+        if additional_context:
+            # Additional context sits between description and examples - not cacheable
+            return self.prompt_generator.render(question, additional_context)
+        
+        generator = self.prompt_generator
+        return f"{self.prefix}{generator.question_prefix}{question}\n{generator.answer_prefix}"
+
+_compiled_prompts: Dict[tuple, CompiledExtractionPrompt] = {}
+
+def get_compiled_extraction_prompt(format_type, fence_output: bool = True,
+                                   example_indices: Tuple[int, ...] = None) -> CompiledExtractionPrompt:
+    """Get the process-wide compiled extraction prompt for a format.
+    
+    Args:
+        format_type: Output format of the examples (JSON or YAML)
+        fence_output: Whether example answers are fenced
+        example_indices: Optional subset of universal examples (in this order);
+            each subset is compiled once
+    """
+    key = (SCHEMA_VERSION, format_type, fence_output, example_indices)
+    if key not in _compiled_prompts:
+        template = UniversalExtractionSchemas.create_extraction_template()
+        if example_indices is not None:
+            template = PromptTemplateStructured(
+                description=template.description,
+                examples=[template.examples[i] for i in example_indices]
+            )
+        generator = QAPromptGenerator(
+            template=template,
+            format_type=format_type,
+            fence_output=fence_output
+        )
+        _compiled_prompts[key] = CompiledExtractionPrompt(generator)
+    return _compiled_prompts[key]
+
+# =============================================================================
+# Few-Shot Example Selection
+# =============================================================================
+
+_WORD_PATTERN = re.compile(r'[a-z][a-z0-9]+')
+
+def _example_terms(text: str) -> set:
+    """Lowercase word set used for lexical example similarity"""
+    return set(_WORD_PATTERN.findall(text.lower()))
+
+class ExampleSelector:
+    """Picks the universal examples lexically closest to a document.
+    
+    Example term sets and rendered sizes are precomputed once. Selection is a
+    Jaccard ranking followed by a greedy fit to the token budget, using a
+    chars/4 token estimate so no tokenizer call is needed per document.
+    """
+    
+    CHARS_PER_TOKEN = 4
+    
+    def __init__(self, format_type, fence_output: bool = True):
+        self.format_type = format_type
+        self.fence_output = fence_output
+        
+        full_prompt = get_compiled_extraction_prompt(format_type, fence_output)
+        generator = full_prompt.prompt_generator
+        
+        self.example_terms: List[set] = []
+        self.example_tokens: List[int] = []
+        for example in generator.template.examples:
+            extraction_text = " ".join(
+                f"{e.extraction_class} {e.extraction_text} {' '.join(map(str, (e.attributes or {}).values()))}"
+                for e in example.extractions
+            )
+            self.example_terms.append(_example_terms(f"{example.text} {extraction_text}"))
+            rendered = generator.format_example_as_text(example)
+            self.example_tokens.append(len(rendered) // self.CHARS_PER_TOKEN + 1)
+    
+    def select(self, document: str, k: int = 2, token_budget: int = None) -> Tuple[int, ...]:
+        """Select up to k example indices for a document.
+        
+        Args:
+            document: Text that will be extracted from
+            k: Maximum number of examples
+            token_budget: Optional estimated-token budget for the examples
+            
+        Returns:
+            Example indices in original order (at least one example is always kept)
+        """
+        document_terms = _example_terms(document)
+        similarities = []
+        for i, terms in enumerate(self.example_terms):
+            union = len(terms | document_terms)
+            similarities.append((len(terms & document_terms) / union if union else 0.0, i))
+        similarities.sort(key=lambda x: (-x[0], x[1]))
+        
+        selected, used = [], 0
+        for _, i in similarities:
+            if len(selected) >= k:
+                break
+            if selected and token_budget is not None and used + self.example_tokens[i] > token_budget:
+                continue
+            selected.append(i)
+            used += self.example_tokens[i]
+        
+        return tuple(sorted(selected))
+    
+    def compiled_prompt_for(self, document: str, k: int = 2,
+                            token_budget: int = None) -> CompiledExtractionPrompt:
+        """Compiled extraction prompt using the examples selected for a document."""
+        indices = self.select(document, k, token_budget)
+        return get_compiled_extraction_prompt(self.format_type, self.fence_output, indices)
+
 # =============================================================================
 # Testing and Validation
 # =============================================================================